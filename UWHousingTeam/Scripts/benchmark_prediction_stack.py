@@ -0,0 +1,281 @@
+"""
+Contains a reproducible benchmark suite for the prediction stack.
+
+Each dataset is measured in a fresh process, so that its peak resident set
+size is its own: the sales data CSV load, prepare_model_data(),
+build_model(), single predict() latency percentiles against those of the
+DataFrame prediction path that the compiled model replaced, predict_many()
+throughput, and the latency of the map filter run by part1_predict_price's
+update(), which predicts a price and then finds the comparable homes.
+
+The datasets are the shipped Merged_Data.csv, and synthetic datasets that
+scale it up by resampling its rows with a fixed seed.  The results are
+written as JSON for regression tracking.  Run this file from the Scripts
+folder, e.g.:
+
+python benchmark_prediction_stack.py --scales 1 10 100 1000 --output benchmark_results.json
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from comparable_homes_index import ComparableHomesIndex
+from house_price_model_2 import HousePriceModel
+
+# Constants
+DATA_FILE = 'Merged_Data.csv'
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         '..', 'data')
+LATENCY_SAMPLES = 1000
+PERCENTILES = (50, 90, 99)
+SCALES = (1, 10, 100, 1000)
+SEED = 515
+SUITE_VERSION = 3
+
+
+def benchmark_dataset(data_file_path, seed=SEED):
+    """
+    Measures the prediction stack on one dataset.  Run this in a fresh
+    process for a meaningful peak resident set size.
+    :param data_file_path: The path of the sales data CSV
+    :param seed: The seed for choosing the homes that are predicted
+    :return: A dictionary of measurements
+    """
+
+    # Measure the CSV load, preparing the model data, and the fit.
+    os.environ['SALES_DATA_PATH'], os.environ['SALES_DATA_FILE'] = \
+        os.path.split(os.path.abspath(data_file_path))
+    for variable in ('SALES_DATA_CACHE', 'SALES_DATA_DATABASE'):
+        os.environ.pop(variable, None)
+    model = HousePriceModel()
+    results = {'dataset': os.path.basename(data_file_path)}
+    start = time.perf_counter()
+    model.read_housing_data()
+    results['csv_load_seconds'] = time.perf_counter() - start
+    sales_data = model.get_sales_data()
+    results['rows'] = len(sales_data)
+    start = time.perf_counter()
+    model_data = model.prepare_model_data()
+    results['prepare_model_data_seconds'] = time.perf_counter() - start
+    start = time.perf_counter()
+    model.build_model(model_data)
+    results['build_model_seconds'] = time.perf_counter() - start
+
+    # Measure the single prediction latency for a sample of the homes, and
+    # the throughput of predicting every home at once.
+    homes_features = get_homes_features(model, sales_data)
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(sales_data), size=min(LATENCY_SAMPLES,
+                                                  len(sales_data)),
+                        replace=False)
+    sample_features = homes_features.iloc[sample].to_dict('records')
+    results['predict_latency_ms'] = measure_latencies(model.predict,
+                                                      sample_features)
+    results['dataframe_predict_latency_ms'] = measure_latencies(
+        lambda features: predict_with_dataframe(model, features),
+        sample_features)
+    results['compiled_predict_speedup'] = \
+        results['dataframe_predict_latency_ms']['p50'] / \
+        results['predict_latency_ms']['p50']
+    start = time.perf_counter()
+    model.predict_many(homes_features)
+    results['predict_many_rows_per_second'] = \
+        len(homes_features) / (time.perf_counter() - start)
+
+    # Measure the map filter as update() runs it, without the caches: index
+    # the homes, then predict a price and find the comparable homes.
+    start = time.perf_counter()
+    comparable_homes = ComparableHomesIndex(sales_data)
+    results['map_index_seconds'] = time.perf_counter() - start
+    sample_homes = sales_data.iloc[sample][['bedrooms', 'bathrooms']]
+    update_arguments = [(features, home.bedrooms, home.bathrooms)
+                        for features, home in zip(
+                            sample_features, sample_homes.itertuples())]
+    results['map_filter_latency_ms'] = measure_latencies(
+        lambda arguments: update_map(model, comparable_homes, *arguments),
+        update_arguments)
+
+    # Record the peak resident set size of this process.  Linux reports it
+    # in kilobytes, and macOS in bytes.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results['peak_rss_bytes'] = peak_rss if sys.platform == 'darwin' \
+        else peak_rss * 1024
+    return results
+
+
+def get_environment():
+    """
+    Describes the environment the benchmarks run in.
+    :return: A dictionary of the platform and library versions
+    """
+    return {'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'sklearn': sklearn.__version__}
+
+
+def get_homes_features(model, sales_data):
+    """
+    Gets the features of homes in the sales data, as a user would enter
+    them for a prediction.
+    :param model: A built house price model
+    :param sales_data: The sales data
+    :return: A data frame of home features, one column per predictor
+    """
+    homes_features = pd.DataFrame(
+        {column: sales_data[column].values
+         for column in model.predictor_columns if column in sales_data})
+    homes_features['sale_day'] = \
+        model.calculate_sale_day_by_date(sales_data['date']).values
+    homes_features['location'] = model.look_up_zipcodes(sales_data['zipcode'])
+    return homes_features[model.predictor_columns]
+
+
+def main(arguments=None):
+    """
+    Runs the benchmark suite, and writes its results.
+    :param arguments: The command line arguments, or None for sys.argv
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES,
+                        help='the multiples of Merged_Data.csv to measure')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='the path of the JSON results')
+    parser.add_argument('--seed', type=int, default=SEED,
+                        help='the seed of the synthetic data and samples')
+    parser.add_argument('--dataset', help=argparse.SUPPRESS)
+    options = parser.parse_args(arguments)
+
+    # A child process measures one dataset, and prints its results.
+    if options.dataset is not None:
+        print(json.dumps(benchmark_dataset(options.dataset, options.seed)))
+        return None
+
+    # Measure each dataset in its own process, writing the synthetic
+    # datasets to a temporary directory.
+    source_path = os.path.join(DATA_PATH, DATA_FILE)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in options.scales:
+            data_file_path = source_path
+            if scale != 1:
+                data_file_path = os.path.join(
+                    directory, 'Merged_Data_x{}.csv'.format(scale))
+                write_synthetic_data(source_path, scale, data_file_path,
+                                     options.seed)
+            child = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--dataset',
+                 data_file_path, '--seed', str(options.seed)],
+                stdout=subprocess.PIPE, check=True, universal_newlines=True)
+            result = json.loads(child.stdout.strip().splitlines()[-1])
+            result['scale'] = scale
+            results.append(result)
+            if scale != 1:
+                os.remove(data_file_path)
+            print('x{}: {}'.format(scale, json.dumps(result)))
+
+    # Write the results with a description of the environment.
+    with open(options.output, 'w') as output_file:
+        json.dump({'suite_version': SUITE_VERSION,
+                   'created': dt.datetime.utcnow().isoformat() + 'Z',
+                   'seed': options.seed,
+                   'environment': get_environment(),
+                   'results': results}, output_file, indent=2)
+    return None
+
+
+def measure_latencies(function, arguments):
+    """
+    Measures the latency of a function for each of a list of arguments.
+    :param function: A function of one argument
+    :param arguments: The arguments to call the function with, one at a time
+    :return: A dictionary of latency percentiles, and the mean, in
+    milliseconds
+    """
+    latencies = np.empty(len(arguments))
+    for index, argument in enumerate(arguments):
+        start = time.perf_counter()
+        function(argument)
+        latencies[index] = time.perf_counter() - start
+    latencies *= 1000.
+    results = {'p{}'.format(percentile): np.percentile(latencies, percentile)
+               for percentile in PERCENTILES}
+    results['mean'] = latencies.mean()
+    return results
+
+
+def predict_with_dataframe(model, features):
+    """
+    Predicts a price as the model did before it was compiled: a one-row data
+    frame of the features is exponentiated and scaled, and passed to the
+    sklearn model.
+    :param model: A built house price model
+    :param features: The features of the home
+    :return: The predicted price
+    """
+    return round(max(0., float(model.get_model().predict(
+        model.prepare_test_row(features))[0]) + model.get_mean_response()), 2)
+
+
+def update_map(model, comparable_homes, features, bedrooms, bathrooms):
+    """
+    Predicts a price and finds the comparable homes for the map, as
+    part1_predict_price's update() does.
+    :param model: A built house price model
+    :param comparable_homes: An index of the homes
+    :param features: The features of the home
+    :param bedrooms: The number of bedrooms
+    :param bathrooms: The number of bathrooms
+    :return: The data of the map
+    """
+    value = model.predict(features)
+    sub_data = comparable_homes.query(bedrooms, bathrooms, int(value) - 10000,
+                                      int(value) + 10000, built_after=1900)
+    return {'lat': sub_data['lat'], 'lon': sub_data['long'],
+            'br': sub_data['bedrooms'], 'ba': sub_data['bathrooms'],
+            'zipcode': sub_data['zipcode'],
+            'list_price': sub_data['List price'],
+            'final_price': sub_data['price']}
+
+
+def write_synthetic_data(source_path, scale, output_path, seed=SEED):
+    """
+    Writes a synthetic sales data CSV of a multiple of the rows of the
+    source, each part resampled from the source rows.  The source text is
+    copied as is, so that the synthetic file parses as the source does.
+    :param source_path: The path of the source sales data CSV
+    :param scale: The multiple of the source rows to write
+    :param output_path: The path of the synthetic CSV
+    :param seed: The seed of the resampling
+    :return: None
+    """
+    with open(source_path, 'r') as input_file:
+        header = input_file.readline()
+        rows = np.array(input_file.read().splitlines())
+    rng = np.random.default_rng(seed)
+    with open(output_path, 'w') as output_file:
+        output_file.write(header)
+        for _ in range(scale):
+            output_file.write('\n'.join(rows[rng.integers(0, len(rows),
+                                                          len(rows))]))
+            output_file.write('\n')
+    return None
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,24 @@
 """
 Contains a house price model for King County, Washington.
 """
+import copy
+import hashlib
+import itertools
 import os
+import pickle
 
 import datetime as dt
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import RidgeCV
 from sklearn.preprocessing import StandardScaler
 
+import gram_ridge_cv
+import house_price_database
+import pipeline_metrics
+import ridge_statistics
+import sales_data_cache
+import sales_data_schema
+
 
 class HousePriceModel(object):
     """
@@ -16,14 +26,42 @@ class HousePriceModel(object):
     """
 
     # pylint: disable=too-many-instance-attributes
-    # We are using ten here instead of a maximum of seven.
+    # We are using 20 here instead of a maximum of seven.
 
     # pylint: disable=too-many-public-methods
-    # We are using 24 here instead of a maximum of 20.
+    # We are using 42 here instead of a maximum of 20.
+
+    # The version of the saved model artifact format.  Increment this
+    # whenever the contents of the artifact change.
+    ARTIFACT_VERSION = 2
+
+    # The source of model versions.  Each compiled model gets a version that
+    # is unique within the process, so that cached predictions can tell a
+    # rebuilt model from the one they were made with.
+    MODEL_VERSIONS = itertools.count(1)
+
+    # The sales data columns the model is built from, and the number of rows
+    # read from the database at a time.  Reading in chunks bounds the rows
+    # held as Python objects by the database driver, but the chunks are
+    # joined into one frame, so the training data is still held in full.
+    TRAINING_COLUMNS = ('date', 'price', 'bathrooms', 'sqft_living', 'sqft_lot',
+                        'waterfront', 'view', 'condition', 'grade', 'zipcode')
+    TRAINING_CHUNK_SIZE = 100000
 
-    def __init__(self):
+    # The predictors of the model, in the column order of the model data.
+    PREDICTOR_COLUMNS = ('sale_day', 'bathrooms', 'sqft_living', 'sqft_lot',
+                         'waterfront', 'view', 'condition', 'grade',
+                         'location')
+
+    def __init__(self, metrics=None, serving=False):
         """
         Initializes the house price model.
+        :param metrics: A pipeline_metrics.MetricsCollector in which to record
+        the duration, rows and memory change of each pipeline stage and
+        prediction, or None to record nothing
+        :param serving: True if the training data should be released whenever
+        the model is built, keeping only the predictor columns and the fitted
+        parameters, false otherwise
         """
 
         # Note: It is expected that the following environment variables will be
@@ -35,8 +73,20 @@ class HousePriceModel(object):
         #
         # Comment out the following lines if these values are known to be set.
         #
-        os.environ["SALES_DATA_PATH"] = r'C:\Users\Lisa\Projects\House\UWHousingTeam\UWHousingTeam\data'
-        os.environ["SALES_DATA_FILE"] = 'Merged_Data.csv'
+        # os.environ["SALES_DATA_PATH"] = '~/UW Data Science/DATA 515A/Project'
+        # os.environ["SALES_DATA_FILE"] = 'Merged_Data_excel.csv'  # 'KingCountyHomeSalesData.csv'
+        #
+        # Optionally, set the following environment variable to read the
+        # sales data through a binary column cache instead of parsing the
+        # sales data training file every time:
+        #
+        # SALES_DATA_CACHE: The directory of the cache, e.g.: "~/directory/cache"
+        #
+        # Or, to read only the columns the model needs from the SQLite
+        # database built by Database_HousePrice.py instead of the training
+        # file, set:
+        #
+        # SALES_DATA_DATABASE: The path of the database, e.g.: "~/directory/housePrices.db"
 
         # Declare and initialize the base date, and the scaler.
         self.base_date = HousePriceModel.create_date(2014, 1, 1)
@@ -111,6 +161,12 @@ class HousePriceModel(object):
                              '98004': (65, 1356524.0)
                             }
 
+        # Compile the zip code dictionary into a lookup table indexed by
+        # numeric zip code.
+        self.zipcode_offset = 0
+        self.zipcode_locations = np.zeros(0, dtype=np.int64)
+        self.compile_zipcode_lookup()
+
         # Declare and initialize the dictionary of fields that will be
         # converted to an exponential value, along with the factor to
         # be applied to each value before taking the exponent.
@@ -124,15 +180,33 @@ class HousePriceModel(object):
         # initialize_model().
         self.housing_data_read = False
         self.mean_response = 0
-        self.model = RidgeCV()
+        self.model = gram_ridge_cv.GramRidgeCV(
+            alphas=gram_ridge_cv.DENSE_ALPHAS)
         self.model_built = False
         self.predictors = pd.DataFrame()
+        self.metrics = pipeline_metrics.NULL_COLLECTOR if metrics is None \
+            else metrics
         self.sales_data = pd.DataFrame()
+        self.serving = serving
+        self.statistics = None
+        self.training_data_hash = None
+        self.training_data_released = False
+
+        # Declare and initialize the compiled form of the model that will be
+        # set during build_model(): the exponent factors, weights and bias.
+        # See compile_model().
+        self.predictor_columns = []
+        self.compiled_model = (np.zeros(0), np.zeros(0), 0.)
+        self.model_version = 0
         return None
 
-    def build_model(self):
+    def build_model(self, model_data=None):
         """
-        Builds the model.
+        Builds the model.  Model data that is given is never changed: a
+        serving model scales its predictors in place only when it prepared
+        them itself, and scales a copy of given predictors.
+        :param model_data: The predictors and responses returned by
+        prepare_model_data(), or None to prepare them from the sales data
         :return: None
         """
 
@@ -140,21 +214,46 @@ class HousePriceModel(object):
         assert self.housing_data_read, 'A model cannot be built because the ' \
                                        'housing data has not yet been read.'
 
-        # Prepare the model data, and isolate the response.
-        model_data = self.prepare_model_data()
-        response = model_data.price
-
-        # Calculate the mean of the response, and isolate the predictors.
+        # Prepare the model data unless it is given, and keep the predictors
+        # as a data frame over the predictor matrix, without copying it.
+        # Calculate the mean of the response.
+        predictors, response = self.prepare_model_data() \
+            if model_data is None else model_data
+        rows = len(response)
+        self.predictors = pd.DataFrame(
+            predictors, columns=list(HousePriceModel.PREDICTOR_COLUMNS),
+            copy=False)
         self.mean_response = np.mean(response)
-        self.predictors = model_data.drop('price', axis=1)
 
-        # Prepare the predictors and response for modeling.
-        x_for_model = self.get_scaler().fit_transform(self.get_predictors())
-        y_for_model = np.array(response) - self.get_mean_response()
+        # Keep the sufficient statistics of the model data so that new sales
+        # can be added with update_model(), and fit the scaler to them.
+        with self.metrics.stage('add_statistics', rows):
+            self.statistics = ridge_statistics.RidgeStatistics(
+                len(HousePriceModel.PREDICTOR_COLUMNS))
+            self.statistics.add(predictors, response)
+        with self.metrics.stage('fit_scaler', rows):
+            self.fit_scaler()
 
-        # Fit the model.  Set the flag and return.
-        self.get_model().fit(X=x_for_model, y=y_for_model)
+            # Scale the predictors for modeling.  The predictors of a serving
+            # model are released once it is built, so predictors prepared
+            # here are scaled in place instead of copied.  Given predictors
+            # belong to the caller, and are always copied.
+            scaler = self.get_scaler()
+            x_for_model = predictors if self.serving and model_data is None \
+                else np.empty_like(predictors)
+            np.subtract(predictors, scaler.mean_, out=x_for_model)
+            np.divide(x_for_model, scaler.scale_, out=x_for_model)
+        y_for_model = response - self.get_mean_response()
+
+        # Fit the model, and compile it for fast prediction.  Set the flag.
+        with self.metrics.stage('fit_model', rows):
+            self.get_model().fit(X=x_for_model, y=y_for_model)
+        self.compile_model()
         self.model_built = True
+
+        # Release the training data if the model is only serving predictions.
+        if self.serving:
+            self.release_training_data()
         return None
 
     def calculate_sale_day_by_date(self, date):
@@ -184,7 +283,52 @@ class HousePriceModel(object):
         Determines if it is possible to make a prediction.
         :return: True if a prediction can be made, false otherwise
         """
-        return self.housing_data_read and self.model_built
+        return self.model_built
+
+    def compile_model(self):
+        """
+        Compiles the fitted scaler and model into a single weight vector and
+        bias, keyed by the predictor column order.  A prediction is then the
+        dot product of the exponentiated features with the weights, plus the
+        bias.
+        :return: None
+        """
+
+        # Record the predictor column order, and the exponent factor for
+        # each column.  Columns that are not exponentiated get a factor of
+        # zero.
+        self.predictor_columns = self.get_predictors().columns.tolist()
+        exponents = np.array([self.exponent_table.get(column, 0.)
+                              for column in self.predictor_columns])
+
+        # Fold the scaler mean and scale, the model coefficients and
+        # intercept, and the mean response into the weights and bias.
+        scaler = self.get_scaler()
+        model = self.get_model()
+        weights = model.coef_ / scaler.scale_
+        bias = float(model.intercept_ - np.dot(weights, scaler.mean_) +
+                     self.get_mean_response())
+
+        # Replace the compiled model in one assignment, so that a concurrent
+        # prediction never sees new weights with an old bias.
+        self.compiled_model = (exponents, weights, bias)
+        self.model_version = next(HousePriceModel.MODEL_VERSIONS)
+        return None
+
+    def compile_zipcode_lookup(self):
+        """
+        Compiles the zip code dictionary into a lookup table of location
+        codes indexed by numeric zip code less the smallest zip code.  Zip
+        codes that are not in the dictionary have a location code of -1.
+        :return: None
+        """
+        zipcodes = [int(zipcode) for zipcode in self.get_zip_code_dict()]
+        self.zipcode_offset = min(zipcodes)
+        self.zipcode_locations = np.full(max(zipcodes) - self.zipcode_offset + 1,
+                                         -1, dtype=np.int64)
+        for zipcode, (location, _) in self.get_zip_code_dict().items():
+            self.zipcode_locations[int(zipcode) - self.zipcode_offset] = location
+        return None
 
     def convert_exponential_columns(self, model_data):
         """
@@ -203,7 +347,7 @@ class HousePriceModel(object):
                 # of the feature to the exponent of the value in the table
                 # times the existing model feature value.
                 model_data[column] = np.exp(self.exponent_table.get(column) *
-                                            model_data[column])
+                                            model_data[column].astype(np.float64))
         return None
 
     @staticmethod
@@ -230,6 +374,27 @@ class HousePriceModel(object):
         """
         destination[name] = source[name]
 
+    def fit_scaler(self):
+        """
+        Fits the scaler to the sufficient statistics of the model data, as
+        StandardScaler.fit() would fit it to the model data itself, but
+        without a centered copy of the model data.
+        :return: None
+        """
+
+        # Fit a new scaler, and replace the current one once it is complete.
+        scaler = StandardScaler()
+        scaler.mean_ = self.statistics.predictor_means.copy()
+        scaler.scale_ = self.statistics.get_scale()
+        scaler.var_ = np.diag(self.statistics.predictor_moments) / \
+            self.statistics.count
+        scaler.n_samples_seen_ = self.statistics.count
+        scaler.n_features_in_ = len(scaler.mean_)
+        scaler.feature_names_in_ = np.array(
+            self.get_predictors().columns.tolist(), dtype=object)
+        self.scaler = scaler
+        return None
+
     @staticmethod
     def format_date(year, month, day):
         """
@@ -264,12 +429,20 @@ class HousePriceModel(object):
         """
         return self.mean_response
 
+    def get_metrics(self):
+        """
+        Gets the collector of pipeline stage metrics.
+        :return: The collector of pipeline stage metrics
+        """
+        return self.metrics
+
     def get_model(self):
         """
         Gets the model.
         :return: The model
         """
-        assert self.housing_data_read, 'Housing data has not yet been read.'
+        assert self.housing_data_read or self.model_built, \
+            'Housing data has not yet been read.'
         return self.model
 
     def get_model_coefficients(self):
@@ -284,6 +457,13 @@ class HousePriceModel(object):
                                  'built.'
         return self.get_model().coef_
 
+    def get_model_version(self):
+        """
+        Gets the version of the model, which changes whenever it is rebuilt.
+        :return: The version of the model
+        """
+        return self.model_version
+
     def get_predictors(self):
         """
         Gets the model predictors.
@@ -293,9 +473,17 @@ class HousePriceModel(object):
 
     def get_sales_data(self):
         """
-        Gets raw sales data.
+        Gets raw sales data, reading it again if it has been released.
         :return: Raw sales data
         """
+
+        # Keep the hash of the training data the model was built from, so
+        # that the model is still seen to be stale if the data has changed.
+        if self.training_data_released:
+            training_data_hash = self.training_data_hash
+            self.read_housing_data()
+            self.training_data_hash = training_data_hash
+            self.training_data_released = False
         return self.sales_data
 
     def get_scaler(self):
@@ -305,6 +493,31 @@ class HousePriceModel(object):
         """
         return self.scaler
 
+    @staticmethod
+    def get_training_data_file():
+        """
+        Gets the path of the training data, either the sales data database or
+        the sales data training file.
+        :return: The path of the training data, or None if it is not set
+        """
+        sales_data_database = os.environ.get('SALES_DATA_DATABASE')
+        if sales_data_database is not None:
+            return sales_data_database
+        sales_data_file = os.environ.get('SALES_DATA_FILE')
+        sales_data_path = os.environ.get('SALES_DATA_PATH')
+        if sales_data_file is None or sales_data_path is None:
+            return None
+        return os.path.join(sales_data_path, sales_data_file)
+
+    def get_training_data_hash(self):
+        """
+        Gets the hash of the training data the model was fit to: that of the
+        training data file it was built from, combined with that of any
+        sales added by update_model().
+        :return: The hash of the training data
+        """
+        return self.training_data_hash
+
     def get_zip_code_dict(self):
         """
         Get the zip code dictionary.
@@ -312,6 +525,35 @@ class HousePriceModel(object):
         """
         return self.zipcode_dict
 
+    @staticmethod
+    def hash_file(path):
+        """
+        Calculates the SHA-256 hash of a file.
+        :param path: The path of the file
+        :return: The hexadecimal SHA-256 hash of the file
+        """
+        return sales_data_cache.hash_file(path)
+
+    @staticmethod
+    def hash_training_data_file():
+        """
+        Calculates the SHA-256 hash of the training data file.  The hash of
+        the sales data training file is taken from the binary column cache,
+        if one is configured, while the file is unchanged since the cache
+        last checked it.
+        :return: The hexadecimal SHA-256 hash of the training data file, or
+        None if the file is not set
+        """
+        training_data_file = HousePriceModel.get_training_data_file()
+        if training_data_file is None:
+            return None
+        sales_data_cache_path = os.environ.get('SALES_DATA_CACHE')
+        if os.environ.get('SALES_DATA_DATABASE') is not None or \
+                sales_data_cache_path is None:
+            return HousePriceModel.hash_file(training_data_file)
+        return sales_data_cache.source_hash(training_data_file,
+                                            sales_data_cache_path)
+
     def initialize_model(self):
         """
         Initializes the model.  Call this before attempting to make a
@@ -319,9 +561,94 @@ class HousePriceModel(object):
         :return: None
         """
         self.read_housing_data()
-        self.build_model()
+        with self.metrics.stage('build_model', len(self.get_sales_data())):
+            self.build_model()
         return None
 
+    def is_stale(self):
+        """
+        Determines if the model was built from training data other than the
+        current training data file.
+        :return: True if the model is stale, false if it is current or if
+        the training data file cannot be located
+        """
+        training_data_hash = HousePriceModel.hash_training_data_file()
+        if training_data_hash is None:
+            return False
+        return self.get_training_data_hash() != training_data_hash
+
+    @classmethod
+    def load(cls, path, check_training_data=True):
+        """
+        Loads a model saved with save().  Only load artifacts from a trusted
+        source; they are unpickled.
+        :param path: The path of the saved model artifact
+        :param check_training_data: True if the model should be checked
+        against the current training data file, false otherwise
+        :return: A house price model ready for prediction
+        """
+
+        # Read the artifact, and assert that it has the expected version.
+        with open(path, 'rb') as input_file:
+            artifact = pickle.load(input_file)
+        assert artifact.get('version') == cls.ARTIFACT_VERSION, \
+            'The model artifact \'{}\' has version {}, but version {} is ' \
+            'required.'.format(path, artifact.get('version'),
+                               cls.ARTIFACT_VERSION)
+
+        # Restore the fitted state of the model.
+        house_price_model = cls()
+        house_price_model.base_date = artifact['base_date']
+        house_price_model.exponent_table = artifact['exponent_table']
+        house_price_model.mean_response = artifact['mean_response']
+        house_price_model.model = artifact['model']
+        house_price_model.predictors = pd.DataFrame(
+            columns=artifact['predictor_columns'])
+        house_price_model.scaler = artifact['scaler']
+        house_price_model.statistics = artifact['statistics']
+        house_price_model.training_data_hash = artifact['training_data_hash']
+        house_price_model.zipcode_dict = artifact['zipcode_dict']
+        house_price_model.compile_zipcode_lookup()
+
+        # Set the flag, and compile the model.  Assert that the model is not
+        # stale if requested, and return it.
+        house_price_model.model_built = True
+        house_price_model.compile_model()
+        assert not (check_training_data and house_price_model.is_stale()), \
+            'The model artifact \'{}\' was not built from the current ' \
+            'training data.'.format(path)
+        return house_price_model
+
+    @classmethod
+    def load_or_initialize(cls, path, serving=False):
+        """
+        Loads a saved model if one exists, can be read, and is current.
+        Otherwise initializes a new model, and saves it for the next caller,
+        replacing an artifact that is stale, of another version, truncated
+        or corrupt.
+        :param path: The path of the saved model artifact
+        :param serving: True if a new model should release its training data
+        once it is built, false otherwise.  A loaded model has none.
+        :return: A house price model ready for prediction
+        """
+
+        # Use the saved model if it exists, can be read, and is not stale.
+        if os.path.exists(path):
+            try:
+                house_price_model = cls.load(path, check_training_data=False)
+            except (AssertionError, AttributeError, EOFError, KeyError,
+                    pickle.UnpicklingError):
+                house_price_model = None
+            if house_price_model is not None and \
+                    not house_price_model.is_stale():
+                return house_price_model
+
+        # Build a new model, save it, and return it.
+        house_price_model = cls(serving=serving)
+        house_price_model.initialize_model()
+        house_price_model.save(path)
+        return house_price_model
+
     def look_up_zipcode_by_number(self, zipcode):
         """
         Looks up a zip code location code by numeric zip code.
@@ -345,9 +672,37 @@ class HousePriceModel(object):
                                         '\'{}\'.'.format(zipcode)
         return zipcode_dict.get(zipcode)[0]
 
+    def look_up_zipcodes(self, zipcodes):
+        """
+        Looks up location codes for many zip codes at once.
+        :param zipcodes: The zip codes, as numbers or strings
+        :return: An array of zip code location codes
+        """
+
+        # Convert the zip codes to numbers, and find those that fall within
+        # the lookup table.  Zip codes that cannot be converted become NaN.
+        values = np.asarray(zipcodes).ravel()
+        numbers = pd.to_numeric(pd.Series(values), errors='coerce').values
+        indices = numbers - self.zipcode_offset
+        known = np.isfinite(indices)
+        known[known] = (indices[known] >= 0) & \
+            (indices[known] < len(self.zipcode_locations))
+
+        # Look up the location codes, and assert that every zip code is known
+        # to King County.  Report all of the unknown zip codes together.
+        locations = np.full(len(values), -1, dtype=np.int64)
+        locations[known] = self.zipcode_locations[indices[known].astype(np.int64)]
+        unknown = locations < 0
+        assert not unknown.any(), 'Zip codes unknown to King County have ' \
+                                  'been encountered: {}.'.format(
+                                      sorted(set(str(value) for value
+                                                 in values[unknown])))
+        return locations
+
     def predict(self, features):
         """
-        Makes a house price prediction.
+        Makes a house price prediction.  Every feature must be a finite
+        number, as in predict_many().
         :param features: Features of the house.
         :return: A house price prediction
         """
@@ -356,48 +711,145 @@ class HousePriceModel(object):
         assert self.can_predict, 'A prediction cannot be made because the ' \
                                  'model has not yet been built.'
 
-        # Make the prediction.
-        return round(max(0., self.get_model().predict(
-            self.prepare_test_row(features))[0] + self.get_mean_response()), 2)
+        # Gather the features in predictor order, and exponentiate those that
+        # have an exponent factor.
+        with self.metrics.stage('predict', 1):
+            exponents, weights, bias = self.compiled_model
+            values = np.array([features[column]
+                               for column in self.predictor_columns],
+                              dtype=np.float64)
+            assert np.isfinite(values).all(), \
+                'Features that are not finite have been encountered: ' \
+                '{}.'.format([column for column, value
+                              in zip(self.predictor_columns, values)
+                              if not np.isfinite(value)])
+            values = np.where(exponents != 0., np.exp(exponents * values),
+                              values)
+
+            # Make the prediction using the compiled model.
+            return round(max(0., float(np.dot(values, weights)) + bias), 2)
 
-    def prepare_model_data(self):
+    def predict_many(self, homes_features):
+        """
+        Makes house price predictions for many homes at once.
+        :param homes_features: Features of the homes, as a data frame, a list
+        of feature dictionaries, or a dictionary of feature columns
+        :return: An array of house price predictions, one per home
+        """
+
+        # Assert that a prediction can be made.
+        assert self.can_predict, 'A prediction cannot be made because the ' \
+                                 'model has not yet been built.'
+
+        # Make the predictions for the whole batch in one pass using the
+        # compiled model.
+        with self.metrics.stage('predict_many') as stage:
+            _, weights, bias = self.compiled_model
+            matrix = self.prepare_test_matrix(homes_features, scale=False)
+            stage.rows = len(matrix)
+            predictions = np.dot(matrix, weights) + bias
+            return np.round(np.maximum(0., predictions), 2)
+
+    def prepare_model_data(self, sales_data=None):
         """
         Prepares and returns model data.  Housing data must be read first using
-        read_housing_data().
-        :return: Model data
+        read_housing_data(), unless sales data is given.  The predictors are
+        written once into a preallocated matrix, and exponentiated in place.
+        The model data is returned as a (predictors, response) tuple of
+        arrays rather than as a data frame; get_predictors() gives the
+        predictors of a built model as a data frame.
+        :param sales_data: The sales data to prepare, or None for the housing
+        data that has been read
+        :return: A C-contiguous float64 matrix of predictors, one row per sale
+        and one column per predictor in PREDICTOR_COLUMNS order, and a float64
+        vector of the responses, converted from the int32 price column
         """
 
         # The housing data must have been read before model data can be
-        # prepared.
-        assert self.housing_data_read, 'Model data cannot be prepared ' \
-                                       'because the housing data has ' \
-                                       'not yet been read.'
+        # prepared from it.
+        if sales_data is None:
+            assert self.housing_data_read, 'Model data cannot be prepared ' \
+                                           'because the housing data has ' \
+                                           'not yet been read.'
+            sales_data = self.get_sales_data()
 
-        # Create an empty data frame, and get the sales data.
-        model_data = pd.DataFrame()
-        sales_data = self.get_sales_data()
+        # Allocate the predictor matrix.
+        rows = len(sales_data)
+        columns = HousePriceModel.PREDICTOR_COLUMNS
+        predictors = np.empty((rows, len(columns)), dtype=np.float64)
 
         # Extract the sales date as an integer relative to the base date.
-        model_data['sale_day'] =\
-            self.calculate_sale_day_by_date(sales_data['date'])
-
-        # Create the other model features, including the location field.  The location
-        # field is an integer based on zip code, which gives the relative average value
-        # of homes in that zip code.
-        HousePriceModel.create_model_feature(model_data, sales_data, 'price')
-        HousePriceModel.create_model_feature(model_data, sales_data, 'bathrooms')
-        HousePriceModel.create_model_feature(model_data, sales_data, 'sqft_living')
-        HousePriceModel.create_model_feature(model_data, sales_data, 'sqft_lot')
-        HousePriceModel.create_model_feature(model_data, sales_data, 'waterfront')
-        HousePriceModel.create_model_feature(model_data, sales_data, 'view')
-        HousePriceModel.create_model_feature(model_data, sales_data, 'condition')
-        HousePriceModel.create_model_feature(model_data, sales_data, 'grade')
-        model_data['location'] = np.vectorize(self.look_up_zipcode_by_string)\
-            (sales_data['zipcode'].apply(str))
-
-        # Convert any required features to exponential, and return the model data.
-        self.convert_exponential_columns(model_data)
-        return model_data
+        with self.metrics.stage('calculate_sale_day', rows):
+            predictors[:, columns.index('sale_day')] = \
+                self.calculate_sale_day_by_date(sales_data['date']).values
+
+        # Write the other model features, including the location field.  The
+        # location field is an integer based on zip code, which gives the
+        # relative average value of homes in that zip code.
+        for index, column in enumerate(columns):
+            if column not in ('sale_day', 'location'):
+                predictors[:, index] = sales_data[column].values
+        with self.metrics.stage('look_up_zipcodes', rows):
+            predictors[:, columns.index('location')] = \
+                self.look_up_zipcodes(sales_data['zipcode'])
+
+        # Convert any required features to exponential in place, and return
+        # the model data.
+        with self.metrics.stage('convert_exponential_columns', rows):
+            for index, column in enumerate(columns):
+                if column in self.exponent_table:
+                    values = predictors[:, index]
+                    np.multiply(values, self.exponent_table.get(column),
+                                out=values)
+                    np.exp(values, out=values)
+        return predictors, np.asarray(sales_data['price'].values,
+                                      dtype=np.float64)
+
+    def prepare_test_matrix(self, homes_features, scale=True):
+        """
+        Prepares a matrix of test rows for prediction.  Every feature must be
+        a finite number.
+        :param homes_features: Features of the homes, as a data frame, a list
+        of feature dictionaries, or a dictionary of feature columns
+        :param scale: True if the matrix should be scaled for the model,
+        false if it should be left for the compiled model
+        :return: A matrix ready for price prediction, one row per home
+        """
+
+        # Assert that the model has been built.
+        assert self.model_built, 'The model must be built before a test ' \
+                                 'matrix can be prepared.'
+
+        # A list of feature dictionaries is turned into feature columns.
+        if isinstance(homes_features, (list, tuple)):
+            homes_features = {column: [home[column] for home in homes_features]
+                              for column in self.predictor_columns}
+
+        # Stack the feature columns in the order of the existing predictors.
+        matrix = np.column_stack(
+            [np.asarray(homes_features[column], dtype=np.float64)
+             for column in self.predictor_columns])
+        finite = np.isfinite(matrix).all(axis=0)
+        assert finite.all(), \
+            'Features that are not finite have been encountered: ' \
+            '{}.'.format([column for column, is_finite
+                          in zip(self.predictor_columns, finite)
+                          if not is_finite])
+
+        # Convert any required features to exponential in place, one column
+        # at a time for the whole batch.
+        for index, column in enumerate(self.predictor_columns):
+            if column in self.exponent_table:
+                values = matrix[:, index]
+                np.multiply(values, self.exponent_table.get(column), out=values)
+                np.exp(values, out=values)
+
+        # Scale the matrix with the fitted scaler parameters if required, and
+        # return it.
+        if not scale:
+            return matrix
+        scaler = self.get_scaler()
+        return (matrix - scaler.mean_) / scaler.scale_
 
     def prepare_test_row(self, home_features):
         """
@@ -427,6 +879,27 @@ class HousePriceModel(object):
         :return: None
         """
 
+        # Read only the training columns from the sales data database, if one
+        # is configured.  The model is fit to every row at once, so the
+        # chunks are joined, and memory still grows with the number of
+        # sales.  Record the hash of the database so that a saved model can
+        # be checked against it.
+        sales_data_database = os.environ.get('SALES_DATA_DATABASE')
+        if sales_data_database is not None:
+            with self.metrics.stage('read_sales_data') as stage:
+                self.sales_data = pd.concat(
+                    house_price_database.read_sales_data(
+                        sales_data_database,
+                        columns=HousePriceModel.TRAINING_COLUMNS,
+                        chunksize=HousePriceModel.TRAINING_CHUNK_SIZE),
+                    ignore_index=True)
+                stage.rows = len(self.sales_data)
+            with self.metrics.stage('hash_training_data'):
+                self.training_data_hash = HousePriceModel.hash_file(
+                    sales_data_database)
+            self.housing_data_read = True
+            return None
+
         # Get the SALES_DATA_FILE and SALES_DATA_PATH environment variables.
         sales_data_file = os.environ.get('SALES_DATA_FILE')
         sales_data_path = os.environ.get('SALES_DATA_PATH')
@@ -439,11 +912,116 @@ class HousePriceModel(object):
                                               'set before the housing data ' \
                                               'can be read.'
 
-        # Construct the full sales data file path, and read the sales data.
-        self.sales_data = pd.read_csv(os.path.join(sales_data_path,
-                                                   sales_data_file),
-                                      parse_dates=['date'])
+        # Construct the full sales data file path, and read the sales data,
+        # through the binary column cache if one is configured.  Record the
+        # hash of the file so that a saved model can be checked against it;
+        # the cache holds the hash of an unchanged file.
+        sales_data_file_path = os.path.join(sales_data_path, sales_data_file)
+        sales_data_cache_path = os.environ.get('SALES_DATA_CACHE')
+        with self.metrics.stage('read_sales_data') as stage:
+            if sales_data_cache_path is None:
+                self.sales_data = sales_data_schema.read_sales_csv(
+                    sales_data_file_path)
+            else:
+                self.sales_data = sales_data_cache.read_sales_data(
+                    sales_data_file_path, sales_data_cache_path)
+            stage.rows = len(self.sales_data)
+        with self.metrics.stage('hash_training_data'):
+            self.training_data_hash = \
+                HousePriceModel.hash_training_data_file()
 
         # Set the flag, and return.
         self.housing_data_read = True
         return None
+
+    def release_training_data(self):
+        """
+        Releases the raw sales data and the transformed predictors of a built
+        model, keeping only the predictor columns and the fitted parameters.
+        The sales data is read again by get_sales_data() if it is needed.
+        :return: None
+        """
+
+        # Assert that there is a model whose fit no longer needs the data.
+        assert self.model_built, 'The training data cannot be released ' \
+                                 'because the model has not yet been built.'
+        self.sales_data = pd.DataFrame()
+        self.predictors = pd.DataFrame(columns=self.predictor_columns)
+        self.training_data_released = True
+        return None
+
+    def save(self, path):
+        """
+        Saves the fitted model, so that it can be loaded with load() without
+        reading the housing data or refitting.
+        :param path: The path of the model artifact to write
+        :return: None
+        """
+
+        # Assert that there is a model to save.
+        assert self.can_predict, 'A model cannot be saved because it has ' \
+                                 'not yet been built.'
+
+        # Collect the fitted state of the model, and write it to a temporary
+        # file that replaces the artifact only once it is complete.
+        artifact = {'version': HousePriceModel.ARTIFACT_VERSION,
+                    'base_date': self.get_base_date(),
+                    'exponent_table': self.exponent_table,
+                    'mean_response': self.get_mean_response(),
+                    'model': self.get_model(),
+                    'predictor_columns': self.predictor_columns,
+                    'scaler': self.get_scaler(),
+                    'statistics': self.statistics,
+                    'training_data_hash': self.get_training_data_hash(),
+                    'zipcode_dict': self.get_zip_code_dict()}
+        temporary_path = '{}.tmp'.format(path)
+        with open(temporary_path, 'wb') as output_file:
+            pickle.dump(artifact, output_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+        return None
+
+    def update_model(self, sales_data):
+        """
+        Adds new sales to the model without refitting it from all of the
+        sales.  The sufficient statistics of the new sales are merged into
+        those of the model, and the scaler and coefficients are solved from
+        them with the ridge penalty chosen when the model was built.  The
+        result is the model a full build would fit with that penalty.
+        Rebuild the model to choose the penalty again.  An updated model is
+        stale against the training data file, since it was not built from
+        the file alone.
+        :param sales_data: The new sales, with at least the training columns
+        :return: None
+        """
+
+        # Assert that there is a model to update.
+        assert self.can_predict and self.statistics is not None, \
+            'A model cannot be updated because it has not yet been built.'
+
+        # Prepare the new sales, and merge them into the statistics.
+        predictors, response = self.prepare_model_data(sales_data)
+        with self.metrics.stage('add_statistics', len(response)):
+            self.statistics.add(predictors, response)
+
+        # Set the scaler, mean response and model from the statistics.  The
+        # coefficients are solved into a copy of the model, which then
+        # replaces it.
+        self.fit_scaler()
+        self.mean_response = self.statistics.response_mean
+        model = copy.copy(self.get_model())
+        model.coef_ = self.statistics.solve(model.alpha_)
+        model.intercept_ = 0.
+        self.model = model
+
+        # Record the hash of the training data the model has now been fit
+        # to, which is that of the earlier training data and the new sales.
+        # The model is then stale against any training data file, so that it
+        # is not mistaken for a build from the file.  Compile the model.
+        training_data_hash = hashlib.sha256(
+            str(self.get_training_data_hash()).encode('utf-8'))
+        training_data_hash.update(pd.util.hash_pandas_object(
+            sales_data.loc[:, list(HousePriceModel.TRAINING_COLUMNS)],
+            index=False).values.tobytes())
+        self.training_data_hash = training_data_hash.hexdigest()
+        self.compile_model()
+        return None
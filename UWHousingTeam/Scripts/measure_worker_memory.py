@@ -0,0 +1,198 @@
+"""
+Contains a measurement of the memory of server worker processes, with and
+without the shared model store.
+
+For each number of workers, that many fresh processes are started at once.
+In the private mode each one reads the sales data, builds the model and
+indexes the map data, as every Bokeh server process does by default.  In the
+shared mode each one attaches to a store written once by the parent, as
+with SHARED_MODEL_STORE.  Each worker then predicts prices and queries the
+comparable homes of every bedrooms and bathrooms group, so that every page
+of the map data is read, and reports its memory while all of the workers
+are alive:
+
+rss: The resident set size, which counts shared pages in every process
+pss: The proportional set size, which divides shared pages among the
+     processes that share them
+uss: The unique set size, the pages no other process shares
+
+Linux only.  Run this file from the Scripts folder, e.g.:
+
+python measure_worker_memory.py --workers 1 2 4 8 --scale 10
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+
+import numpy as np
+
+import shared_model_store
+from benchmark_prediction_stack import DATA_FILE, DATA_PATH, \
+    write_synthetic_data
+from comparable_homes_index import ComparableHomesIndex
+from house_price_model_2 import HousePriceModel
+from publish_model_store import publish
+from sales_data_schema import read_sales_csv
+
+# Constants
+MAIN_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'main_data.csv')
+MODES = ('private', 'shared')
+SMAPS_ROLLUP_PATH = '/proc/self/smaps_rollup'
+WORKERS = (1, 2, 4, 8)
+
+# The home whose price each worker predicts.
+HOME = {'sale_day': 1278, 'bathrooms': 3, 'sqft_living': 2640,
+        'sqft_lot': 3920, 'waterfront': 0, 'view': 0, 'condition': 5,
+        'grade': 6, 'location': 1}
+
+
+def exercise(model, index):
+    """
+    Predicts prices, and queries the comparable homes of every bedrooms and
+    bathrooms group over every price.
+    :param model: A house price model ready for prediction
+    :param index: A comparable homes index
+    :return: The number of comparable homes found
+    """
+    homes = 0
+    for bedrooms, bathrooms in index.groups:
+        model.predict(HOME)
+        homes += len(index.query(bedrooms, bathrooms, -np.inf, np.inf))
+    return homes
+
+
+def measure_workers(mode, workers, store_path, main_data_file):
+    """
+    Starts workers at once, and collects their memory.
+    :param mode: 'private' or 'shared'
+    :param workers: The number of workers
+    :param store_path: The directory of the shared model store
+    :param main_data_file: The path of the map data file
+    :return: A dictionary of the mean resident, proportional and unique set
+    sizes of the workers, and their total proportional set size, in
+    megabytes
+    """
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=run_worker,
+                                 args=(mode, store_path, main_data_file,
+                                       barrier, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    memories = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    megabytes = {name: np.array([memory[name] for memory in memories]) / 1024.
+                 for name in ('rss', 'pss', 'uss')}
+    return {'mode': mode,
+            'workers': workers,
+            'rss_mb': float(megabytes['rss'].mean()),
+            'pss_mb': float(megabytes['pss'].mean()),
+            'uss_mb': float(megabytes['uss'].mean()),
+            'total_pss_mb': float(megabytes['pss'].sum())}
+
+
+def read_memory():
+    """
+    Reads the memory of this process.
+    :return: A dictionary of the resident, proportional and unique set
+    sizes, in kilobytes
+    """
+    fields = {}
+    with open(SMAPS_ROLLUP_PATH, 'r') as input_file:
+        for line in input_file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {'rss': fields['Rss'],
+            'pss': fields['Pss'],
+            'uss': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def run_worker(mode, store_path, main_data_file, barrier, results):
+    """
+    Loads the model and the map data as a worker, exercises them, and
+    reports the memory of the worker while every worker is alive.
+    :param mode: 'private' or 'shared'
+    :param store_path: The directory of the shared model store
+    :param main_data_file: The path of the map data file
+    :param barrier: A barrier of every worker
+    :param results: A queue to put the memory of the worker on
+    :return: None
+    """
+    if mode == 'shared':
+        model, column_sets = shared_model_store.attach_store(store_path)
+        index = ComparableHomesIndex(column_sets['main_data'], is_sorted=True)
+    else:
+        model = HousePriceModel()
+        model.initialize_model()
+        index = ComparableHomesIndex(read_sales_csv(main_data_file, sep=','))
+    exercise(model, index)
+    barrier.wait()
+    results.put(read_memory())
+    barrier.wait()
+    return None
+
+
+def main(arguments=None):
+    """
+    Measures the workers in both modes, and writes the results.
+    :param arguments: The command line arguments, or None for sys.argv
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=WORKERS,
+                        help='the numbers of workers to measure')
+    parser.add_argument('--scale', type=int, default=1,
+                        help='the multiple of the shipped data to serve')
+    parser.add_argument('--output', help='the path of the JSON results')
+    options = parser.parse_args(arguments)
+    assert os.path.exists(SMAPS_ROLLUP_PATH), \
+        'The worker memory can only be measured on Linux.'
+
+    # Serve the shipped data, or synthetic data that scales it up.  The
+    # workers read the sales data from the environment.
+    with tempfile.TemporaryDirectory() as directory:
+        main_data_file = MAIN_DATA_FILE
+        os.environ['SALES_DATA_PATH'] = DATA_PATH
+        os.environ['SALES_DATA_FILE'] = DATA_FILE
+        if options.scale != 1:
+            main_data_file = os.path.join(directory, 'main_data.csv')
+            write_synthetic_data(MAIN_DATA_FILE, options.scale,
+                                 main_data_file)
+            write_synthetic_data(os.path.join(DATA_PATH, DATA_FILE),
+                                 options.scale,
+                                 os.path.join(directory, DATA_FILE))
+            os.environ['SALES_DATA_PATH'] = directory
+        for variable in ('MODEL_ARTIFACT_FILE', 'SALES_DATA_CACHE',
+                         'SALES_DATA_DATABASE'):
+            os.environ.pop(variable, None)
+
+        # Publish the store once, and measure each number of workers in
+        # each mode.
+        store_path = shared_model_store.create_store_path()
+        results = []
+        try:
+            publish(store_path, main_data_file)
+            for workers in options.workers:
+                for mode in MODES:
+                    result = measure_workers(mode, workers, store_path,
+                                             main_data_file)
+                    result['scale'] = options.scale
+                    results.append(result)
+                    print(json.dumps(result))
+        finally:
+            shared_model_store.remove_store(store_path)
+    if options.output is not None:
+        with open(options.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+    return None
+
+
+if __name__ == '__main__':
+    main()
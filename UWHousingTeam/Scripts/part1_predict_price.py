@@ -8,10 +8,23 @@ for windows user -
 os.environ["SALES_DATA_PATH"] = r'the path where Merged_Data.csv is saved', e.g.: "~/directory"
 os.environ["SALES_DATA_FILE"] = 'Merged_Data.csv'
 
+optionally, to start without refitting the model, set
+os.environ["MODEL_ARTIFACT_FILE"] = r'the path of a saved model', e.g.: "house_price_model.pkl"
+the model is built and saved there the first time, and loaded afterwards
+
+the model is built once per server process, in the background, and shared by
+every session; sessions opened while it is warming up show a message and
+fill in the map once it is ready
+
+optionally, to run several server processes that share one copy of the model
+and the map data, publish them once and point the servers at them:
+python publish_model_store.py /dev/shm/house_price_store
+os.environ["SHARED_MODEL_STORE"] = '/dev/shm/house_price_store'
+bokeh serve --num-procs 4 --port 5001 main2.py
+
 type bokeh serve --port 5001 main2.py in your terminal
 Then you may go to the FirstStop landing page to click the predicting price link
 """
-import pandas as pd
 from bokeh.io import curdoc
 #from bokeh.tile_providers import STAMEN_TONER
 from bokeh.models import (
@@ -21,10 +34,7 @@ from bokeh.models import (
 from bokeh.layouts import layout
 from bokeh.models.widgets import Button, \
     Select, Slider, Paragraph, Div
-from house_price_model_2 import HousePriceModel
-
-MODEL = HousePriceModel()
-MODEL.initialize_model()
+from model_registry import REGISTRY
 
 LOGO = Div(text="""<img src="https://s3-us-west-2.amazonaws.com/data515logo/logo_title_thinner.PNG"
 alt="" />""")
@@ -37,26 +47,30 @@ width=500 height=15>Almost Done. Just Submit!</span></h2>""")
 DELIM_5 = Div(text="""<h2><span style="color: #800080;"
 width=500 height=15>Ta Daa .....!</span></h2>""")
 
-# Import dataset, the first sheet in the merged dataset
-MAIN_DATA = pd.read_csv("main_data.csv", sep=",")
+# Index of the dataset, the first sheet in the merged dataset, shared by every session
+COMPARABLE_HOMES = REGISTRY.get_comparable_homes_index()
+
+# Caches of predictions and comparable homes, shared by every session
+PREDICTION_CACHE = REGISTRY.get_prediction_cache()
+COMPARABLE_HOMES_CACHE = REGISTRY.get_comparable_homes_cache()
 
 # Create widgets
 BED = Select(title="Bedroom number:", value="3", options=['2', '3', '4', '5'])
 BATH = Select(title="Bathroom number:", value="2", options=['2', '3', '4', '5'])
 BUILTYEAR = Slider(title="Built year:", value=1900, start=1900, end=2015, step=1)
 ZIPCODE = Select(title="Zipcode:", value="98004",
-                 options=[str(x) for x in sorted(list(set(MAIN_DATA.zipcode.values)))])
+                 options=[str(x) for x in REGISTRY.get_distinct_values("zipcode")])
 SQFT_LIVING = Slider(title="Living Sqft:",
                      value=500, start=500, end=5500, step=10)
 SQFT_LOT = Slider(title="Lot Sqft:", value=500, start=500, end=5500, step=10)
 WATERFRONT = Select(title="Waterfront:", value="Either", options=['Either', 'Yes', 'No'])
 
 VIEW = Select(title="House view:", value="1",
-              options=[str(x) for x in sorted(list(set(MAIN_DATA.view.values)))])
+              options=[str(x) for x in REGISTRY.get_distinct_values("view")])
 CONDITION = Select(title="House Condition:", value="3",
-                   options=[str(x) for x in sorted(list(set(MAIN_DATA.condition.values)))])
+                   options=[str(x) for x in REGISTRY.get_distinct_values("condition")])
 GRADE = Select(title="House grade:", value="3",
-               options=[str(x) for x in sorted(list(set(MAIN_DATA.grade.values)))])
+               options=[str(x) for x in REGISTRY.get_distinct_values("grade")])
 YEAR = Select(title="Year to buy the house:", value="2017",
               options=['2017', '2018'])
 MONTH = Select(title="Month to buy the house:", value="10",
@@ -90,6 +104,7 @@ def update():
     """
     Callback function to subset data and update map based on inputs from the user
     """
+    model = REGISTRY.get_model()
     if WATERFRONT.value == 'Either':
         WATERFRONT.value = '0.5'
     elif WATERFRONT.value == 'Yes':
@@ -97,7 +112,7 @@ def update():
     else:
         WATERFRONT.value = '0'
     features = {'sale_day':
-                    MODEL.calculate_sale_day_by_day(int(YEAR.value), int(MONTH.value), 15),
+                    model.calculate_sale_day_by_day(int(YEAR.value), int(MONTH.value), 15),
                 'bathrooms': float(BATH.value),
                 'sqft_living': float(SQFT_LIVING.value),
                 'sqft_lot': float(SQFT_LOT.value),
@@ -106,18 +121,23 @@ def update():
                 'condition': int(CONDITION.value),
                 'grade': int(GRADE.value),
                 'location':
-                    MODEL.look_up_zipcode_by_string(ZIPCODE.value)
+                    model.look_up_zipcode_by_string(ZIPCODE.value)
                }
-    value = MODEL.predict(features)
+    value = PREDICTION_CACHE.get_or_compute(
+        PREDICTION_CACHE.normalize(features), lambda: model.predict(features),
+        version=model.get_model_version())
     OUTPUT1.text = 'The predicted price of your house is: $' + str(value)
-    sub_data = MAIN_DATA[MAIN_DATA.bedrooms == int(BED.value)]
-    sub_data = sub_data[sub_data.bathrooms == float(BATH.value)]
-    #sub_data = sub_data[sub_data.zipcode == int(zipcode.value)]
     select_on_price_lower_limit = int(value) - 10000
     select_on_price_upper_limit = int(value) + 10000
-    sub_data = sub_data[sub_data['List price'] > select_on_price_lower_limit]
-    sub_data = sub_data[sub_data['List price'] < select_on_price_upper_limit]
-    sub_data = sub_data[sub_data.yr_built > int(BUILTYEAR.value)]
+    comparable_homes_query = (int(BED.value), float(BATH.value),
+                              select_on_price_lower_limit,
+                              select_on_price_upper_limit,
+                              int(BUILTYEAR.value))
+    sub_data = COMPARABLE_HOMES_CACHE.get_or_compute(
+        comparable_homes_query,
+        lambda: COMPARABLE_HOMES.query(*comparable_homes_query[:4],
+                                       built_after=comparable_homes_query[4]),
+        version=model.get_model_version())
     SOURCE.data = {'lat':sub_data['lat'], 'lon':sub_data['long'], 'br':sub_data['bedrooms'],
                    'ba':sub_data['bathrooms'], 'zipcode':sub_data['zipcode'],
                    'list_price':sub_data['List price'], 'final_price': sub_data['price']}
@@ -135,13 +155,32 @@ def reset():
     OUTPUT1.text = None
     OUTPUT2.text = None
 
+
+def finish_warm_up():
+    """
+    Periodic callback to load the initial map once the model has warmed up
+    """
+    if REGISTRY.get_warm_up_error() is not None:
+        OUTPUT1.text = 'The price model could not be built: ' + \
+                       str(REGISTRY.get_warm_up_error())
+        curdoc().remove_periodic_callback(WARM_UP_CALLBACK)
+    elif REGISTRY.is_ready:
+        curdoc().remove_periodic_callback(WARM_UP_CALLBACK)
+        BUTTON_1.disabled = False
+        update()
+
 # Submit prediction and update map at each clicking of button 1
 BUTTON_1.on_click(update)
 # Clear output at each clicking of button 2
 BUTTON_2.on_click(reset)
 
-# Load initial map
-update()
+# Load initial map, or wait for the model to warm up first
+if REGISTRY.is_ready:
+    update()
+else:
+    OUTPUT1.text = 'The price model is warming up, please wait a moment...'
+    BUTTON_1.disabled = True
+    WARM_UP_CALLBACK = curdoc().add_periodic_callback(finish_warm_up, 250)
 
 # Define UI layout
 L1 = layout(children=[[LOGO], [DELIM_1], [BED, BATH, BUILTYEAR, ZIPCODE], [DELIM_2],
@@ -29,24 +29,46 @@ HOTTEST = [98004, 98006, 98007, 98008, 98112, 98033, 98034, 98039, 98040,
 MEDIUM_HOT = [98001, 98005, 98023, 98027, 98028, 98029, 98056, 98059, 98105,
               98107, 98116, 98118, 98119, 98122, 98125, 98133, 98155, 98199]
 
-def bidding_price(zipcode, list_price):
+# Sorted, de-duplicated tiers for vectorized lookups
+HOTTEST_ZIPCODES = np.unique(HOTTEST)
+MEDIUM_HOT_ZIPCODES = np.setdiff1d(MEDIUM_HOT, HOTTEST_ZIPCODES)
+
+# Random generator used when the caller does not supply one
+RNG = np.random.default_rng()
+
+def bidding_price(zipcode, list_price, rng=None):
     """
     This function implements a mathematical model to calculate bidding price of a house
     :param zipcode: Zipcode of house entered by user
     :param list_price: List price of house entered by user
+    :param rng: A seed or numpy.random.Generator for the markup, optional
     :return: returns the estimated bidding price
     """
-    if zipcode in HOTTEST:
-        add_price = (np.random.randint(12, 18, None, int)/100)*list_price
-        bid_price = list_price + add_price
-    elif zipcode in MEDIUM_HOT:
-        add_price = (np.random.randint(5, 10, None, int)/100)*list_price
-        bid_price = list_price + add_price
-    else:
-        add_price = (np.random.randint(5, 10, None, int) / 100) * list_price
-        bid_price = list_price - add_price
-
-    return bid_price
+    return float(bidding_prices(zipcode, list_price, rng))
+
+def bidding_prices(zipcodes, list_prices, rng=None):
+    """
+    Calculates bidding prices for many houses at once: 12-17% over list in the
+    hottest zipcodes, 5-9% over list in medium hot ones, and 5-9% under list
+    everywhere else
+    :param zipcodes: Array of zipcodes, broadcast against the list prices
+    :param list_prices: Array of list prices
+    :param rng: A seed or numpy.random.Generator for the markups, optional
+    :return: returns an array of estimated bidding prices
+    """
+    zipcodes, list_prices = np.broadcast_arrays(np.asarray(zipcodes),
+                                                np.asarray(list_prices, dtype=float))
+    rng = RNG if rng is None else np.random.default_rng(rng)
+
+    # Classify every house, then draw all of the markups in one call
+    is_hottest = np.isin(zipcodes, HOTTEST_ZIPCODES)
+    is_medium_hot = np.isin(zipcodes, MEDIUM_HOT_ZIPCODES)
+    low = np.where(is_hottest, 12, 5)
+    high = np.where(is_hottest, 18, 10)
+    sign = np.where(is_hottest | is_medium_hot, 1., -1.)
+    add_price = (rng.integers(low, high) / 100) * list_prices
+
+    return list_prices + sign * add_price
 
 def submit():
     """
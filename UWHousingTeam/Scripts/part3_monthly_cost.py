@@ -10,9 +10,10 @@ Then you may go to the FirstStop landing page to click the calculating monthly c
 
 '''
 
+import numpy as np
 from bokeh.io import curdoc
 from bokeh.layouts import layout
-from bokeh.models.widgets import Button, TextInput, Select, Slider, Paragraph, Div
+from bokeh.models.widgets import Button, TextInput, Select, Slider, Paragraph, Div, PreText
 
 
 LOGO = Div(text="""<img src="https://s3-us-west-2.amazonaws.com/data515logo/logo_title_thinner.PNG" \
@@ -26,28 +27,78 @@ HOUSE_TYPE = Select(title="House type:", value="single family house", options=['
 
 BUTTON_1 = Button(label="Submit")
 BUTTON_2 = Button(label="Reset")
-OUTPUT = Paragraph(width=600, height=300) #or use pretext, for a <pre> tag in html
-
+OUTPUT = Paragraph(width=600, height=50) #or use pretext, for a <pre> tag in html
+GRID_OUTPUT = PreText(width=600, height=250)
+
+# The following percentage values are specifically for king county areas,
+# as fractions of the loan principal repaid per month on a straight line
+PROPERTY_TAX_RATE = 0.15
+INSURANCE_RATE = 0.07
+UTILITIES_RATE = 0.15
+SERVICES_RATE = 0.035
+HOA_RATES = {'condo': 0.11, 'townhouse': 0.11}
+HOA_RATE_DEFAULT = 0.035
+
+# The rates, periods and house types of the sensitivity grid
+GRID_RATES = np.round(np.arange(INTEREST_RATE.start, INTEREST_RATE.end + INTEREST_RATE.step / 2,
+                                INTEREST_RATE.step), 1)
+GRID_PERIODS = np.array([float(period) for period in MORTGATE_PERIOD.options])
+GRID_HOUSE_TYPES = np.array(HOUSE_TYPE.options)
+
+
+def amortized_payment(principal, mortgage_period, interest_rate):
+    '''
+    calculate the fixed monthly payment that repays the principal over the
+    period in years at the annual interest rate in percent; the arguments
+    may be arrays, which are broadcast
+    '''
+    principal, months, monthly_rate = np.broadcast_arrays(
+        np.asarray(principal, dtype=float),
+        np.asarray(mortgage_period, dtype=float) * 12,
+        np.asarray(interest_rate, dtype=float) / 1200)
+    assert np.all(months > 0), 'The mortgage period must be positive.'
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = principal * monthly_rate / (1 - (1 + monthly_rate) ** -months)
+    return np.where(monthly_rate == 0, principal / months, payment)
 
 def monthly_expenses(list_price, mortgage_period, interest_rate, house_type):
     '''
     calculate monthly expenses
     '''
-    mortgage = list_price/(mortgage_period*12)
-    interest = (interest_rate/100)*mortgage
-
-    # the following percentage values are specifically for king county areas
-    property_tax = 0.15 * mortgage
-    insurance = 0.07 * mortgage
-    utilities = 0.15 * mortgage
-    services = 0.035 * mortgage
-    if house_type in ['condo', 'townhouse']:
-        hoa = 0.11 * mortgage
-    else:
-        hoa = 0.035 * mortgage
-    monthly_expenses = mortgage + interest + property_tax + insurance + utilities + services + hoa
-
-    return monthly_expenses
+    return float(monthly_expenses_grid(list_price, mortgage_period, interest_rate, house_type))
+
+def monthly_expenses_grid(list_price, mortgage_period, interest_rate, house_type):
+    '''
+    calculate monthly expenses for arrays of inputs, which are broadcast, so
+    e.g. rates[:, None, None], periods[None, :, None] and house
+    types[None, None, :] fill a whole sensitivity grid in one call
+    '''
+    list_price = np.asarray(list_price, dtype=float)
+    mortgage_period = np.asarray(mortgage_period, dtype=float)
+    assert np.all(mortgage_period > 0), 'The mortgage period must be positive.'
+    house_type = np.asarray(house_type)
+    mortgage = list_price / (mortgage_period * 12)
+
+    hoa_rate = np.full(house_type.shape, HOA_RATE_DEFAULT)
+    for hoa_house_type, rate in HOA_RATES.items():
+        hoa_rate[house_type == hoa_house_type] = rate
+    loading = PROPERTY_TAX_RATE + INSURANCE_RATE + UTILITIES_RATE + SERVICES_RATE + hoa_rate
+
+    return amortized_payment(list_price, mortgage_period, interest_rate) + loading * mortgage
+
+def format_grid(grid, house_type):
+    '''
+    format the whole-percent rates of the sensitivity grid for one house type
+    '''
+    type_index = int(np.flatnonzero(GRID_HOUSE_TYPES == house_type)[0])
+    lines = ['Monthly cost ($) for a ' + house_type + ' by interest rate and period',
+             'rate ' + ''.join('{:>10}'.format(str(int(period)) + ' yr')
+                               for period in GRID_PERIODS)]
+    for rate_index in np.flatnonzero(GRID_RATES == np.round(GRID_RATES)):
+        lines.append('{:>3}% '.format(int(GRID_RATES[rate_index])) +
+                     ''.join('{:>10,}'.format(int(value))
+                             for value in grid[rate_index, :, type_index]))
+    return '\n'.join(lines)
 
 def submit():
     '''
@@ -56,19 +107,23 @@ def submit():
     value = monthly_expenses(float(LISTPRICE.value), float(MORTGATE_PERIOD.value), \
         float(INTEREST_RATE.value), HOUSE_TYPE.value)
     OUTPUT.text = 'Your estimated monthly cost is: ' + str(int(value)) + ' $'
-    
+    grid = monthly_expenses_grid(float(LISTPRICE.value), GRID_PERIODS[None, :, None],
+                                 GRID_RATES[:, None, None], GRID_HOUSE_TYPES[None, None, :])
+    GRID_OUTPUT.text = format_grid(grid, HOUSE_TYPE.value)
+
 def reset():
     '''
     click to reset
     '''
     OUTPUT.text = None
+    GRID_OUTPUT.text = ''
 
 BUTTON_1.on_click(submit)
 
 BUTTON_2.on_click(reset)
 
 LAY_OUT = layout(children=[[LOGO], [LISTPRICE], [MORTGATE_PERIOD], [INTEREST_RATE], \
-    [HOUSE_TYPE], [BUTTON_1], [BUTTON_2], [OUTPUT]], sizing_mode='fixed')
+    [HOUSE_TYPE], [BUTTON_1], [BUTTON_2], [OUTPUT], [GRID_OUTPUT]], sizing_mode='fixed')
 
 curdoc().add_root(LAY_OUT)
 curdoc().title = "Predict the monthly cost of your first home"
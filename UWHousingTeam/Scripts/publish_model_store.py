@@ -0,0 +1,46 @@
+"""
+Contains the publisher of the shared model store read by model_registry.py.
+
+The house price model is built, or loaded from MODEL_ARTIFACT_FILE as the
+registry would load it, and the map data is sorted for the comparable homes
+index.  Both are written to a store that every server process then attaches
+to read-only, e.g.:
+
+python publish_model_store.py /dev/shm/house_price_store
+SHARED_MODEL_STORE=/dev/shm/house_price_store bokeh serve --num-procs 4 part1_predict_price.py
+"""
+import argparse
+import os
+
+import shared_model_store
+from comparable_homes_index import ComparableHomesIndex
+from house_price_model_2 import HousePriceModel
+from sales_data_schema import read_sales_csv
+
+
+def publish(store_path, main_data_file='main_data.csv'):
+    """
+    Builds the house price model and the comparable homes index, and writes
+    them to a shared model store.
+    :param store_path: The directory of the store
+    :param main_data_file: The path of the map data file
+    :return: None
+    """
+    artifact_file = os.environ.get('MODEL_ARTIFACT_FILE')
+    if artifact_file is not None:
+        model = HousePriceModel.load_or_initialize(artifact_file)
+    else:
+        model = HousePriceModel()
+        model.initialize_model()
+    index = ComparableHomesIndex(read_sales_csv(main_data_file, sep=','))
+    shared_model_store.write_store(store_path, model,
+                                   {'main_data': index.columns})
+    return None
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    PARSER.add_argument('store_path')
+    PARSER.add_argument('--main-data', default='main_data.csv')
+    ARGUMENTS = PARSER.parse_args()
+    publish(ARGUMENTS.store_path, ARGUMENTS.main_data)
@@ -0,0 +1,95 @@
+"""
+Contains a bounded least-recently-used cache of responses.
+
+The widgets of the Bokeh apps allow only a small set of inputs, so the same
+requests arrive again and again.  The cache keeps the most recently used
+responses, keyed by the normalized request, and forgets all of them when the
+model version they were computed with changes.
+"""
+import collections
+import threading
+
+
+class ResponseCache(object):
+    """
+    Contains a bounded least-recently-used cache of responses.
+    """
+
+    def __init__(self, max_size=1024):
+        """
+        Initializes the cache.
+        :param max_size: The largest number of responses to keep
+        """
+        self.entries = collections.OrderedDict()
+        self.evictions = 0
+        self.hits = 0
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.misses = 0
+        self.version = None
+        return None
+
+    def clear(self):
+        """
+        Forgets every cached response.  The counters are kept.
+        :return: None
+        """
+        with self.lock:
+            self.entries.clear()
+        return None
+
+    def get_or_compute(self, key, compute, version=None):
+        """
+        Gets a cached response, or computes and caches it.
+        :param key: The normalized request, which must be hashable
+        :param compute: A function of no arguments that computes the response
+        :param version: The version of the model the response depends on.
+        The cache is cleared whenever a new version is given.
+        :return: The response
+        """
+
+        # Clear the cache if the model has been rebuilt, then look for the
+        # response.
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+
+        # Compute the response outside of the lock, then cache it, evicting
+        # the least recently used responses if the cache is full.
+        response = compute()
+        with self.lock:
+            if version == self.version:
+                self.entries[key] = response
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return response
+
+    @staticmethod
+    def normalize(features):
+        """
+        Normalizes a dictionary of request features into a cache key.
+        :param features: The request features
+        :return: A hashable key that is the same for equal features
+        """
+        return tuple(sorted((name, float(value))
+                            for name, value in features.items()))
+
+    def statistics(self):
+        """
+        Gets the counters of the cache.
+        :return: A dictionary of the size, hits, misses and evictions
+        """
+        with self.lock:
+            return {'size': len(self.entries),
+                    'max_size': self.max_size,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'version': self.version}
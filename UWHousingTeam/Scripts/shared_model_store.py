@@ -0,0 +1,127 @@
+"""
+Contains a store of a fitted house price model, and of read-only columns of
+data, that worker processes share.
+
+One parent process writes the store: the fitted model as a saved artifact,
+and each named set of columns as one .npy file per column.  Workers attach
+to it, loading the small model artifact and memory-mapping the columns
+read-only, so that every worker reads the same pages of the page cache
+instead of holding its own copy of the data.  The store is written to a
+memory file system, /dev/shm, where there is one.
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from house_price_model_2 import HousePriceModel
+
+# Constants
+MANIFEST_FILE = 'manifest.json'
+MODEL_FILE = 'model.pkl'
+SHARED_MEMORY_PATH = '/dev/shm'
+STORE_VERSION = 1
+
+
+def attach_store(store_path):
+    """
+    Attaches to a store written by write_store().
+    :param store_path: The directory of the store
+    :return: The house price model, and a dictionary of the column sets, each
+    a dictionary of read-only memory-mapped arrays by column name
+    """
+
+    # Assert that the store is complete, and has the expected version.
+    manifest_path = os.path.join(store_path, MANIFEST_FILE)
+    assert os.path.exists(manifest_path), \
+        'There is no complete model store in \'{}\'.'.format(store_path)
+    with open(manifest_path, 'r') as input_file:
+        manifest = json.load(input_file)
+    assert manifest.get('version') == STORE_VERSION, \
+        'The model store \'{}\' has version {}, but version {} is ' \
+        'required.'.format(store_path, manifest.get('version'), STORE_VERSION)
+
+    # Load the model, and map the columns.
+    model = HousePriceModel.load(os.path.join(store_path, MODEL_FILE),
+                                 check_training_data=False)
+    column_sets = {}
+    for set_name, columns in manifest['column_sets'].items():
+        column_sets[set_name] = {
+            column['name']: np.load(os.path.join(store_path, column['file']),
+                                    mmap_mode='r')
+            for column in columns}
+    return model, column_sets
+
+
+def create_store_path(prefix='house_price_store_'):
+    """
+    Creates a new empty directory for a store, on the memory file system
+    where there is one.
+    :param prefix: The prefix of the directory name
+    :return: The path of the directory
+    """
+    directory = SHARED_MEMORY_PATH if os.path.isdir(SHARED_MEMORY_PATH) \
+        else None
+    return tempfile.mkdtemp(prefix=prefix, dir=directory)
+
+
+def remove_store(store_path):
+    """
+    Removes a store.  Workers that are attached keep their mapped columns
+    until they exit.
+    :param store_path: The directory of the store
+    :return: None
+    """
+    shutil.rmtree(store_path, ignore_errors=True)
+    return None
+
+
+def write_store(store_path, model, column_sets=None):
+    """
+    Writes a store of a fitted model and of sets of columns.
+    :param store_path: The directory of the store, which is created if it
+    does not exist
+    :param model: A house price model ready for prediction
+    :param column_sets: A dictionary of column sets by name, each a data
+    frame or a dictionary of arrays.  Columns of Python objects cannot be
+    mapped, and are not allowed.
+    :return: None
+    """
+
+    # Remove any existing manifest first, so that a partially written store
+    # is never attached to.
+    if not os.path.isdir(store_path):
+        os.makedirs(store_path)
+    manifest_path = os.path.join(store_path, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    # Write the model, then each column.  Column files are named by position,
+    # since column names may contain spaces.
+    model.save(os.path.join(store_path, MODEL_FILE))
+    manifest_sets = {}
+    for set_index, (set_name, columns) in enumerate(
+            sorted((column_sets or {}).items())):
+        manifest_sets[set_name] = []
+        for column_index, name in enumerate(columns.keys()):
+            values = np.ascontiguousarray(columns[name])
+            assert values.dtype != object, 'The column \'{}\' of \'{}\' ' \
+                                           'holds Python objects, which ' \
+                                           'cannot be shared.'.format(
+                                               name, set_name)
+            file_name = '{:02d}_{:02d}.npy'.format(set_index, column_index)
+            np.save(os.path.join(store_path, file_name), values)
+            manifest_sets[set_name].append({'name': name,
+                                            'dtype': str(values.dtype),
+                                            'file': file_name})
+
+    # Write the manifest last.
+    temporary_path = '{}.tmp'.format(manifest_path)
+    with open(temporary_path, 'w') as output_file:
+        json.dump({'version': STORE_VERSION,
+                   'training_data_hash': model.get_training_data_hash(),
+                   'column_sets': manifest_sets}, output_file, indent=2)
+    os.replace(temporary_path, manifest_path)
+    return None
@@ -0,0 +1,144 @@
+"""
+Loads the King County sales data into the housePrices table of a SQLite
+database.
+
+Rows are inserted in batches with parameter binding inside one transaction,
+and the indexes are created after the bulk insert.  Run this file from the
+data folder to build housePrices.db from Merged_Data.csv.
+"""
+import csv
+import itertools
+import sqlite3
+import time
+
+# Constants
+BATCH_SIZE = 10000
+CSV_PATH = 'Merged_Data.csv'
+DATABASE_PATH = 'housePrices.db'
+
+# The columns of the housePrices table and their types, in the order of the
+# CSV columns.  The CSV column 'List price' is stored as list_price.  Values
+# are bound as the CSV text, and SQLite converts them by column type; e.g.
+# the price text "2.38E+06" is stored as the integer 2380000.
+COLUMNS = (('id', 'integer'),
+           ('date', 'text'),
+           ('price', 'integer'),
+           ('bedrooms', 'integer'),
+           ('bathrooms', 'numeric'),
+           ('sqft_living', 'integer'),
+           ('sqft_lot', 'integer'),
+           ('floors', 'numeric'),
+           ('waterfront', 'integer'),
+           ('view', 'integer'),
+           ('condition', 'integer'),
+           ('grade', 'integer'),
+           ('sqft_above', 'integer'),
+           ('sqft_basement', 'integer'),
+           ('yr_built', 'integer'),
+           ('yr_renovated', 'integer'),
+           ('zipcode', 'integer'),
+           ('lat', 'numeric'),
+           ('long', 'numeric'),
+           ('sqft_living15', 'integer'),
+           ('sqft_lot15', 'integer'),
+           ('list_price', 'integer'))
+
+# The indexes created after the bulk insert, by name.  The comparables index
+# answers the map query for homes like a predicted one.
+INDEXES = (('idx_housePrices_zipcode', 'zipcode'),
+           ('idx_housePrices_date', 'date'),
+           ('idx_housePrices_price', 'price'),
+           ('idx_housePrices_lat_long', 'lat, long'),
+           ('idx_housePrices_comparables', 'bedrooms, bathrooms, list_price'))
+
+
+def create_table(connection):
+    """
+    Creates the housePrices table, dropping any existing one.
+
+    :param connection: The database connection
+    :return: None
+    """
+    connection.execute('DROP TABLE IF EXISTS housePrices')
+    connection.execute('CREATE TABLE housePrices ({})'.format(
+        ', '.join('{} {}'.format(name, column_type)
+                  for name, column_type in COLUMNS)))
+    return None
+
+
+def create_indexes(connection):
+    """
+    Creates the indexes of the housePrices table.
+
+    :param connection: The database connection
+    :return: None
+    """
+    for index_name, index_columns in INDEXES:
+        connection.execute('CREATE INDEX {} ON housePrices ({})'.format(
+            index_name, index_columns))
+    return None
+
+
+def load_house_prices(csv_path=CSV_PATH, database_path=DATABASE_PATH,
+                      batch_size=BATCH_SIZE):
+    """
+    Loads the sales data CSV into the housePrices table.
+
+    :param csv_path: The path of the sales data CSV
+    :param database_path: The path of the SQLite database
+    :param batch_size: The number of rows inserted per executemany call
+    :return: The number of rows loaded, and the seconds taken
+    """
+    start = time.time()
+    insert = 'INSERT INTO housePrices VALUES ({})'.format(
+        ', '.join('?' * len(COLUMNS)))
+
+    # Manage the transaction explicitly, and relax durability for the load;
+    # a failed load is simply run again.  The database is returned to a
+    # rollback journal afterwards, since readers open it read-only and a
+    # write-ahead log needs its -wal and -shm files to be writable.
+    connection = sqlite3.connect(database_path, isolation_level=None)
+    try:
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=OFF')
+        connection.execute('BEGIN')
+        create_table(connection)
+        rows = 0
+        for batch in read_batches(csv_path, batch_size):
+            connection.executemany(insert, batch)
+            rows += len(batch)
+        create_indexes(connection)
+        connection.execute('COMMIT')
+        connection.execute('PRAGMA journal_mode=DELETE')
+    except Exception:
+        if connection.in_transaction:
+            connection.execute('ROLLBACK')
+        raise
+    finally:
+        connection.close()
+    return rows, time.time() - start
+
+
+def read_batches(csv_path, batch_size):
+    """
+    Reads the sales data CSV in batches of rows.
+
+    :param csv_path: The path of the sales data CSV
+    :param batch_size: The number of rows per batch
+    :return: A generator of lists of rows
+    """
+    with open(csv_path, 'r') as input_file:
+        csv_input_file = csv.reader(input_file)
+        next(csv_input_file)
+        while True:
+            batch = list(itertools.islice(csv_input_file, batch_size))
+            if not batch:
+                break
+            yield batch
+
+
+if __name__ == '__main__':
+    LOADED_ROWS, SECONDS = load_house_prices()
+    print('Loaded {} rows in {:.3f} s ({:,.0f} rows/s)'.format(
+        LOADED_ROWS, SECONDS, LOADED_ROWS / SECONDS))
+
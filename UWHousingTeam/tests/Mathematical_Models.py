@@ -0,0 +1,179 @@
+# importing required packages
+import numpy as np
+import pandas as pd
+
+# Model for calculating bidding price for a house
+
+hottest = [98004, 98006, 98007, 98008, 98112, 98033, 98034, 98039, 98040,
+           98052, 98053, 98074, 98075, 98077, 98103, 98112, 98177, 98115, 98117]
+medium_hot = [98001, 98005, 98023, 98027, 98028, 98029, 98056, 98059, 98105,
+              98107, 98116, 98118, 98119, 98122, 98125, 98133, 98155, 98199]
+
+# sorted, de-duplicated tiers for vectorized lookups
+hottest_zipcodes = np.unique(hottest)
+medium_hot_zipcodes = np.setdiff1d(medium_hot, hottest_zipcodes)
+
+# random generator used when the caller does not supply one
+rng_default = np.random.default_rng()
+
+def bidding_price(zipcode, list_price, rng=None):
+    return float(bidding_prices(zipcode, list_price, rng))
+
+def bidding_prices(zipcodes, list_prices, rng=None):
+    # zipcodes and list prices are broadcast against each other; rng may be
+    # a seed or a numpy.random.Generator
+    zipcodes, list_prices = np.broadcast_arrays(np.asarray(zipcodes),
+                                                np.asarray(list_prices, dtype=float))
+    rng = rng_default if rng is None else np.random.default_rng(rng)
+
+    # classify every listing, then draw all of the markups (in percent) at once:
+    # 12-17% over list in the hottest zipcodes, 5-9% over in medium hot ones,
+    # and 5-9% under everywhere else
+    is_hottest = np.isin(zipcodes, hottest_zipcodes)
+    is_medium_hot = np.isin(zipcodes, medium_hot_zipcodes)
+    low = np.where(is_hottest, 12, 5)
+    high = np.where(is_hottest, 18, 10)
+    sign = np.where(is_hottest | is_medium_hot, 1., -1.)
+    add_price = (rng.integers(low, high) / 100) * list_prices
+
+    return list_prices + sign * add_price
+
+# the following percentage values are specifically for king county areas,
+# as fractions of the loan principal repaid per month on a straight line
+property_tax_rate = 0.15
+insurance_rate = 0.07
+utilities_rate = 0.15
+services_rate = 0.035
+hoa_rates = {'condo': 0.11, 'townhouse': 0.11}
+hoa_rate_default = 0.035
+
+def amortized_payment(principal, mortgage_period, interest_rate):
+    # fixed monthly payment that repays the principal over the period in years
+    # at the annual interest rate in percent; arguments are broadcast
+    principal, months, monthly_rate = np.broadcast_arrays(
+        np.asarray(principal, dtype=float),
+        np.asarray(mortgage_period, dtype=float) * 12,
+        np.asarray(interest_rate, dtype=float) / 1200)
+    assert np.all(months > 0), 'The mortgage period must be positive.'
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = principal * monthly_rate / (1 - (1 + monthly_rate) ** -months)
+    return np.where(monthly_rate == 0, principal / months, payment)
+
+def monthly_expenses(list_price, mortgage_period, interest_rate, house_type):
+    return float(monthly_expenses_grid(list_price, mortgage_period,
+                                       interest_rate, house_type))
+
+def monthly_expenses_grid(list_price, mortgage_period, interest_rate, house_type):
+    # all arguments are broadcast, so e.g. rates[:, None, None],
+    # periods[None, :, None] and house types[None, None, :] fill a whole
+    # sensitivity grid in one call
+    list_price = np.asarray(list_price, dtype=float)
+    mortgage_period = np.asarray(mortgage_period, dtype=float)
+    assert np.all(mortgage_period > 0), 'The mortgage period must be positive.'
+    house_type = np.asarray(house_type)
+    mortgage = list_price / (mortgage_period * 12)
+
+    hoa_rate = np.full(house_type.shape, hoa_rate_default)
+    for hoa_house_type, rate in hoa_rates.items():
+        hoa_rate[house_type == hoa_house_type] = rate
+    loading = property_tax_rate + insurance_rate + utilities_rate + \
+        services_rate + hoa_rate
+
+    return amortized_payment(list_price, mortgage_period, interest_rate) + \
+        loading * mortgage
+
+def amortization_schedule(list_price, mortgage_period, interest_rate):
+    # month-by-month schedules for loans given by broadcast 1-d arrays, as a
+    # dictionary of (loans x months) arrays; months after a loan is paid off
+    # are zero
+    blocks = [block for months, block in
+              iter_amortization_schedule(list_price, mortgage_period, interest_rate,
+                                         block_months=None)]
+    return blocks[0] if blocks else {}
+
+def amortization_summary(list_price, mortgage_period, interest_rate, start_date='2017-01'):
+    # per-loan totals and payoff dates, without building the schedules; the
+    # first payment is due in the month of start_date
+    principal, payment, monthly_rate, months = loan_terms(list_price, mortgage_period,
+                                                          interest_rate)
+    total_paid = payment * months
+    return {'payment': payment,
+            'total_paid': total_paid,
+            'total_interest': total_paid - principal,
+            'payoff_date': np.datetime64(start_date, 'M') + (months - 1)}
+
+def iter_amortization_schedule(list_price, mortgage_period, interest_rate, block_months=12):
+    # yields (month numbers, schedule block) pairs, each block a dictionary of
+    # (loans x block_months) arrays, so that long schedules for many loans can
+    # be consumed without holding them all; block_months=None yields one block
+    principal, payment, monthly_rate, months = loan_terms(list_price, mortgage_period,
+                                                          interest_rate)
+    total_months = int(months.max()) if months.size else 0
+    block_months = block_months or max(total_months, 1)
+    for first_month in range(1, total_months + 1, block_months):
+        month = np.arange(first_month, min(first_month + block_months, total_months + 1))
+        yield month, schedule_block(principal, payment, monthly_rate, months, month)
+
+def loan_terms(list_price, mortgage_period, interest_rate):
+    # principal, fixed monthly payment, monthly rate and number of months of
+    # each loan, as 1-d arrays
+    principal, mortgage_period, interest_rate = [
+        np.atleast_1d(value).astype(float) for value in np.broadcast_arrays(
+            np.asarray(list_price), np.asarray(mortgage_period), np.asarray(interest_rate))]
+    months = np.round(mortgage_period * 12).astype(int)
+    payment = amortized_payment(principal, mortgage_period, interest_rate)
+    return principal, payment, interest_rate / 1200, months
+
+def schedule_block(principal, payment, monthly_rate, months, month):
+    # closed-form balance after each month k: P(1+i)^k - A((1+i)^k - 1)/i,
+    # or P - A k when i is zero
+    principal, payment, monthly_rate, months = [
+        value[:, None] for value in (principal, payment, monthly_rate, months)]
+    month = month[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        def balance_after(k):
+            growth = (1 + monthly_rate) ** k
+            balance = np.where(monthly_rate == 0, principal - payment * k,
+                               principal * growth - payment * (growth - 1) / monthly_rate)
+            return np.where(k >= months, 0., balance)
+        balance = balance_after(month)
+        previous_balance = balance_after(month - 1)
+
+    active = month <= months
+    interest = np.where(active, previous_balance * monthly_rate, 0.)
+    principal_paid = previous_balance - balance
+    paid = np.minimum(month, months)
+    return {'payment': np.where(active, interest + principal_paid, 0.),
+            'interest': interest,
+            'principal': principal_paid,
+            'balance': balance,
+            'cumulative_interest': payment * paid - (principal - balance)}
+
+def write_amortization_csv(path, list_price, mortgage_period, interest_rate,
+                           start_date='2017-01', block_months=12):
+    # streams the schedules to a csv file one block of months at a time;
+    # rows are ordered by block, then loan, then month
+    columns = ['payment', 'interest', 'principal', 'balance', 'cumulative_interest']
+    row_format = '%d,%d,%s' + ',%.2f' * len(columns) + '\n'
+    start_month = np.datetime64(start_date, 'M')
+    rows = 0
+    with open(path, 'w') as output_file:
+        output_file.write('loan,month,date,' + ','.join(columns) + '\n')
+        for month, block in iter_amortization_schedule(list_price, mortgage_period,
+                                                       interest_rate, block_months):
+            active = block['payment'] > 0
+            loan_index, month_index = np.nonzero(active)
+            dates = (start_month + (month[month_index] - 1)).astype(str)
+            values = [block[column][active].tolist() for column in columns]
+            output_file.writelines(row_format % row for row in zip(
+                loan_index.tolist(), month[month_index].tolist(), dates.tolist(), *values))
+            rows += len(loan_index)
+    return rows
+
+#testing
+if __name__ == '__main__':
+    bid = bidding_price(98053, 650000)
+    print(bid)
+
+    exp = monthly_expenses(700000, 30, 5, 'condo')
+    print(exp)
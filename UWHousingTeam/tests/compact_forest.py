@@ -0,0 +1,264 @@
+"""
+Contains a compact inference form of a fitted sklearn random forest
+regressor.
+
+The nodes of every tree are flattened into contiguous arrays of split
+feature, threshold, left and right child, and value; only these arrays are
+needed for prediction.  Leaves point to themselves, so a block of rows walks
+a block of trees at once, one level per step, with no per-row Python, until
+every row rests at a leaf.  A large batch walks one tree at a time, so that
+the nodes of the tree stay in the cache, while a single row walks every tree
+at once.  A depth cap turns the nodes at that depth into leaves holding the
+mean response of their samples, trading accuracy for size and speed.
+
+Run this file to compare the compact form of the legacy controller's
+forest with the sklearn object.
+"""
+import time
+
+import numpy as np
+
+# Constants
+BLOCK_SIZE = 32768
+
+# The number of levels walked between checks for rows that reached a leaf.
+# Rows at a leaf stay there, so walking them a few levels more is cheaper
+# than checking every level.
+LEVELS_PER_CHECK = 4
+
+# The node arrays of a fitted sklearn tree, which hold its memory.
+SKLEARN_NODE_ARRAYS = ('children_left', 'children_right', 'feature',
+                       'threshold', 'impurity', 'n_node_samples',
+                       'weighted_n_node_samples', 'value')
+
+
+class CompactForest(object):
+    """
+    Contains a compact inference form of a fitted sklearn random forest
+    regressor.
+    """
+
+    def __init__(self, features, thresholds, left_children, right_children,
+                 values, roots, depth):
+        """
+        Initializes the compact forest.
+        :param features: The split feature of each node
+        :param thresholds: The split threshold of each node, in single
+        precision.  Rows go left if their feature value is at most the
+        threshold.
+        :param left_children: The left child of each node, or the node
+        itself for leaves
+        :param right_children: The right child of each node, or the node
+        itself for leaves
+        :param values: The predicted value of each node
+        :param roots: The root node of each tree
+        :param depth: The depth of the deepest tree
+        """
+        self.features = features
+        self.thresholds = thresholds
+        self.values = values
+
+        # Interleave the children for the traversal, so that the child of
+        # node i is at 2 * i if the row goes left, and 2 * i + 1 otherwise.
+        self.children = np.column_stack((left_children,
+                                         right_children)).ravel()
+        self.roots = roots
+        self.depth = depth
+        return None
+
+    @classmethod
+    def from_forest(cls, forest, max_depth=None):
+        """
+        Flattens a fitted random forest regressor.
+        :param forest: The fitted sklearn random forest regressor
+        :param max_depth: The depth at which to cut the trees, or None to
+        keep them whole
+        :return: The compact forest
+        """
+        features = []
+        thresholds = []
+        left_children = []
+        right_children = []
+        values = []
+        roots = []
+        depth = 0
+        offset = 0
+        for estimator in forest.estimators_:
+
+            # Find the depth of every node, one level of the tree at a time,
+            # and the nodes that are kept.
+            tree = estimator.tree_
+            node_depths = np.zeros(tree.node_count, dtype=np.int64)
+            level = np.zeros(1, dtype=np.int64)
+            level_depth = 0
+            while len(level) > 0:
+                node_depths[level] = level_depth
+                level = level[tree.children_left[level] >= 0]
+                level = np.concatenate((tree.children_left[level],
+                                        tree.children_right[level]))
+                level_depth += 1
+            is_leaf = tree.children_left < 0
+            kept = np.ones(tree.node_count, dtype=bool)
+            if max_depth is not None:
+                kept = node_depths <= max_depth
+                is_leaf = is_leaf | (node_depths == max_depth)
+
+            # Number the kept nodes from the offset, and point leaves at
+            # themselves.
+            numbers = np.cumsum(kept) - 1 + offset
+            node_numbers = numbers[kept]
+            leaves = is_leaf[kept]
+            left = np.where(leaves, node_numbers,
+                            numbers[np.maximum(tree.children_left[kept], 0)])
+            right = np.where(leaves, node_numbers,
+                             numbers[np.maximum(tree.children_right[kept], 0)])
+            features.append(np.where(leaves, 0, tree.feature[kept]))
+            thresholds.append(np.where(leaves, np.inf, tree.threshold[kept]))
+            left_children.append(left)
+            right_children.append(right)
+            values.append(tree.value[kept, 0, 0])
+            roots.append(offset)
+            depth = max(depth, int(node_depths[kept].max()))
+            offset += len(node_numbers)
+
+        # Concatenate the trees into contiguous arrays of the narrowest
+        # index type.  The thresholds are rounded down to single precision,
+        # which leaves every comparison with a single precision value as it
+        # was.
+        index_type = np.int32 if offset < 2 ** 31 else np.int64
+        thresholds = np.concatenate(thresholds)
+        single_thresholds = thresholds.astype(np.float32)
+        rounded_up = single_thresholds > thresholds
+        single_thresholds[rounded_up] = np.nextafter(
+            single_thresholds[rounded_up], np.float32(-np.inf))
+        return cls(np.concatenate(features).astype(np.int16),
+                   single_thresholds,
+                   np.concatenate(left_children).astype(index_type),
+                   np.concatenate(right_children).astype(index_type),
+                   np.concatenate(values).astype(np.float64),
+                   np.array(roots, dtype=index_type), depth)
+
+    def get_memory_footprint(self):
+        """
+        Gets the number of bytes held by the arrays of the compact forest.
+        :return: The number of bytes
+        """
+        return sum(array.nbytes for array in (
+            self.features, self.thresholds, self.children, self.values,
+            self.roots))
+
+    def predict(self, X):
+        """
+        Predicts the responses of a batch of rows, as the mean of the
+        predictions of the trees.
+        :param X: A matrix or data frame of predictors, one row per
+        observation
+        :return: A vector of predictions
+        """
+
+        # pylint: disable=invalid-name
+        # X is the name sklearn uses.
+
+        # Compare the predictors in single precision, as sklearn does.
+        # Visit the rows and trees in blocks of about BLOCK_SIZE row and
+        # tree pairs: many rows with one tree, or one row with many trees.
+        predictors = np.asarray(X, dtype=np.float32)
+        if predictors.ndim == 1:
+            predictors = predictors.reshape(1, -1)
+        batch_values = predictors.ravel()
+        predictions = np.zeros(len(predictors))
+        block_rows = max(1, min(len(predictors), BLOCK_SIZE))
+        block_trees = max(1, BLOCK_SIZE // block_rows)
+        for start in range(0, len(predictors), block_rows):
+            row_offsets = np.arange(
+                start, min(start + block_rows, len(predictors)),
+                dtype=self.roots.dtype) * predictors.shape[1]
+            for tree_start in range(0, len(self.roots), block_trees):
+                roots = self.roots[tree_start:tree_start + block_trees]
+
+                # Walk every row down every tree of the block, a few levels
+                # at a time, and set aside the row and tree pairs that have
+                # reached a leaf.  Every index is in bounds, so the indices
+                # are clipped rather than checked, which is faster.
+                nodes = np.repeat(roots, len(row_offsets))
+                offsets = np.tile(row_offsets, len(roots))
+                pairs = np.arange(len(nodes))
+                leaves = np.empty_like(nodes)
+                while len(pairs) > 0:
+                    for _ in range(LEVELS_PER_CHECK):
+                        goes_right = np.take(
+                            batch_values,
+                            offsets + np.take(self.features, nodes,
+                                              mode='clip'),
+                            mode='clip') > np.take(self.thresholds, nodes,
+                                                   mode='clip')
+                        nodes = np.take(self.children, nodes * 2 + goes_right,
+                                        mode='clip')
+                    at_leaf = np.take(self.children, nodes * 2,
+                                      mode='clip') == nodes
+                    leaves[pairs[at_leaf]] = nodes[at_leaf]
+                    moving = ~at_leaf
+                    pairs = pairs[moving]
+                    offsets = offsets[moving]
+                    nodes = nodes[moving]
+                predictions[start:start + len(row_offsets)] += np.take(
+                    self.values, leaves).reshape(len(roots), -1).sum(axis=0)
+        return predictions / len(self.roots)
+
+
+def compact_when_ready(forest_future, max_depth=None):
+    """
+    Waits for a random forest to be fitted, and flattens it.
+    :param forest_future: A future fitted sklearn random forest regressor
+    :param max_depth: The depth at which to cut the trees, or None to keep
+    them whole
+    :return: The compact forest
+    """
+    return CompactForest.from_forest(forest_future.result(), max_depth)
+
+
+def compare(forest, compact_forest, predictors):
+    """
+    Compares a compact forest with the sklearn forest it was made from.
+    :param forest: The fitted sklearn random forest regressor
+    :param compact_forest: The compact forest
+    :param predictors: A data frame of predictors for the comparison
+    :return: A dictionary of the memory footprints in bytes, the single row
+    and batch latencies in seconds, and the largest prediction difference
+    """
+    comparison = {'sklearn_bytes': get_forest_memory_footprint(forest),
+                  'compact_bytes': compact_forest.get_memory_footprint()}
+    for name, model in (('sklearn', forest), ('compact', compact_forest)):
+        start = time.time()
+        model.predict(predictors.iloc[:1])
+        comparison[name + '_single_seconds'] = time.time() - start
+        start = time.time()
+        comparison[name + '_predictions'] = model.predict(predictors)
+        comparison[name + '_batch_seconds'] = time.time() - start
+    comparison['largest_difference'] = float(np.max(np.abs(
+        comparison.pop('sklearn_predictions') -
+        comparison.pop('compact_predictions'))))
+    return comparison
+
+
+def get_forest_memory_footprint(forest):
+    """
+    Gets the number of bytes held by the node arrays of a fitted sklearn
+    random forest regressor.
+    :param forest: The fitted sklearn random forest regressor
+    :return: The number of bytes
+    """
+    return sum(getattr(estimator.tree_, name).nbytes
+               for estimator in forest.estimators_
+               for name in SKLEARN_NODE_ARRAYS)
+
+
+if __name__ == '__main__':
+    import house_price_model
+    MODEL_DATA = house_price_model.create_model_data_frame(
+        house_price_model.SALES_DATA)
+    PREDICTORS = MODEL_DATA.ix[:, 'price' != MODEL_DATA.columns]
+    _, FOREST = house_price_model.construct_models()
+    for MAX_DEPTH in (None, 16, 12):
+        print('max_depth={}: {}'.format(MAX_DEPTH, compare(
+            FOREST, CompactForest.from_forest(FOREST, MAX_DEPTH), PREDICTORS)))
@@ -0,0 +1,174 @@
+"""
+Contains an index of homes for finding comparable homes on the map.
+
+The homes are sorted once by bedrooms, bathrooms and list price.  A query
+for homes with a given number of bedrooms and bathrooms in a list price band
+then finds its rows with two binary searches, and only those rows are
+filtered further by year built and map area.  The sorted columns are kept
+as separate arrays, so that an index may be made over memory-mapped columns
+that are already sorted without copying them.
+
+DatabaseComparableHomesIndex answers the same queries from the SQLite
+database built by Database_HousePrice.py, so that only the matching homes
+are held in memory.
+"""
+import numpy as np
+import pandas as pd
+
+import house_price_database
+
+# Constants
+EARTH_RADIUS_KM = 6371.0
+
+
+class ComparableHomesIndex(object):
+    """
+    Contains an index of homes for finding comparable homes on the map.
+    """
+
+    def __init__(self, homes, price_column='List price', is_sorted=False):
+        """
+        Initializes the index.
+        :param homes: A data frame, or a dictionary of arrays, of homes with
+        bedrooms, bathrooms, list price, yr_built, lat and long columns
+        :param price_column: The name of the list price column
+        :param is_sorted: True if the homes are already sorted by bedrooms,
+        bathrooms and list price, as the columns of another index are, false
+        otherwise
+        """
+
+        # Sort the homes by bedrooms, then bathrooms, then list price.
+        self.columns = {name: np.asarray(homes[name]) for name in homes.keys()}
+        if not is_sorted:
+            order = np.lexsort((self.columns[price_column],
+                                self.columns['bathrooms'],
+                                self.columns['bedrooms']))
+            self.columns = {name: values[order]
+                            for name, values in self.columns.items()}
+
+        # Keep the sorted columns that queries search or filter on.
+        self.prices = self.columns[price_column]
+        self.yr_built = self.columns['yr_built']
+        self.latitudes = self.columns['lat']
+        self.longitudes = self.columns['long']
+
+        # Record the first and last row of each bedrooms and bathrooms group.
+        # An index of no homes has no groups.
+        bedrooms = self.columns['bedrooms']
+        bathrooms = self.columns['bathrooms']
+        if len(bedrooms) == 0:
+            self.groups = {}
+            return None
+        starts = np.flatnonzero(np.r_[True, (bedrooms[1:] != bedrooms[:-1]) |
+                                      (bathrooms[1:] != bathrooms[:-1])])
+        stops = np.r_[starts[1:], len(bedrooms)]
+        self.groups = {(int(bedrooms[start]), float(bathrooms[start])):
+                           (start, stop)
+                       for start, stop in zip(starts, stops)}
+        return None
+
+    def query(self, bedrooms, bathrooms, lower_price, upper_price,
+              built_after=None, bounds=None, center=None, radius_km=None):
+        """
+        Finds comparable homes.  Price and year bounds are exclusive.
+        :param bedrooms: The number of bedrooms
+        :param bathrooms: The number of bathrooms
+        :param lower_price: List prices must be above this price
+        :param upper_price: List prices must be below this price
+        :param built_after: Homes must be built after this year, if given
+        :param bounds: Homes must lie within this (south, west, north, east)
+        latitude and longitude box, if given
+        :param center: Homes must lie within radius_km of this (latitude,
+        longitude) point, if given
+        :param radius_km: The radius around the center, in kilometers
+        :return: A data frame of the comparable homes
+        """
+
+        # Find the rows for the bedrooms and bathrooms, then the rows in the
+        # price band by binary search within them.
+        start, stop = self.groups.get((int(bedrooms), float(bathrooms)), (0, 0))
+        prices = self.prices[start:stop]
+        rows = np.arange(start + np.searchsorted(prices, lower_price, 'right'),
+                         start + np.searchsorted(prices, upper_price, 'left'))
+
+        # Filter only the rows in the price band by year and map area.
+        if built_after is not None:
+            rows = rows[self.yr_built[rows] > built_after]
+        if bounds is not None:
+            south, west, north, east = bounds
+            latitudes = self.latitudes[rows]
+            longitudes = self.longitudes[rows]
+            rows = rows[(latitudes >= south) & (latitudes <= north) &
+                        (longitudes >= west) & (longitudes <= east)]
+        if center is not None:
+            rows = rows[ComparableHomesIndex.distance_km(
+                center, self.latitudes[rows], self.longitudes[rows]) <= radius_km]
+        return pd.DataFrame({name: values[rows]
+                             for name, values in self.columns.items()},
+                            index=rows, columns=list(self.columns))
+
+    @staticmethod
+    def distance_km(center, latitudes, longitudes):
+        """
+        Calculates great-circle distances from a point.
+        :param center: The (latitude, longitude) point
+        :param latitudes: The latitudes to measure to
+        :param longitudes: The longitudes to measure to
+        :return: The distances in kilometers
+        """
+        center_latitude, center_longitude = np.radians(center)
+        latitudes = np.radians(latitudes)
+        longitudes = np.radians(longitudes)
+        haversine = np.sin((latitudes - center_latitude) / 2.) ** 2 + \
+            np.cos(center_latitude) * np.cos(latitudes) * \
+            np.sin((longitudes - center_longitude) / 2.) ** 2
+        return 2. * EARTH_RADIUS_KM * np.arcsin(np.sqrt(haversine))
+
+
+class DatabaseComparableHomesIndex(object):
+    """
+    Contains an index of homes in the sales data database for finding
+    comparable homes on the map.
+    """
+
+    # The columns of the homes returned by queries.
+    COLUMNS = ('bedrooms', 'bathrooms', 'zipcode', 'lat', 'long', 'yr_built',
+               'price', 'List price')
+
+    def __init__(self, database_path):
+        """
+        Initializes the index.
+        :param database_path: The path of the SQLite database
+        """
+        self.database_path = database_path
+        return None
+
+    def query(self, bedrooms, bathrooms, lower_price, upper_price,
+              built_after=None, bounds=None, center=None, radius_km=None):
+        """
+        Finds comparable homes.  Price and year bounds are exclusive.  See
+        ComparableHomesIndex.query().
+        :return: A data frame of the comparable homes
+        """
+
+        # A radius is first narrowed to the box around it in the database.
+        if center is not None:
+            latitude_radius = np.degrees(radius_km / EARTH_RADIUS_KM)
+            longitude_radius = latitude_radius / np.cos(np.radians(center[0]))
+            radius_bounds = (center[0] - latitude_radius,
+                             center[1] - longitude_radius,
+                             center[0] + latitude_radius,
+                             center[1] + longitude_radius)
+            bounds = radius_bounds if bounds is None else (
+                max(bounds[0], radius_bounds[0]), max(bounds[1], radius_bounds[1]),
+                min(bounds[2], radius_bounds[2]), min(bounds[3], radius_bounds[3]))
+
+        # Select the homes, then keep those within the radius.
+        homes = house_price_database.query_comparable_homes(
+            self.database_path, bedrooms, bathrooms, lower_price, upper_price,
+            built_after=built_after, bounds=bounds,
+            columns=DatabaseComparableHomesIndex.COLUMNS)
+        if center is not None:
+            homes = homes[ComparableHomesIndex.distance_km(
+                center, homes['lat'].values, homes['long'].values) <= radius_km]
+        return homes
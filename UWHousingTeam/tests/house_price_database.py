@@ -0,0 +1,121 @@
+"""
+Contains read access to the housePrices table of the SQLite database built
+by Database_HousePrice.py.
+
+Rows are selected with SQL predicates that the table indexes can answer, and
+only the requested columns are read, so that a consumer holds only the rows
+and columns it needs.  Columns are returned with the names and types of the
+sales data schema.
+"""
+import sqlite3
+
+import pandas as pd
+
+import sales_data_schema
+
+# Constants
+TABLE = 'housePrices'
+
+# Schema column names that are stored under other names in the table.
+STORED_NAMES = {'List price': 'list_price'}
+
+
+def connect(database_path):
+    """
+    Opens a read-only connection to the database.
+
+    :param database_path: The path of the SQLite database
+    :return: The connection
+    """
+    return sqlite3.connect('file:{}?mode=ro'.format(database_path), uri=True)
+
+
+def query_comparable_homes(database_path, bedrooms, bathrooms, lower_price,
+                           upper_price, built_after=None, bounds=None,
+                           columns=None):
+    """
+    Selects comparable homes.  Price and year bounds are exclusive.
+
+    :param database_path: The path of the SQLite database
+    :param bedrooms: The number of bedrooms
+    :param bathrooms: The number of bathrooms
+    :param lower_price: List prices must be above this price
+    :param upper_price: List prices must be below this price
+    :param built_after: Homes must be built after this year, if given
+    :param bounds: Homes must lie within this (south, west, north, east)
+    latitude and longitude box, if given
+    :param columns: The schema names of the columns to select, or None for
+    every column
+    :return: A data frame of the comparable homes
+    """
+    predicates = ['bedrooms = ?', 'bathrooms = ?',
+                  'list_price > ?', 'list_price < ?']
+    parameters = [int(bedrooms), float(bathrooms),
+                  int(lower_price), int(upper_price)]
+    if built_after is not None:
+        predicates.append('yr_built > ?')
+        parameters.append(int(built_after))
+    if bounds is not None:
+        predicates.extend(['lat BETWEEN ? AND ?', 'long BETWEEN ? AND ?'])
+        south, west, north, east = bounds
+        parameters.extend([south, north, west, east])
+    return read_sales_data(database_path, columns=columns,
+                           where=' AND '.join(predicates),
+                           parameters=parameters)
+
+
+def read_sales_data(database_path, columns=None, where=None, parameters=(),
+                    chunksize=None):
+    """
+    Reads sales data from the database.
+
+    :param database_path: The path of the SQLite database
+    :param columns: The schema names of the columns to read, or None for
+    every column
+    :param where: An SQL predicate on the stored column names, if any
+    :param parameters: The parameters of the predicate
+    :param chunksize: The number of rows per chunk, or None to read every
+    row into one data frame
+    :return: A data frame of sales data, or a generator of data frames if a
+    chunk size is given
+    """
+
+    # Build the query, selecting each column under its schema name.
+    select = '*' if columns is None else ', '.join(
+        '"{}" AS "{}"'.format(STORED_NAMES.get(column, column), column)
+        for column in columns)
+    query = 'SELECT {} FROM {}'.format(select, TABLE)
+    if where is not None:
+        query += ' WHERE {}'.format(where)
+
+    # Read every row at once, or one chunk at a time.
+    if chunksize is not None:
+        return read_chunks(database_path, query, parameters, chunksize)
+    chunks = read_chunks(database_path, query, parameters, None)
+    sales_data = next(chunks)
+    chunks.close()
+    return sales_data
+
+
+def read_chunks(database_path, query, parameters, chunksize):
+    """
+    Runs a query, and converts the rows to the schema names and types.
+
+    :param database_path: The path of the SQLite database
+    :param query: The SQL query
+    :param parameters: The parameters of the query
+    :param chunksize: The number of rows per chunk, or None for one chunk
+    :return: A generator of data frames
+    """
+    connection = connect(database_path)
+    try:
+        chunks = pd.read_sql_query(query, connection, params=list(parameters),
+                                   chunksize=chunksize)
+        if chunksize is None:
+            chunks = [chunks]
+        for chunk in chunks:
+            chunk = chunk.rename(columns={stored: column for column, stored
+                                          in STORED_NAMES.items()})
+            yield sales_data_schema.apply_column_types(chunk)
+    finally:
+        connection.close()
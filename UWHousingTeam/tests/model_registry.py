@@ -0,0 +1,215 @@
+"""
+Contains a process-wide registry of the house price model and the map data.
+
+Bokeh executes an application script once for every session, but imported
+modules are shared by every session in the server process.  The registry
+builds the house price model once per process, in a background thread, so
+that sessions can render while the model is warming up, and so that later
+sessions reuse it.  The warm-up starts when this module is first imported.
+
+If the SALES_DATA_DATABASE environment variable names the SQLite database
+built by Database_HousePrice.py, the map queries and widget options are
+answered from the database instead of holding the map data in memory.
+
+If the SHARED_MODEL_STORE environment variable names a store written by
+publish_model_store.py, the model is loaded from it and the map data is
+memory-mapped from it instead, so that the server processes of e.g.
+"bokeh serve --num-procs 4" share one copy of the map data.
+"""
+import os
+import threading
+
+import numpy as np
+
+import house_price_database
+import shared_model_store
+from comparable_homes_index import ComparableHomesIndex, DatabaseComparableHomesIndex
+from house_price_model_2 import HousePriceModel
+from response_cache import ResponseCache
+from sales_data_schema import read_sales_csv
+
+
+class ModelRegistry(object):
+    """
+    Contains the house price model and the map data shared by every session.
+    """
+
+    def __init__(self, main_data_file="main_data.csv"):
+        """
+        Initializes the registry.
+        :param main_data_file: The path of the map data file
+        """
+        self.comparable_homes_cache = ResponseCache()
+        self.comparable_homes_index = None
+        self.lock = threading.Lock()
+        self.main_data = None
+        self.main_data_file = main_data_file
+        self.model = None
+        self.prediction_cache = ResponseCache()
+        self.shared_store = None
+        self.warm_up_error = None
+        self.warm_up_thread = None
+        return None
+
+    @staticmethod
+    def build_model():
+        """
+        Builds the house price model.  If the MODEL_ARTIFACT_FILE environment
+        variable is set, a saved model is loaded from it when current, and
+        saved to it otherwise.  The model only serves predictions, so its
+        training data is released once it is built.
+        :return: A house price model ready for prediction
+        """
+        artifact_file = os.environ.get("MODEL_ARTIFACT_FILE")
+        if artifact_file is not None:
+            return HousePriceModel.load_or_initialize(artifact_file,
+                                                      serving=True)
+        model = HousePriceModel(serving=True)
+        model.initialize_model()
+        return model
+
+    def get_comparable_homes_cache(self):
+        """
+        Gets the cache of comparable homes queries shared by every session.
+        :return: The comparable homes cache
+        """
+        return self.comparable_homes_cache
+
+    def get_comparable_homes_index(self):
+        """
+        Gets the index of the map data for finding comparable homes, building
+        it the first time it is requested.
+        :return: The comparable homes index
+        """
+        database_path = os.environ.get("SALES_DATA_DATABASE")
+        if database_path is not None:
+            with self.lock:
+                if self.comparable_homes_index is None:
+                    self.comparable_homes_index = \
+                        DatabaseComparableHomesIndex(database_path)
+                return self.comparable_homes_index
+        if os.environ.get("SHARED_MODEL_STORE") is not None:
+            main_data = self.get_shared_store()[1]["main_data"]
+            with self.lock:
+                if self.comparable_homes_index is None:
+                    self.comparable_homes_index = ComparableHomesIndex(
+                        main_data, is_sorted=True)
+                return self.comparable_homes_index
+        main_data = self.get_main_data()
+        with self.lock:
+            if self.comparable_homes_index is None:
+                self.comparable_homes_index = ComparableHomesIndex(main_data)
+            return self.comparable_homes_index
+
+    def get_distinct_values(self, column):
+        """
+        Gets the sorted distinct values of a map data column, e.g. for the
+        options of a widget.
+        :param column: The name of the column
+        :return: A list of the distinct values
+        """
+        database_path = os.environ.get("SALES_DATA_DATABASE")
+        if database_path is not None:
+            connection = house_price_database.connect(database_path)
+            try:
+                rows = connection.execute(
+                    'SELECT DISTINCT "{0}" FROM {1} ORDER BY "{0}"'.format(
+                        house_price_database.STORED_NAMES.get(column, column),
+                        house_price_database.TABLE)).fetchall()
+            finally:
+                connection.close()
+            return [row[0] for row in rows]
+        if os.environ.get("SHARED_MODEL_STORE") is not None:
+            return np.unique(
+                self.get_shared_store()[1]["main_data"][column]).tolist()
+        return sorted(set(self.get_main_data()[column].values.tolist()))
+
+    def get_main_data(self):
+        """
+        Gets the map data, reading it the first time it is requested.
+        :return: The map data
+        """
+        with self.lock:
+            if self.main_data is None:
+                self.main_data = read_sales_csv(self.main_data_file, sep=",")
+            return self.main_data
+
+    def get_model(self):
+        """
+        Gets the house price model.
+        :return: The house price model, or None if it is still warming up
+        """
+        return self.model
+
+    def get_prediction_cache(self):
+        """
+        Gets the cache of price predictions shared by every session.
+        :return: The prediction cache
+        """
+        return self.prediction_cache
+
+    def get_shared_store(self):
+        """
+        Gets the model and the map data of the store named by the
+        SHARED_MODEL_STORE environment variable, attaching to it the first
+        time they are requested.
+        :return: The house price model, and a dictionary of the column sets
+        """
+        with self.lock:
+            if self.shared_store is None:
+                self.shared_store = shared_model_store.attach_store(
+                    os.environ["SHARED_MODEL_STORE"])
+            return self.shared_store
+
+    def get_warm_up_error(self):
+        """
+        Gets the error that stopped the warm-up, if any.
+        :return: The error, or None
+        """
+        return self.warm_up_error
+
+    @property
+    def is_ready(self):
+        """
+        Determines if the house price model is ready for prediction.
+        :return: True if the model is ready, false otherwise
+        """
+        return self.model is not None
+
+    def start_warm_up(self):
+        """
+        Starts building the house price model in a background thread, unless
+        it has already been started.
+        :return: None
+        """
+        with self.lock:
+            if self.warm_up_thread is None:
+                self.warm_up_thread = threading.Thread(target=self.warm_up,
+                                                       name="model-warm-up")
+                self.warm_up_thread.daemon = True
+                self.warm_up_thread.start()
+        return None
+
+    def warm_up(self):
+        """
+        Builds the house price model, and records it, or the error that
+        stopped it.
+        :return: None
+        """
+
+        # pylint: disable=broad-except
+        # Any error is kept so that sessions can report it.
+        try:
+            if os.environ.get("SHARED_MODEL_STORE") is not None:
+                self.model = self.get_shared_store()[0]
+            else:
+                self.model = ModelRegistry.build_model()
+        except Exception as error:
+            self.warm_up_error = error
+        return None
+
+
+# The registry shared by every session in this process.  Start warming up
+# the model as soon as the first session imports it.
+REGISTRY = ModelRegistry()
+REGISTRY.start_warm_up()
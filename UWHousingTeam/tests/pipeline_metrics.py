@@ -0,0 +1,242 @@
+"""
+Contains collectors of timing metrics for the stages of the house price
+model pipeline.
+
+A MetricsCollector records the duration, row count and resident memory
+change of each stage as it runs, and exports the totals as a dictionary or
+in the Prometheus text format.  The model uses NULL_COLLECTOR unless it is
+given a collector; its stages do nothing, so that instrumentation costs
+almost nothing when it is disabled.
+"""
+import os
+import threading
+import time
+
+# Constants
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+STATM_PATH = '/proc/self/statm'
+
+
+def get_resident_memory():
+    """
+    Gets the resident set size of this process, where the platform reports
+    it.
+    :return: The resident set size in bytes, or None if it is not known
+    """
+    try:
+        with open(STATM_PATH, 'r') as statm_file:
+            return int(statm_file.read().split()[1]) * PAGE_SIZE
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+
+class MetricsCollector(object):
+    """
+    Contains a collector of timing metrics for the stages of a pipeline.
+    """
+
+    def __init__(self, measure_memory=True):
+        """
+        Initializes the collector.
+        :param measure_memory: True if the change in resident memory of each
+        stage should be recorded, false otherwise
+        """
+        self.lock = threading.Lock()
+        self.measure_memory = measure_memory
+        self.stages = {}
+        return None
+
+    def as_dict(self):
+        """
+        Gets the totals of every stage.
+        :return: A dictionary of the calls, total and largest seconds, total
+        rows, and total memory change in bytes of each stage, by stage name
+        """
+        with self.lock:
+            return {name: dict(totals) for name, totals in self.stages.items()}
+
+    def clear(self):
+        """
+        Forgets every recorded stage.
+        :return: None
+        """
+        with self.lock:
+            self.stages.clear()
+        return None
+
+    def record(self, name, seconds, rows=None, memory_delta=None):
+        """
+        Records one run of a stage.
+        :param name: The name of the stage
+        :param seconds: The duration of the run
+        :param rows: The number of rows processed, if known
+        :param memory_delta: The change in resident memory in bytes, if known
+        :return: None
+        """
+        with self.lock:
+            totals = self.stages.get(name)
+            if totals is None:
+                totals = self.stages[name] = {'calls': 0,
+                                              'seconds': 0.,
+                                              'max_seconds': 0.,
+                                              'rows': 0,
+                                              'memory_delta_bytes': 0}
+            totals['calls'] += 1
+            totals['seconds'] += seconds
+            totals['max_seconds'] = max(totals['max_seconds'], seconds)
+            totals['rows'] += rows or 0
+            totals['memory_delta_bytes'] += memory_delta or 0
+        return None
+
+    def stage(self, name, rows=None):
+        """
+        Times a stage run in a with statement, e.g.:
+
+        with collector.stage('fit_model', rows=len(data)):
+            model.fit(...)
+
+        A row count only known once the stage has run may be set on the
+        context manager's rows attribute before it exits.
+        :param name: The name of the stage
+        :param rows: The number of rows processed, if known
+        :return: A context manager that records the stage when it exits
+        """
+        return StageTimer(self, name, rows)
+
+    def to_prometheus(self, prefix='house_price_model'):
+        """
+        Exports the totals of every stage in the Prometheus text format.
+        :param prefix: The prefix of the metric names
+        :return: The metrics text
+        """
+        metrics = (('calls', 'counter', 'Runs of the stage.'),
+                   ('seconds', 'counter', 'Total seconds spent in the stage.'),
+                   ('max_seconds', 'gauge', 'Longest run of the stage.'),
+                   ('rows', 'counter', 'Total rows processed by the stage.'),
+                   ('memory_delta_bytes', 'gauge',
+                    'Total change in resident memory over runs of the stage, '
+                    'which falls when memory is released.'))
+        stages = self.as_dict()
+        lines = []
+        for metric, metric_type, description in metrics:
+            name = '{}_stage_{}{}'.format(
+                prefix, metric, '_total' if metric_type == 'counter' else '')
+            lines.append('# HELP {} {}'.format(name, description))
+            lines.append('# TYPE {} {}'.format(name, metric_type))
+            for stage_name in sorted(stages):
+                lines.append('{}{{stage="{}"}} {}'.format(
+                    name, stage_name, repr(stages[stage_name][metric])))
+        return '\n'.join(lines) + '\n'
+
+
+class NullCollector(object):
+    """
+    Contains a collector that records nothing.
+    """
+
+    def __init__(self):
+        """
+        Initializes the collector.
+        """
+        self.timer = NullTimer()
+        return None
+
+    @staticmethod
+    def as_dict():
+        """
+        Gets the totals of every stage, of which there are none.
+        :return: An empty dictionary
+        """
+        return {}
+
+    @staticmethod
+    def clear():
+        """
+        Forgets every recorded stage, of which there are none.
+        :return: None
+        """
+        return None
+
+    @staticmethod
+    def record(name, seconds, rows=None, memory_delta=None):
+        """
+        Ignores one run of a stage.
+        :param name: The name of the stage
+        :param seconds: The duration of the run
+        :param rows: The number of rows processed, if known
+        :param memory_delta: The change in resident memory in bytes, if known
+        :return: None
+        """
+        return None
+
+    def stage(self, name, rows=None):
+        """
+        Ignores a stage.
+        :param name: The name of the stage
+        :param rows: The number of rows processed, if known
+        :return: A context manager that does nothing
+        """
+        return self.timer
+
+    @staticmethod
+    def to_prometheus(prefix='house_price_model'):
+        """
+        Exports the totals of every stage, of which there are none.
+        :param prefix: The prefix of the metric names
+        :return: An empty string
+        """
+        return ''
+
+
+class NullTimer(object):
+    """
+    Contains a context manager that does nothing.
+    """
+
+    # Row counts set on the timer are ignored.
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        return False
+
+
+class StageTimer(object):
+    """
+    Contains a context manager that records a stage in a collector.
+    """
+
+    def __init__(self, collector, name, rows):
+        """
+        Initializes the timer.
+        :param collector: The collector in which to record the stage
+        :param name: The name of the stage
+        :param rows: The number of rows processed, if known
+        """
+        self.collector = collector
+        self.name = name
+        self.rows = rows
+        self.memory = None
+        self.start = 0.
+        return None
+
+    def __enter__(self):
+        if self.collector.measure_memory:
+            self.memory = get_resident_memory()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        seconds = time.perf_counter() - self.start
+        memory_delta = None
+        if self.memory is not None:
+            memory = get_resident_memory()
+            memory_delta = None if memory is None else memory - self.memory
+        self.collector.record(self.name, seconds, self.rows, memory_delta)
+        return False
+
+
+# The collector of models that are not given one.
+NULL_COLLECTOR = NullCollector()
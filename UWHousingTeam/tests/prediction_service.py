@@ -0,0 +1,490 @@
+"""
+Contains an asynchronous HTTP service for house price predictions, bidding
+prices and monthly costs.
+
+One HousePriceModel is loaded when the service starts, and shared by every
+request.  Single predictions that arrive within a short window of each
+other are gathered into one vectorized predict_many() call.  The endpoints
+take and return JSON:
+
+POST /predict        {"sale_day": ..., "bathrooms": ..., ..., "zipcode": ...}
+                     -> {"price": ...}
+POST /predict/batch  {"homes": [{...}, ...]} -> {"prices": [...]}
+POST /bid            {"zipcode": ..., "list_price": ...} -> {"bid": ...}
+POST /monthly-cost   {"list_price": ..., "mortgage_period": ...,
+                      "interest_rate": ..., "house_type": ...}
+                     -> {"monthly_cost": ...}
+GET  /health         -> {"status": "ok", "model_version": ...}
+
+A home gives either its "location" code or its "zipcode", and either its
+"sale_day" or its "sale_date" as "YYYY-MM-DD".  The bid and monthly cost
+arguments may also be lists, which are broadcast against each other.  Every
+number given and returned must be finite, and a request whose numbers or
+results are not is a bad request.
+
+The model is found as house_price_model_2.py describes, and loaded from
+the MODEL_ARTIFACT_FILE environment variable if it is set.  With more than
+one worker, the parent loads the model once and writes it to a shared model
+store, and forked workers attach to the store and accept connections on one
+shared listening socket.  Run this file to serve, e.g.:
+
+python prediction_service.py --port 8000 --batch-window-ms 2 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+
+import datetime as dt
+import numpy as np
+
+import Mathematical_Models
+import shared_model_store
+from house_price_model_2 import HousePriceModel
+
+# Constants
+BATCH_WINDOW_MS = 2.
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+MAX_BATCH_SIZE = 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large',
+           500: 'Internal Server Error'}
+
+# The logger of errors in the service itself.
+LOGGER = logging.getLogger(__name__)
+
+
+class PredictionBatcher(object):
+    """
+    Contains a gatherer of single predictions into vectorized batches.
+    """
+
+    def __init__(self, model, window_ms=BATCH_WINDOW_MS,
+                 max_batch_size=MAX_BATCH_SIZE):
+        """
+        Initializes the batcher.
+        :param model: The house price model
+        :param window_ms: How long the first prediction of a batch waits for
+        others, in milliseconds
+        :param max_batch_size: The number of predictions that ends a batch
+        early
+        """
+        self.batch_sizes = []
+        self.max_batch_size = max_batch_size
+        self.model = model
+        self.pending = []
+        self.timer = None
+        self.window_ms = window_ms
+        return None
+
+    def flush(self):
+        """
+        Makes every pending prediction in one vectorized call.  If the batch
+        fails, each prediction is made alone, so that one bad home fails only
+        its own request.
+        :return: None
+        """
+        pending, self.pending = self.pending, []
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not pending:
+            return None
+        self.batch_sizes.append(len(pending))
+        try:
+            prices = self.model.predict_many(
+                [features for features, _ in pending]).tolist()
+        except (AssertionError, KeyError, TypeError, ValueError):
+            prices = None
+        for index, (features, future) in enumerate(pending):
+            if future.done():
+                continue
+            if prices is not None:
+                future.set_result(prices[index])
+                continue
+            try:
+                future.set_result(self.model.predict(features))
+            except (AssertionError, KeyError, TypeError, ValueError) as error:
+                future.set_exception(error)
+        return None
+
+    def predict(self, features):
+        """
+        Makes a house price prediction in the next batch.
+        :param features: Model features of the house
+        :return: A future house price prediction
+        """
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self.pending.append((features, future))
+        if len(self.pending) >= self.max_batch_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window_ms / 1000., self.flush)
+        return future
+
+
+class PredictionService(object):
+    """
+    Contains an asynchronous HTTP service for house price predictions,
+    bidding prices and monthly costs.
+    """
+
+    def __init__(self, model, window_ms=BATCH_WINDOW_MS):
+        """
+        Initializes the service.
+        :param model: The house price model
+        :param window_ms: How long a prediction waits for others to batch
+        with, in milliseconds
+        """
+        self.base_date = model.get_base_date().to_pydatetime()
+        self.batcher = PredictionBatcher(model, window_ms)
+        self.model = model
+        self.routes = {('POST', '/predict'): self.predict,
+                       ('POST', '/predict/batch'): self.predict_batch,
+                       ('POST', '/bid'): PredictionService.bid,
+                       ('POST', '/monthly-cost'): PredictionService.monthly_cost,
+                       ('GET', '/health'): self.health}
+        return None
+
+    @staticmethod
+    async def bid(request):
+        """
+        Calculates bidding prices.
+        :param request: A dictionary of the zipcode and list price, or lists
+        of them.  Zipcodes may be numbers or numeric strings.
+        :return: A dictionary of the bid, or of the bids for lists
+        """
+
+        # Convert zipcodes given as strings to numbers, so that they are
+        # found in the zipcode tiers.
+        zipcodes = np.asarray(request['zipcode'])
+        if zipcodes.dtype.kind == 'U':
+            zipcodes = zipcodes.astype(np.int64)
+        assert zipcodes.dtype.kind in 'iu', \
+            'The zipcode must be a whole number.'
+        assert_finite('list_price', request['list_price'])
+        bids = Mathematical_Models.bidding_prices(zipcodes,
+                                                  request['list_price'])
+        assert_finite('bid', bids)
+        if np.ndim(bids) == 0:
+            return {'bid': round(float(bids), 2)}
+        return {'bids': np.round(bids, 2).tolist()}
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves the requests of one connection, keeping it open between
+        requests unless the client asks to close it.
+        :param reader: The stream of the request
+        :param writer: The stream of the response
+        :return: None
+        """
+        try:
+            while True:
+
+                # Read the request line and headers.
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                # Read the body, and respond.
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {'error': 'The request '
+                                                              'is too large.'},
+                                       False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, response = await self.route(method, path.split('?')[0],
+                                                    body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self.respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+        return None
+
+    async def health(self, _):
+        """
+        Reports that the service is up.
+        :return: A dictionary of the status and the model version
+        """
+        return {'status': 'ok', 'model_version': self.model.get_model_version(),
+                'batches': len(self.batcher.batch_sizes)}
+
+    @staticmethod
+    async def monthly_cost(request):
+        """
+        Calculates monthly costs.
+        :param request: A dictionary of the list price, mortgage period in
+        years, interest rate in percent and house type, or lists of them
+        :return: A dictionary of the monthly cost, or of the monthly costs for
+        lists
+        """
+        for name in ('list_price', 'mortgage_period', 'interest_rate'):
+            assert_finite(name, request[name])
+        costs = Mathematical_Models.monthly_expenses_grid(
+            request['list_price'], request['mortgage_period'],
+            request['interest_rate'], request['house_type'])
+        assert_finite('monthly_cost', costs)
+        if np.ndim(costs) == 0:
+            return {'monthly_cost': round(float(costs), 2)}
+        return {'monthly_costs': np.round(costs, 2).tolist()}
+
+    async def predict(self, request):
+        """
+        Predicts the price of one home, batched with other predictions.
+        :param request: A dictionary of the features of the home
+        :return: A dictionary of the price
+        """
+        price = await self.batcher.predict(self.to_model_features(request))
+        assert_finite('price', price)
+        return {'price': price}
+
+    async def predict_batch(self, request):
+        """
+        Predicts the prices of many homes in one vectorized call.
+        :param request: A dictionary with a list of the features of the homes
+        :return: A dictionary of the prices
+        """
+        homes_features = [self.to_model_features(home)
+                          for home in request['homes']]
+        if not homes_features:
+            return {'prices': []}
+        prices = self.model.predict_many(homes_features)
+        assert_finite('price', prices)
+        return {'prices': prices.tolist()}
+
+    @staticmethod
+    async def respond(writer, status, response, keep_alive):
+        """
+        Writes a JSON response.  A response with a number that is not
+        finite, which is not valid JSON, is logged and replaced by an
+        internal error.
+        :param writer: The stream of the response
+        :param status: The HTTP status code
+        :param response: The response, which must be JSON serializable
+        :param keep_alive: True if the connection stays open, false otherwise
+        :return: None
+        """
+        try:
+            body = json.dumps(response, allow_nan=False).encode('utf-8')
+        except ValueError:
+            LOGGER.exception('The response %s is not valid JSON.', response)
+            status = 500
+            body = json.dumps({'error': REASONS[500]}).encode('utf-8')
+        writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\n'
+                     'Content-Length: {}\r\nConnection: {}\r\n\r\n'.format(
+                         status, REASONS[status], len(body),
+                         'keep-alive' if keep_alive else 'close')
+                     .encode('latin-1') + body)
+        await writer.drain()
+        return None
+
+    async def route(self, method, path, body):
+        """
+        Runs the endpoint of a request.
+        :param method: The HTTP method
+        :param path: The path of the endpoint
+        :param body: The JSON body of the request
+        :return: The HTTP status code, and the response
+        """
+
+        # Find the endpoint.
+        endpoint = self.routes.get((method, path))
+        if endpoint is None:
+            if any(route_path == path for _, route_path in self.routes):
+                return 405, {'error': 'Use another method for {}.'.format(
+                    path)}
+            return 404, {'error': 'There is no endpoint {}.'.format(path)}
+
+        # Run the endpoint.  Errors in the request are reported as bad
+        # requests, and any other error is logged and reported as an
+        # internal error.
+
+        # pylint: disable=broad-except
+        # The connection must always get a response.
+        try:
+            request = json.loads(body.decode('utf-8')) if body else {}
+            return 200, await endpoint(request)
+        except KeyError as error:
+            return 400, {'error': 'The request is missing {}.'.format(error)}
+        except (AssertionError, TypeError, ValueError) as error:
+            return 400, {'error': str(error)}
+        except Exception:
+            LOGGER.exception('The request %s %s failed.', method, path)
+            return 500, {'error': REASONS[500]}
+
+    def to_model_features(self, home):
+        """
+        Converts the features of a home as requested to model features.
+        :param home: A dictionary of the features of the home, with a
+        location or zipcode, and a sale day or sale date
+        :return: A dictionary of model features, which are finite numbers
+        """
+        features = dict(home)
+        if 'location' not in features:
+            features['location'] = self.model.look_up_zipcode_by_string(
+                str(features.pop('zipcode')))
+        if 'sale_day' not in features:
+            sale_date = dt.datetime.strptime(features.pop('sale_date'),
+                                             '%Y-%m-%d')
+            features['sale_day'] = (sale_date - self.base_date).days + \
+                HousePriceModel.get_day_offset()
+        for name, value in features.items():
+            assert_finite(name, value)
+        return features
+
+
+def assert_finite(name, values):
+    """
+    Asserts that a number, or each of a list of numbers, of a request or its
+    result is finite.
+    :param name: The name of the numbers
+    :param values: The number, or list of numbers
+    :return: None
+    """
+    assert np.all(np.isfinite(np.asarray(values, dtype=np.float64))), \
+        'The {} must be a finite number.'.format(name)
+    return None
+
+
+def load_model():
+    """
+    Loads the house price model.  If the MODEL_ARTIFACT_FILE environment
+    variable is set, a saved model is loaded from it when current, and saved
+    to it otherwise.  The training data is released once the model is built.
+    :return: A house price model ready for prediction
+    """
+    artifact_file = os.environ.get('MODEL_ARTIFACT_FILE')
+    if artifact_file is not None:
+        return HousePriceModel.load_or_initialize(artifact_file, serving=True)
+    model = HousePriceModel(serving=True)
+    model.initialize_model()
+    return model
+
+
+def run_worker(store_path, listening_socket, window_ms):
+    """
+    Attaches to a shared model store, and serves requests on a shared
+    listening socket until cancelled.
+    :param store_path: The directory of the shared model store
+    :param listening_socket: The listening socket
+    :param window_ms: How long a prediction waits for others to batch with,
+    in milliseconds
+    :return: None
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    model, _ = shared_model_store.attach_store(store_path)
+    asyncio.run(serve_socket(PredictionService(model, window_ms),
+                             listening_socket))
+    return None
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT,
+                window_ms=BATCH_WINDOW_MS):
+    """
+    Loads the model, and serves requests until cancelled.
+    :param host: The host to listen on
+    :param port: The port to listen on
+    :param window_ms: How long a prediction waits for others to batch with,
+    in milliseconds
+    :return: None
+    """
+    service = PredictionService(load_model(), window_ms)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print('Serving house price predictions on http://{}:{}'.format(host, port))
+    async with server:
+        await server.serve_forever()
+
+
+async def serve_socket(service, listening_socket):
+    """
+    Serves requests on a listening socket until cancelled.
+    :param service: The prediction service
+    :param listening_socket: The listening socket
+    :return: None
+    """
+    server = await asyncio.start_server(service.handle_connection,
+                                        sock=listening_socket)
+    async with server:
+        await server.serve_forever()
+
+
+def serve_workers(host=DEFAULT_HOST, port=DEFAULT_PORT,
+                  window_ms=BATCH_WINDOW_MS, workers=2):
+    """
+    Loads the model once into a shared model store, and serves requests from
+    forked workers until interrupted.  Workers are forked, so this only runs
+    where fork() does.
+    :param host: The host to listen on
+    :param port: The port to listen on
+    :param window_ms: How long a prediction waits for others to batch with,
+    in milliseconds
+    :param workers: The number of worker processes
+    :return: None
+    """
+
+    # Stop the workers and remove the store when terminated, as when
+    # interrupted.  Publish the model, releasing it from this process before
+    # the workers are forked.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    store_path = shared_model_store.create_store_path()
+    processes = []
+    try:
+        shared_model_store.write_store(store_path, load_model())
+
+        # Fork the workers, which accept connections on one listening
+        # socket, and wait for them.
+        listening_socket = socket.create_server((host, port))
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=run_worker,
+                                     args=(store_path, listening_socket,
+                                           window_ms))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+        print('Serving house price predictions on http://{}:{} with {} '
+              'workers'.format(host, port, workers))
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        shared_model_store.remove_store(store_path)
+    return None
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    PARSER.add_argument('--host', default=DEFAULT_HOST)
+    PARSER.add_argument('--port', type=int, default=DEFAULT_PORT)
+    PARSER.add_argument('--batch-window-ms', type=float,
+                        default=BATCH_WINDOW_MS)
+    PARSER.add_argument('--workers', type=int, default=1)
+    ARGUMENTS = PARSER.parse_args()
+    if ARGUMENTS.workers > 1:
+        serve_workers(ARGUMENTS.host, ARGUMENTS.port,
+                      ARGUMENTS.batch_window_ms, ARGUMENTS.workers)
+    else:
+        asyncio.run(serve(ARGUMENTS.host, ARGUMENTS.port,
+                          ARGUMENTS.batch_window_ms))
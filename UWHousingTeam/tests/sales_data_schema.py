@@ -0,0 +1,92 @@
+"""
+Contains the schema of the King County sales data files.
+
+Every loader of the sales data reads it through read_sales_csv(), so that
+each column is parsed into the same declared type, and the sale date is
+parsed with its exact format, no matter which loader reads it.
+"""
+import numpy as np
+import pandas as pd
+
+# The sale date column, and the exact format of its values, e.g.:
+# "20140502T000000".
+DATE_COLUMN = 'date'
+DATE_FORMAT = '%Y%m%dT%H%M%S'
+
+# The declared type of every other column.  The types are the narrowest that
+# hold the King County data with room to grow.
+COLUMN_TYPES = {'id': np.int64,
+                'price': np.int32,
+                'bedrooms': np.uint8,
+                'bathrooms': np.float32,
+                'sqft_living': np.int32,
+                'sqft_lot': np.int32,
+                'floors': np.float32,
+                'waterfront': np.uint8,
+                'view': np.uint8,
+                'condition': np.uint8,
+                'grade': np.uint8,
+                'sqft_above': np.int32,
+                'sqft_basement': np.int32,
+                'yr_built': np.uint16,
+                'yr_renovated': np.uint16,
+                'zipcode': np.int32,
+                'lat': np.float32,
+                'long': np.float32,
+                'sqft_living15': np.int32,
+                'sqft_lot15': np.int32,
+                'List price': np.int32}
+
+# Integer columns whose values may be written in scientific notation, e.g.:
+# "2.38E+06".  These are parsed as floating point, then rounded.
+SCIENTIFIC_COLUMNS = ('price', 'List price')
+
+
+def apply_column_types(sales_data):
+    """
+    Converts the columns of sales data to their declared types in place.
+    Columns in scientific notation are rounded, and text dates are parsed
+    with the exact date format.
+
+    :param sales_data: The sales data
+    :return: The sales data
+    """
+    for column, column_type in COLUMN_TYPES.items():
+        if column in sales_data:
+            values = sales_data[column]
+            if column in SCIENTIFIC_COLUMNS:
+                values = np.round(values)
+            sales_data[column] = values.astype(column_type)
+    if DATE_COLUMN in sales_data and sales_data[DATE_COLUMN].dtype == object:
+        sales_data[DATE_COLUMN] = pd.to_datetime(sales_data[DATE_COLUMN],
+                                                 format=DATE_FORMAT)
+    return sales_data
+
+
+def get_parse_types():
+    """
+    Gets the types in which the columns of a sales data file are parsed.
+
+    :return: A dictionary of parse types by column name
+    """
+    parse_types = dict(COLUMN_TYPES)
+    parse_types.update({column: np.float64 for column in SCIENTIFIC_COLUMNS})
+    parse_types[DATE_COLUMN] = str
+    return parse_types
+
+
+def read_sales_csv(path, **kwargs):
+    """
+    Reads a sales data file with the declared column types and date format.
+
+    :param path: The path of the sales data file
+    :param kwargs: Further arguments for pandas.read_csv
+    :return: The sales data
+    """
+
+    # Read the file, parsing the columns written in scientific notation as
+    # floating point, and the date as text.  Then round the scientific
+    # columns to their declared types, and parse the date with its exact
+    # format.
+    return apply_column_types(
+        pd.read_csv(path, dtype=get_parse_types(), **kwargs))
@@ -0,0 +1,94 @@
+"""
+Contains unit tests for the compact random forest.
+"""
+import unittest
+
+import numpy as np
+from compact_forest import CompactForest, get_forest_memory_footprint
+from sklearn.ensemble import RandomForestRegressor
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for the compact random forest.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Initializes the unit test class.  The forest is fitted once, and
+        shared by every test.
+        :return: None
+        """
+        rng = np.random.default_rng(0)
+        cls.predictors = rng.standard_normal((2000, 6))
+        cls.response = np.dot(cls.predictors, np.arange(6.)) + \
+            rng.standard_normal(2000)
+        cls.forest = RandomForestRegressor(n_estimators=10, random_state=0)
+        cls.forest.fit(cls.predictors, cls.response)
+        return None
+
+    def test_from_forest(self):
+        """
+        Tests that CompactForest.from_forest finds the depth of the trees,
+        and that the compact arrays are smaller than those of the sklearn
+        forest.
+        :return: True or False
+        """
+        compact_forest = CompactForest.from_forest(self.forest)
+        self.assertEqual(compact_forest.depth,
+                         max(estimator.tree_.max_depth
+                             for estimator in self.forest.estimators_))
+        self.assertEqual(CompactForest.from_forest(self.forest,
+                                                   max_depth=3).depth, 3)
+        return self.assertLess(compact_forest.get_memory_footprint(),
+                               get_forest_memory_footprint(self.forest))
+
+    def test_max_depth(self):
+        """
+        Tests CompactForest.from_forest with a depth cap.
+        :return: True or False
+        """
+
+        # Cut the trees at the root, where every tree predicts the mean
+        # response of its bootstrap sample.
+        compact_forest = CompactForest.from_forest(self.forest, max_depth=0)
+        root_values = np.mean([estimator.tree_.value[0, 0, 0]
+                               for estimator in self.forest.estimators_])
+        self.assertEqual(compact_forest.depth, 0)
+        return self.assertTrue(np.allclose(
+            compact_forest.predict(self.predictors[:5]), root_values))
+
+    def test_predict(self):
+        """
+        Tests CompactForest.predict against the sklearn forest, for a batch
+        of rows and for single rows.
+        :return: True or False
+        """
+        compact_forest = CompactForest.from_forest(self.forest)
+        for row in self.predictors[:3]:
+            self.assertAlmostEqual(compact_forest.predict(row)[0],
+                                   self.forest.predict(row.reshape(1, -1))[0])
+        return self.assertTrue(np.allclose(
+            compact_forest.predict(self.predictors),
+            self.forest.predict(self.predictors)))
+
+    def test_thresholds(self):
+        """
+        Tests that rounding the thresholds to single precision splits rows
+        as sklearn does, even between adjacent single precision values.
+        :return: True or False
+        """
+        predictors = (np.float32(1.) + np.arange(64, dtype=np.float32) *
+                      np.finfo(np.float32).eps).reshape(-1, 1)
+        response = np.arange(64.)
+        forest = RandomForestRegressor(n_estimators=3, random_state=0)
+        forest.fit(predictors, response)
+        compact_forest = CompactForest.from_forest(forest)
+        self.assertEqual(compact_forest.thresholds.dtype, np.float32)
+        return self.assertTrue(np.array_equal(
+            compact_forest.predict(predictors), forest.predict(predictors)))
+
+
+if __name__ == '__main__':
+    unittest.main()
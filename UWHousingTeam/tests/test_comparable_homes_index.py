@@ -0,0 +1,120 @@
+"""
+Contains unit tests for the comparable homes indexes.
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import pandas as pd
+
+import house_price_database
+from comparable_homes_index import ComparableHomesIndex, \
+    DatabaseComparableHomesIndex
+from sales_data_schema import read_sales_csv
+
+# Constants
+# Queries of (bedrooms, bathrooms, lower price, upper price, built after,
+# bounds), including a group without homes and a band without homes.
+QUERIES = ((3, 2.5, 400000, 500000, None, None),
+           (4, 2.5, 500000, 700000, 1990, None),
+           (3, 1.0, 200000, 400000, 1900, (47.5, -122.4, 47.7, -122.2)),
+           (2, 1.0, 300000, 300001, None, None),
+           (11, 5.0, 0, 10000000, None, None))
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for the comparable homes indexes.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Reads the sales data shared by the tests.
+        :return: None
+        """
+        cls.homes = read_sales_csv(os.path.join(
+            os.environ['SALES_DATA_PATH'], os.environ['SALES_DATA_FILE']))
+        return None
+
+    @staticmethod
+    def filter_homes(homes, bedrooms, bathrooms, lower_price, upper_price,
+                     built_after, bounds):
+        """
+        Finds comparable homes with the data frame filters the indexes
+        replace.
+        :return: A data frame of the comparable homes
+        """
+        homes = homes[homes.bedrooms == bedrooms]
+        homes = homes[homes.bathrooms == bathrooms]
+        homes = homes[homes['List price'] > lower_price]
+        homes = homes[homes['List price'] < upper_price]
+        if built_after is not None:
+            homes = homes[homes.yr_built > built_after]
+        if bounds is not None:
+            south, west, north, east = bounds
+            homes = homes[(homes.lat >= south) & (homes.lat <= north) &
+                          (homes.long >= west) & (homes.long <= east)]
+        return homes
+
+    def test_database_query(self):
+        """
+        Tests that the database index finds the homes the data frame filters
+        find.
+        :return: True or False
+        """
+
+        # Write the homes to a sales data database, and query it.
+        columns = list(DatabaseComparableHomesIndex.COLUMNS)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'housePrices.db')
+            connection = sqlite3.connect(path)
+            self.homes[columns].rename(
+                columns=house_price_database.STORED_NAMES).to_sql(
+                    house_price_database.TABLE, connection, index=False)
+            connection.close()
+            index = DatabaseComparableHomesIndex(path)
+            results = [index.query(*query[:4], built_after=query[4],
+                                   bounds=query[5]) for query in QUERIES]
+
+        # Assert that each query found the same homes, in any order.
+        for query, homes in zip(QUERIES, results):
+            expected = MyTestCase.filter_homes(self.homes, *query)[columns]
+            pd.testing.assert_frame_equal(
+                homes.sort_values(columns).reset_index(drop=True),
+                expected.sort_values(columns).reset_index(drop=True),
+                check_dtype=False)
+        return self.assertGreater(len(results[0]), 0)
+
+    def test_empty_index(self):
+        """
+        Tests that an index of no homes finds no homes.
+        :return: True or False
+        """
+        index = ComparableHomesIndex(self.homes.iloc[:0])
+        self.assertDictEqual(index.groups, {})
+        homes = index.query(3, 2.5, 0, 10000000, built_after=1900)
+        self.assertListEqual(homes.columns.tolist(),
+                             self.homes.columns.tolist())
+        return self.assertEqual(len(homes), 0)
+
+    def test_query(self):
+        """
+        Tests that the index finds the homes the data frame filters find.
+        :return: True or False
+        """
+        index = ComparableHomesIndex(self.homes)
+        for query in QUERIES:
+            homes = index.query(*query[:4], built_after=query[4],
+                                bounds=query[5])
+            expected = MyTestCase.filter_homes(self.homes, *query)
+            self.assertListEqual(homes.columns.tolist(),
+                                 self.homes.columns.tolist())
+            self.assertListEqual(sorted(homes['id'].tolist()),
+                                 sorted(expected['id'].tolist()))
+        return self.assertGreater(len(index.query(*QUERIES[0][:4])), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Contains unit tests for the sales data database loader.
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import Database_HousePrice
+import house_price_database
+import sales_data_schema
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for the sales data database loader.
+    """
+
+    def test_load_house_prices(self):
+        """
+        Tests that the sales data CSV is loaded with every row, the declared
+        column types and the indexes, and that the database is left in
+        rollback journal mode for read-only connections.
+        :return: True or False
+        """
+
+        # Load the sales data in several batches, and inspect the database.
+        csv_path = os.path.join(os.environ['SALES_DATA_PATH'],
+                                os.environ['SALES_DATA_FILE'])
+        with tempfile.TemporaryDirectory() as directory:
+            database_path = os.path.join(directory, 'housePrices.db')
+            rows, _ = Database_HousePrice.load_house_prices(
+                csv_path, database_path, batch_size=5000)
+            connection = sqlite3.connect(database_path)
+            try:
+                journal_mode = connection.execute(
+                    'PRAGMA journal_mode').fetchone()[0]
+                column_types = [(row[1], row[2].lower()) for row in connection.execute(
+                    'PRAGMA table_info(housePrices)')]
+                price_types = connection.execute(
+                    'SELECT DISTINCT typeof(price) FROM housePrices').fetchall()
+                indexes = connection.execute(
+                    'SELECT name FROM sqlite_master WHERE type = \'index\' '
+                    'AND tbl_name = \'housePrices\' ORDER BY name').fetchall()
+            finally:
+                connection.close()
+            files = sorted(os.listdir(directory))
+            sales_data = house_price_database.read_sales_data(
+                database_path, columns=['date', 'price', 'List price'])
+
+        # Assert that every row was loaded, with the declared types.
+        expected = sales_data_schema.read_sales_csv(csv_path)
+        self.assertEqual(rows, len(expected))
+        self.assertEqual(len(sales_data), len(expected))
+        self.assertListEqual(column_types,
+                             list(Database_HousePrice.COLUMNS))
+        self.assertListEqual(price_types, [('integer',)])
+        self.assertListEqual(sales_data['price'].tolist(),
+                             expected['price'].tolist())
+
+        # Assert that the indexes were created, and that no write-ahead log
+        # is left.
+        self.assertListEqual(
+            [row[0] for row in indexes],
+            sorted(name for name, _ in Database_HousePrice.INDEXES))
+        self.assertEqual(journal_mode, 'delete')
+        return self.assertListEqual(files, ['housePrices.db'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+Contains unit tests for the Gram matrix ridge regression.
+"""
+import unittest
+
+import numpy as np
+from gram_ridge_cv import GramRidgeCV
+from sklearn.linear_model import RidgeCV
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for the Gram matrix ridge regression.
+    """
+
+    def test_fit(self):
+        """
+        Tests GramRidgeCV.fit against RidgeCV.
+        :return: True or False
+        """
+
+        # Declare and initialize predictors of different scales, and a noisy
+        # response.
+        rng = np.random.default_rng(0)
+        predictors = rng.standard_normal((2000, 9)) * \
+            np.arange(1., 10.) + np.arange(9.)
+        response = np.dot(predictors, rng.standard_normal(9)) + \
+            rng.standard_normal(2000) * 30.
+        alphas = np.logspace(-2, 4, 25)
+
+        # Fit both models, visiting the rows in small chunks.
+        gram_model = GramRidgeCV(alphas=alphas, chunk_size=1000).fit(
+            predictors, response)
+        sklearn_model = RidgeCV(alphas=alphas, store_cv_values=True).fit(
+            predictors, response)
+
+        # Assert that both models have the same leave-one-out errors, penalty
+        # and solution.
+        self.assertTrue(np.allclose(gram_model.cv_errors_,
+                                    sklearn_model.cv_values_.mean(axis=0)))
+        self.assertEqual(gram_model.alpha_, sklearn_model.alpha_)
+        self.assertTrue(np.allclose(gram_model.coef_, sklearn_model.coef_))
+        return self.assertAlmostEqual(gram_model.intercept_,
+                                      sklearn_model.intercept_)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,13 +3,43 @@ Contains unit tests for the house price controller.
 """
 import unittest
 from house_price_controller import create_test_frame
+from house_price_controller import create_test_frames
+from house_price_controller import predict_using_both
 from house_price_controller import predict_using_forest
 from house_price_controller import predict_using_ridge
+from house_price_model import SALES_DATA
+from house_price_model import create_model_data_frame
+import pandas as pd
 
 # Constants
 LOW_VALUE = 700000.
 HIGH_VALUE = 1300000.
 
+# Listings for the batch tests, one of them with the default sale day,
+# renovation year and neighborhood measures.
+LISTINGS = [{'sale_year': 2017, 'sale_month': 6, 'sale_day': 1,
+             'bedrooms': 3, 'bathrooms': 2.5, 'sqft_living': 1430,
+             'sqft_lot': 3210, 'floors': 2, 'waterfront': 0, 'view': 0,
+             'condition': 5, 'grade': 6, 'sqft_above': 1430,
+             'sqft_basement': 0, 'yr_built': 1984, 'yr_renovated': 0,
+             'zipcode': 98103, 'latitude': 47.665556,
+             'longitude': -122.335604, 'list_price': 750000},
+            {'sale_year': 2017, 'sale_month': 6, 'sale_day': 1,
+             'bedrooms': 4, 'bathrooms': 3., 'sqft_living': 2640,
+             'sqft_lot': 3920, 'floors': 3, 'waterfront': 0, 'view': 0,
+             'condition': 5, 'grade': 6, 'sqft_above': 1990,
+             'sqft_basement': 650, 'yr_built': 1918, 'yr_renovated': 2007,
+             'zipcode': 98103, 'latitude': 47.666952,
+             'longitude': -122.355107, 'list_price': 1000000,
+             'sqft_living15': 2100, 'sqft_lot15': 4000},
+            {'sale_year': 2016, 'sale_month': 11,
+             'bedrooms': 2, 'bathrooms': 1., 'sqft_living': 980,
+             'sqft_lot': 5000, 'floors': 1, 'waterfront': 0, 'view': 2,
+             'condition': 3, 'grade': 7, 'sqft_above': 980,
+             'sqft_basement': 0, 'yr_built': 1952,
+             'zipcode': 98117, 'latitude': 47.6891,
+             'longitude': -122.3752, 'list_price': 525000}]
+
 
 class MyTestCase(unittest.TestCase):
     """
@@ -87,5 +117,58 @@ class MyTestCase(unittest.TestCase):
                         LOW_VALUE <= price_by_ridge <= HIGH_VALUE)
 
 
+class BatchTestCase(unittest.TestCase):
+    """
+    Contains unit tests for many houses at once.
+    """
+
+    def test_create_test_frames(self):
+        """
+        Tests that a batch of listings is encoded as the training data is,
+        one row per listing, as each listing is on its own.
+
+        :return: None
+        """
+        house_frames = create_test_frames(LISTINGS)
+        self.assertListEqual(
+            house_frames.columns.tolist(),
+            create_model_data_frame(SALES_DATA.iloc[:1]).columns.drop(
+                'price').tolist())
+        for index, listing in enumerate(LISTINGS):
+            house_frame = create_test_frames([listing])
+            self.assertListEqual(
+                house_frames.iloc[index].astype(float).tolist(),
+                house_frame.iloc[0].astype(float).tolist())
+
+        # Assert that the defaults are those of create_test_frame(), and
+        # that a data frame of listings is encoded as a list of them.
+        self.assertEqual(house_frames['sale_day'][2],
+                         create_test_frame(LISTINGS[2])['sale_day'][0])
+        self.assertEqual(house_frames['yr_renovated'][2], 1952)
+        self.assertEqual(house_frames['sqft_lot15'][2], 5000)
+        pd.testing.assert_frame_equal(
+            create_test_frames(pd.DataFrame(LISTINGS)), house_frames)
+
+    def test_predict_using_both(self):
+        """
+        Tests that the batch predictions of both models are those of each
+        listing on its own.
+
+        :return: None
+        """
+        ridge_prices, forest_prices = predict_using_both(
+            create_test_frames(LISTINGS))
+        self.assertEqual(len(ridge_prices), len(LISTINGS))
+        self.assertEqual(len(forest_prices), len(LISTINGS))
+        for index, listing in enumerate(LISTINGS):
+            house_frame = create_test_frames([listing])
+            self.assertAlmostEqual(ridge_prices[index],
+                                   predict_using_ridge(house_frame),
+                                   delta=0.01)
+            self.assertAlmostEqual(forest_prices[index],
+                                   predict_using_forest(house_frame),
+                                   delta=0.01)
+
+
 if __name__ == '__main__':
     unittest.main()
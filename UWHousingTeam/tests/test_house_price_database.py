@@ -0,0 +1,63 @@
+"""
+Contains unit tests for reading the sales data database.
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import house_price_database
+import sales_data_schema
+
+# Constants
+COLUMNS = ('id', 'date', 'price', 'bedrooms', 'bathrooms', 'yr_built', 'lat',
+           'long', 'list_price')
+ROWS = ((1999700045, '20140502T000000', 313000, 3, 1.5, 1950, 47.7658,
+         -122.339, 420760),
+        (1860600135, '20140502T000000', 2380000, 5, 2.5, 1991, 47.6345,
+         -122.367, 1956400),
+        (5467900070, '20150227T000000', 342000, 3, 1.5, 1998, 47.3672,
+         -122.031, 368820))
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for reading the sales data database.
+    """
+
+    def test_read_sales_data(self):
+        """
+        Tests house_price_database.read_sales_data and
+        house_price_database.query_comparable_homes.
+        :return: True or False
+        """
+
+        # Write a small sales data database, and read it in chunks, and by a
+        # comparable homes query.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'housePrices.db')
+            connection = sqlite3.connect(path)
+            connection.execute('CREATE TABLE {} ({})'.format(
+                house_price_database.TABLE, ', '.join(COLUMNS)))
+            connection.executemany('INSERT INTO {} VALUES ({})'.format(
+                house_price_database.TABLE, ', '.join('?' * len(COLUMNS))), ROWS)
+            connection.commit()
+            connection.close()
+            chunks = list(house_price_database.read_sales_data(
+                path, columns=['date', 'price', 'List price'], chunksize=2))
+            homes = house_price_database.query_comparable_homes(
+                path, 3, 1.5, 400000, 500000, built_after=1900)
+
+        # Assert that the chunks have the schema names and types, and that
+        # only the comparable home was selected.
+        self.assertListEqual([len(chunk) for chunk in chunks], [2, 1])
+        for column in ('price', 'List price'):
+            self.assertEqual(chunks[0][column].dtype,
+                             sales_data_schema.COLUMN_TYPES[column])
+        self.assertEqual(chunks[1]['date'].dt.strftime('%Y-%m-%d').iloc[0],
+                         '2015-02-27')
+        return self.assertListEqual(homes['id'].tolist(), [1999700045])
+
+
+if __name__ == '__main__':
+    unittest.main()
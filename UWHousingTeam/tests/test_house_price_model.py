@@ -1,11 +1,17 @@
 """
 Contains unit tests for the 2nd house price model.
 """
+import os
+import pickle
+import tempfile
 import unittest
 
+import gram_ridge_cv
+import numpy as np
 import pandas as pd
 from dateutil.parser import parse
 from house_price_model_2 import HousePriceModel
+from pipeline_metrics import NULL_COLLECTOR, MetricsCollector
 from sklearn.linear_model import RidgeCV
 from sklearn.preprocessing.data import StandardScaler
 
@@ -28,21 +34,40 @@ class MyTestCase(unittest.TestCase):
     1. initialize_model
     2. build_model
     3. convert_exponential_columns
-    4. prepare_model_data
-    5. prepare_test_row
+    4. prepare_test_row
+    5. prepare_test_matrix
     6. read_housing_data
     """
 
-    def __init__(self, *args, **kwargs):
+    @classmethod
+    def setUpClass(cls):
         """
-        Initializes the unit test class.
-        :param args: Argument for unittest.TestCase
-        :param kwargs: Argument for unittest.TestCase
+        Initializes the unit test class.  The model is built once, and shared
+        by every test.
+        :return: None
         """
-        super(MyTestCase, self).__init__(*args, **kwargs)
-        self.house_price_model = HousePriceModel()
-        self.house_price_model.initialize_model()
-        self.price_accuracy = 100.
+        cls.house_price_model = HousePriceModel()
+        cls.house_price_model.initialize_model()
+        cls.price_accuracy = 100.
+        return None
+
+    def test_build_model(self):
+        """
+        Tests HousePriceModel.build_model with model data prepared before,
+        and that a serving model leaves the given model data unchanged.
+        :return: True or False
+        """
+        model = HousePriceModel()
+        model.read_housing_data()
+        model.build_model(model.prepare_model_data())
+        self.assertTrue(np.allclose(model.get_model().coef_,
+                                    self.house_price_model.get_model().coef_))
+        serving_model = HousePriceModel(serving=True)
+        serving_model.read_housing_data()
+        predictors, response = serving_model.prepare_model_data()
+        expected = predictors.copy()
+        serving_model.build_model((predictors, response))
+        return self.assertTrue(np.array_equal(predictors, expected))
 
     def test_calculate_sales_by_date(self):
         """
@@ -88,6 +113,34 @@ class MyTestCase(unittest.TestCase):
         """
         return self.assertTrue(self.house_price_model.can_predict)
 
+    def test_compile_model(self):
+        """
+        Tests HousePriceModel.compile_model.
+        :return: True or False
+        """
+
+        # Declare and initialize a test row.
+        features = {'sale_day':
+                        self.house_price_model.calculate_sale_day_by_day(2017, 7, 1),
+                    'bathrooms': 2.5,
+                    'sqft_living': 1430,
+                    'sqft_lot': 3210,
+                    'waterfront': 0,
+                    'view': 0,
+                    'condition': 5,
+                    'grade': 6,
+                    'location':
+                        self.house_price_model.look_up_zipcode_by_string('98103')
+                   }
+
+        # Make a prediction with the scaler and the model directly, and
+        # assert that the compiled model agrees.
+        expected = self.house_price_model.get_model().predict(
+            self.house_price_model.prepare_test_row(features))[0] + \
+            self.house_price_model.get_mean_response()
+        return self.assertAlmostEqual(self.house_price_model.predict(features),
+                                      expected, delta=0.01)
+
     def test_create_date(self):
         """
         Tests HousePriceModel.create_date.
@@ -199,6 +252,16 @@ class MyTestCase(unittest.TestCase):
                and self.assertListEqual(list(model.coef_),
                                         list(self.house_price_model.get_model_coefficients()))
 
+    def test_get_model_alpha(self):
+        """
+        Tests that the ridge penalty chosen by leave-one-out is inside the
+        grid of penalties, rather than at either end of it.
+        :return: True or False
+        """
+        alphas = gram_ridge_cv.DENSE_ALPHAS
+        alpha = self.house_price_model.get_model().alpha_
+        return self.assertTrue(alphas[0] < alpha < alphas[-1])
+
     def test_get_model_coefficients(self):
         """
         Tests HousePriceModel.get_model.
@@ -240,6 +303,99 @@ class MyTestCase(unittest.TestCase):
         return self.assertTrue(isinstance(
             self.house_price_model.get_zip_code_dict(), dict))
 
+    def test_is_stale(self):
+        """
+        Tests HousePriceModel.is_stale.
+        :return: True or False
+        """
+
+        # The model is current with the training data it was built from.
+        self.assertFalse(self.house_price_model.is_stale())
+
+        # A model built from other training data is stale.
+        other_model = HousePriceModel()
+        other_model.training_data_hash = 'other'
+        return self.assertTrue(other_model.is_stale())
+
+    def test_load(self):
+        """
+        Tests HousePriceModel.save and HousePriceModel.load.
+        :return: True or False
+        """
+
+        # Declare and initialize a test row.
+        features = {'sale_day':
+                        self.house_price_model.calculate_sale_day_by_day(2017, 7, 1),
+                    'bathrooms': 3,
+                    'sqft_living': 2640,
+                    'sqft_lot': 3920,
+                    'waterfront': 0,
+                    'view': 0,
+                    'condition': 5,
+                    'grade': 6,
+                    'location':
+                        self.house_price_model.look_up_zipcode_by_string('98103')
+                   }
+
+        # Save the model, and load it back.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'house_price_model.pkl')
+            self.house_price_model.save(path)
+            loaded_model = HousePriceModel.load(path)
+
+        # Assert that the loaded model can predict without reading the housing
+        # data, and that it makes the same prediction.
+        self.assertTrue(loaded_model.can_predict and
+                        not loaded_model.housing_data_read)
+        self.assertNotEqual(loaded_model.get_model_version(),
+                            self.house_price_model.get_model_version())
+        return self.assertEqual(loaded_model.predict(features),
+                                self.house_price_model.predict(features))
+
+    def test_load_or_initialize(self):
+        """
+        Tests that HousePriceModel.load_or_initialize rebuilds and replaces
+        an artifact that cannot be loaded.
+        :return: True or False
+        """
+
+        # Declare and initialize a test row.
+        features = {'sale_day':
+                        self.house_price_model.calculate_sale_day_by_day(2017, 7, 1),
+                    'bathrooms': 3,
+                    'sqft_living': 2640,
+                    'sqft_lot': 3920,
+                    'waterfront': 0,
+                    'view': 0,
+                    'condition': 5,
+                    'grade': 6,
+                    'location':
+                        self.house_price_model.look_up_zipcode_by_string('98103')
+                   }
+
+        # Write a corrupt artifact, a truncated artifact and artifacts of an
+        # earlier version, and load or initialize a model from each.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'house_price_model.pkl')
+            self.house_price_model.save(path)
+            with open(path, 'rb') as input_file:
+                artifact = input_file.read()
+            earlier_artifact = pickle.loads(artifact)
+            earlier_artifact['version'] = 1
+            for bad_artifact in (b'not a pickle', artifact[:len(artifact) // 2],
+                                 pickle.dumps({'version': 1}),
+                                 pickle.dumps(earlier_artifact)):
+                with open(path, 'wb') as output_file:
+                    output_file.write(bad_artifact)
+                model = HousePriceModel.load_or_initialize(path)
+
+                # Assert that a model was built, and saved in place of the
+                # bad artifact.
+                self.assertTrue(model.can_predict)
+                self.assertEqual(HousePriceModel.load(path).predict_many(
+                    [features]).tolist(), [model.predict(features)])
+        return None
+
     def test_lookup_zipcode_by_number(self):
         """
         Tests HousePriceModel.lookup_zip_code_by_number.
@@ -307,6 +463,99 @@ class MyTestCase(unittest.TestCase):
             [self.house_price_model.look_up_zipcode_by_string(zipcode)
              for zipcode in zip_codes], list(locations))
 
+    def test_lookup_zipcodes(self):
+        """
+        Tests HousePriceModel.look_up_zipcodes.
+        :return: True or False
+        """
+
+        # Assert that numeric and string zip codes are looked up together,
+        # and match the single lookups.
+        zip_codes = (98002, '98168', 98004, '98004')
+        self.assertListEqual(
+            self.house_price_model.look_up_zipcodes(zip_codes).tolist(),
+            [self.house_price_model.look_up_zipcode_by_number(zipcode)
+             for zipcode in zip_codes])
+
+        # Assert that every unknown zip code is reported at once.
+        with self.assertRaises(AssertionError) as context:
+            self.house_price_model.look_up_zipcodes((98002, 10001, 'x', 98004))
+        return self.assertTrue('10001' in str(context.exception) and
+                               'x' in str(context.exception))
+
+    def test_predict_many(self):
+        """
+        Tests HousePriceModel.predict_many.
+        :return: True or False
+        """
+
+        # Declare and initialize test rows for two homes in different zip
+        # codes.
+        sale_day = self.house_price_model.calculate_sale_day_by_day(2017, 7, 1)
+        homes = [{'sale_day': sale_day,
+                  'bathrooms': 2.5,
+                  'sqft_living': 1430,
+                  'sqft_lot': 3210,
+                  'waterfront': 0,
+                  'view': 0,
+                  'condition': 5,
+                  'grade': 6,
+                  'location':
+                      self.house_price_model.look_up_zipcode_by_string('98103')},
+                 {'sale_day': sale_day,
+                  'bathrooms': 1,
+                  'sqft_living': 1060,
+                  'sqft_lot': 8000,
+                  'waterfront': 0,
+                  'view': 0,
+                  'condition': 5,
+                  'grade': 6,
+                  'location':
+                      self.house_price_model.look_up_zipcode_by_string('98002')}]
+
+        # Make batch predictions from a list of dictionaries, a data frame and
+        # a dictionary of columns, and compare each to single predictions.
+        # Assert that each batch is recorded as one row per home.
+        expected = [self.house_price_model.predict(home) for home in homes]
+        collector = MetricsCollector(measure_memory=False)
+        self.house_price_model.metrics = collector
+        try:
+            for batch in (homes, pd.DataFrame(homes),
+                          pd.DataFrame(homes).to_dict(orient='list')):
+                self.assertListEqual(
+                    self.house_price_model.predict_many(batch).tolist(),
+                    expected)
+        finally:
+            self.house_price_model.metrics = NULL_COLLECTOR
+        return self.assertEqual(collector.as_dict()['predict_many']['rows'],
+                                3 * len(homes))
+
+    def test_predict_non_finite(self):
+        """
+        Tests that HousePriceModel.predict and HousePriceModel.predict_many
+        both reject features that are not finite.
+        :return: True or False
+        """
+        home = {'sale_day':
+                    self.house_price_model.calculate_sale_day_by_day(2017, 7, 1),
+                'bathrooms': 2.5,
+                'sqft_living': 1430,
+                'sqft_lot': 3210,
+                'waterfront': 0,
+                'view': 0,
+                'condition': 5,
+                'grade': 6,
+                'location':
+                    self.house_price_model.look_up_zipcode_by_string('98103')}
+        for value in (np.nan, np.inf, None):
+            bad_home = dict(home, bathrooms=value)
+            self.assertRaises(AssertionError, self.house_price_model.predict,
+                              bad_home)
+            self.assertRaises(AssertionError,
+                              self.house_price_model.predict_many,
+                              [home, bad_home])
+        return None
+
     def test_prediction_one(self):
         """
         Performs a test house price prediction for 1817 N 51st St,
@@ -330,7 +579,7 @@ class MyTestCase(unittest.TestCase):
 
         # Make a prediction and check it.
         return self.assertAlmostEqual(self.house_price_model.predict(features),
-                                      625696., delta=self.price_accuracy)
+                                      625001., delta=self.price_accuracy)
 
     def test_prediction_two(self):
         """
@@ -355,7 +604,7 @@ class MyTestCase(unittest.TestCase):
 
         # Make a prediction and check it.
         return self.assertAlmostEqual(self.house_price_model.predict(features),
-                                      775624., delta=self.price_accuracy)
+                                      774547., delta=self.price_accuracy)
 
     def test_prediction_three(self):
         """
@@ -380,7 +629,114 @@ class MyTestCase(unittest.TestCase):
 
         # Make a prediction and check it.
         return self.assertAlmostEqual(self.house_price_model.predict(features),
-                                      252879., delta=self.price_accuracy)
+                                      252700., delta=self.price_accuracy)
+
+    def test_prepare_model_data(self):
+        """
+        Tests HousePriceModel.prepare_model_data.
+        :return: True or False
+        """
+
+        # Prepare the model data of the first sales.
+        sales_data = self.house_price_model.get_sales_data().iloc[:100]
+        predictors, response = \
+            self.house_price_model.prepare_model_data(sales_data)
+
+        # Assert that the predictors are one C-contiguous float64 matrix in
+        # predictor order, with the exponential features converted, and that
+        # the response is the price.
+        self.assertEqual(predictors.shape, (100, 9))
+        self.assertEqual(predictors.dtype, 'float64')
+        self.assertTrue(predictors.flags.c_contiguous)
+        self.assertListEqual(
+            list(HousePriceModel.PREDICTOR_COLUMNS),
+            self.house_price_model.get_predictors().columns.tolist())
+        self.assertEqual(predictors[0, 2], sales_data['sqft_living'].iloc[0])
+        self.assertAlmostEqual(predictors[0, 6], np.exp(
+            3.372000e-2 * sales_data['condition'].iloc[0]))
+        return self.assertListEqual(response.tolist(),
+                                    sales_data['price'].tolist())
+
+    def test_release_training_data(self):
+        """
+        Tests that a serving model releases its training data once built,
+        predicts as before, and reads the sales data again on request.
+        :return: True or False
+        """
+
+        # Build a serving model, and assert that only the predictor columns
+        # of the training data are kept.
+        serving_model = HousePriceModel(serving=True)
+        serving_model.initialize_model()
+        self.assertEqual(len(serving_model.sales_data), 0)
+        self.assertEqual(len(serving_model.get_predictors()), 0)
+        self.assertListEqual(
+            serving_model.get_predictors().columns.tolist(),
+            self.house_price_model.get_predictors().columns.tolist())
+
+        # Assert that it predicts as a model that keeps its training data, and
+        # that the sales data is read again when requested.
+        features = {'sale_day':
+                        self.house_price_model.calculate_sale_day_by_day(2017, 7, 1),
+                    'bathrooms': 3,
+                    'sqft_living': 2640,
+                    'sqft_lot': 3920,
+                    'waterfront': 0,
+                    'view': 0,
+                    'condition': 5,
+                    'grade': 6,
+                    'location':
+                        self.house_price_model.look_up_zipcode_by_string('98103')
+                   }
+        self.assertEqual(serving_model.predict(features),
+                         self.house_price_model.predict(features))
+        self.assertEqual(serving_model.prepare_test_row(features).tolist(),
+                         self.house_price_model.prepare_test_row(
+                             features).tolist())
+        return self.assertEqual(
+            len(serving_model.get_sales_data()),
+            len(self.house_price_model.get_sales_data()))
+
+    def test_update_model(self):
+        """
+        Tests HousePriceModel.update_model against a full build.
+        :return: True or False
+        """
+
+        # Build a model from the first half of the sales, and add the rest
+        # of the sales in two batches.
+        sales_data = self.house_price_model.get_sales_data()
+        half = len(sales_data) // 2
+        updated_model = HousePriceModel()
+        updated_model.read_housing_data()
+        updated_model.sales_data = sales_data.iloc[:half]
+        updated_model.build_model()
+        updated_model.update_model(sales_data.iloc[half:half + 1000])
+        updated_model.update_model(sales_data.iloc[half + 1000:])
+
+        # Build a model from all of the sales with the same ridge penalty.
+        built_model = HousePriceModel()
+        built_model.read_housing_data()
+        built_model.model = RidgeCV(alphas=[updated_model.get_model().alpha_])
+        built_model.build_model()
+
+        # Assert that the updated model is not mistaken for a build from the
+        # training data file, and that both models have the same scaler,
+        # coefficients and compiled bias.
+        self.assertTrue(updated_model.is_stale())
+        self.assertFalse(built_model.is_stale())
+        self.assertEqual(updated_model.statistics.count, len(sales_data))
+        for updated, built in ((updated_model.get_scaler().mean_,
+                                built_model.get_scaler().mean_),
+                               (updated_model.get_scaler().scale_,
+                                built_model.get_scaler().scale_),
+                               (updated_model.get_model().coef_,
+                                built_model.get_model().coef_)):
+            for updated_value, built_value in zip(updated, built):
+                self.assertAlmostEqual(updated_value, built_value,
+                                       delta=1e-6 * abs(built_value))
+        return self.assertAlmostEqual(updated_model.compiled_model[2],
+                                      built_model.compiled_model[2], delta=0.01)
 
 
 if __name__ == '__main__':
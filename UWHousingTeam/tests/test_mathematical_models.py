@@ -0,0 +1,275 @@
+"""
+Contains unit tests for the bidding price and monthly expenses models.
+"""
+import csv
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import Mathematical_Models
+
+# Constants
+ZIPCODES = np.array([98004, 98001, 98002, 98103, 98199, 98112, 98010])
+LIST_PRICES = np.array([650000., 420000., 300000., 815000., 560000.,
+                        1200000., 275000.])
+HOUSE_TYPES = np.array(['condo', 'townhouse', 'single family'])
+MORTGAGE_PERIODS = np.array([10., 15., 30.])
+INTEREST_RATES = np.array([0., 3.5, 5., 7.25])
+SCHEDULE_COLUMNS = ('payment', 'interest', 'principal', 'balance',
+                    'cumulative_interest')
+
+# Loans of different lengths, including a fractional period and no interest.
+LOAN_PRICES = np.array([300000., 450000., 120000.])
+LOAN_PERIODS = np.array([30., 15., 15.5])
+LOAN_RATES = np.array([5., 0., 3.5])
+
+
+def reference_amortization_schedule(list_price, mortgage_period,
+                                    interest_rate):
+    """
+    Calculates the schedule of one loan month by month.  The last payment
+    repays whatever balance is left.
+    :param list_price: The list price, which is the loan principal
+    :param mortgage_period: The mortgage period in years
+    :param interest_rate: The annual interest rate in percent
+    :return: A dictionary of lists of the monthly payment, interest,
+    principal, balance and cumulative interest
+    """
+    months = int(round(mortgage_period * 12))
+    payment = float(Mathematical_Models.amortized_payment(
+        list_price, mortgage_period, interest_rate))
+    monthly_rate = interest_rate / 1200
+    balance = list_price
+    cumulative_interest = 0.
+    schedule = {column: [] for column in SCHEDULE_COLUMNS}
+    for month in range(1, months + 1):
+        interest = balance * monthly_rate
+        principal = balance if month == months else payment - interest
+        balance -= principal
+        cumulative_interest += interest
+        for column, value in zip(SCHEDULE_COLUMNS,
+                                 (interest + principal, interest, principal,
+                                  balance, cumulative_interest)):
+            schedule[column].append(value)
+    return schedule
+
+
+def reference_bidding_price(zipcode, list_price, rng):
+    """
+    Calculates a bidding price with the scalar rules that bidding_prices
+    replaced, drawing from the given generator.
+    :param zipcode: The zipcode of the listing
+    :param list_price: The list price of the listing
+    :param rng: A numpy.random.Generator
+    :return: The bidding price
+    """
+    if zipcode in Mathematical_Models.hottest:
+        return list_price + (rng.integers(12, 18) / 100) * list_price
+    if zipcode in Mathematical_Models.medium_hot:
+        return list_price + (rng.integers(5, 10) / 100) * list_price
+    return list_price - (rng.integers(5, 10) / 100) * list_price
+
+
+def reference_monthly_expenses(list_price, mortgage_period, interest_rate,
+                               house_type):
+    """
+    Calculates monthly expenses one loan at a time, with the fixed payment
+    that a month-by-month balance shows repays the loan.
+    :param list_price: The list price, which is the loan principal
+    :param mortgage_period: The mortgage period in years
+    :param interest_rate: The annual interest rate in percent
+    :param house_type: The house type
+    :return: The monthly expenses
+    """
+
+    # Find the fixed payment, and check that it leaves no balance after the
+    # last month.
+    months = int(mortgage_period * 12)
+    monthly_rate = interest_rate / 1200
+    if monthly_rate == 0:
+        payment = list_price / months
+    else:
+        payment = list_price * monthly_rate / \
+            (1 - (1 + monthly_rate) ** -months)
+    balance = list_price
+    for _ in range(months):
+        balance = balance * (1 + monthly_rate) - payment
+    assert abs(balance) < 1e-6 * list_price, 'The loan is not repaid.'
+
+    # Add the loading on the straight-line repayment.
+    mortgage = list_price / months
+    if house_type in ['condo', 'townhouse']:
+        hoa = 0.11 * mortgage
+    else:
+        hoa = 0.035 * mortgage
+    return payment + (0.15 + 0.07 + 0.15 + 0.035) * mortgage + hoa
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for the bidding price and monthly expenses models.
+    """
+
+    def test_bidding_price(self):
+        """
+        Tests that a single bidding price is a markup of its tier.
+        :return: True or False
+        """
+        bids = [Mathematical_Models.bidding_price(98053, 650000., rng=seed)
+                for seed in range(50)]
+        self.assertIsInstance(bids[0], float)
+        markups = np.round((np.array(bids) / 650000. - 1) * 100)
+        return self.assertTrue(np.all((markups >= 12) & (markups <= 17)))
+
+    def test_bidding_prices(self):
+        """
+        Tests that the bidding prices of many listings are those of the
+        scalar rules, with the same random draws.
+        :return: True or False
+        """
+
+        # Price the listings at once, and one at a time from a generator
+        # with the same seed.
+        zipcodes = np.tile(ZIPCODES, 20)
+        list_prices = np.tile(LIST_PRICES, 20)
+        bids = Mathematical_Models.bidding_prices(zipcodes, list_prices,
+                                                  rng=7)
+        rng = np.random.default_rng(7)
+        expected = [reference_bidding_price(zipcode, list_price, rng)
+                    for zipcode, list_price in zip(zipcodes, list_prices)]
+        self.assertEqual(bids.shape, zipcodes.shape)
+        self.assertTrue(np.allclose(bids, expected))
+
+        # Assert that one zipcode is broadcast against many list prices.
+        return self.assertTrue(np.all(Mathematical_Models.bidding_prices(
+            98001, LIST_PRICES, rng=7) > LIST_PRICES))
+
+    def test_monthly_expenses(self):
+        """
+        Tests a single monthly expense, and that without interest the loan is
+        repaid in equal parts.
+        :return: True or False
+        """
+        self.assertAlmostEqual(
+            Mathematical_Models.monthly_expenses(700000, 30, 5, 'condo'),
+            reference_monthly_expenses(700000, 30, 5, 'condo'))
+        return self.assertAlmostEqual(
+            Mathematical_Models.monthly_expenses(360000, 30, 0, 'house'),
+            1000. * (1 + 0.15 + 0.07 + 0.15 + 0.035 + 0.035))
+
+    def test_monthly_expenses_grid(self):
+        """
+        Tests that a grid of monthly expenses over interest rates, mortgage
+        periods and house types is that of the loans one at a time.
+        :return: True or False
+        """
+        grid = Mathematical_Models.monthly_expenses_grid(
+            650000., MORTGAGE_PERIODS[None, :, None],
+            INTEREST_RATES[:, None, None], HOUSE_TYPES[None, None, :])
+        expected = [[[reference_monthly_expenses(650000., mortgage_period,
+                                                 interest_rate, house_type)
+                      for house_type in HOUSE_TYPES]
+                     for mortgage_period in MORTGAGE_PERIODS]
+                    for interest_rate in INTEREST_RATES]
+        self.assertEqual(grid.shape, (len(INTEREST_RATES),
+                                      len(MORTGAGE_PERIODS),
+                                      len(HOUSE_TYPES)))
+        return self.assertTrue(np.allclose(grid, expected))
+
+    def test_mortgage_period(self):
+        """
+        Tests that a mortgage period that is not positive is rejected rather
+        than priced as an infinite monthly cost.
+        :return: True or False
+        """
+        for mortgage_period in (0, -15, [30, 0]):
+            self.assertRaises(AssertionError,
+                              Mathematical_Models.monthly_expenses_grid,
+                              650000., mortgage_period, 4.5, 'condo')
+            self.assertRaises(AssertionError,
+                              Mathematical_Models.amortized_payment,
+                              650000., mortgage_period, 4.5)
+        return self.assertRaises(AssertionError,
+                                 Mathematical_Models.amortization_summary,
+                                 650000., 0, 4.5)
+
+    def test_amortization_schedule(self):
+        """
+        Tests that the schedules of several loans are those of the loans
+        month by month, and are zero once each loan is repaid.
+        :return: True or False
+        """
+        schedule = Mathematical_Models.amortization_schedule(
+            LOAN_PRICES, LOAN_PERIODS, LOAN_RATES)
+        self.assertEqual(schedule['payment'].shape, (3, 360))
+        for loan, loan_terms in enumerate(zip(LOAN_PRICES, LOAN_PERIODS,
+                                              LOAN_RATES)):
+            expected = reference_amortization_schedule(*loan_terms)
+            months = len(expected['payment'])
+            for column in SCHEDULE_COLUMNS:
+                self.assertTrue(np.allclose(schedule[column][loan, :months],
+                                            expected[column], atol=1e-6))
+            self.assertFalse(np.any(schedule['payment'][loan, months:]))
+            self.assertEqual(schedule['balance'][loan, months - 1], 0.)
+        return self.assertAlmostEqual(
+            schedule['payment'][1, 179], 450000. / 180)
+
+    def test_amortization_summary(self):
+        """
+        Tests that the loan totals and payoff dates are those of the loans
+        month by month.
+        :return: True or False
+        """
+        summary = Mathematical_Models.amortization_summary(
+            LOAN_PRICES, LOAN_PERIODS, LOAN_RATES, start_date='2017-01')
+        for loan, loan_terms in enumerate(zip(LOAN_PRICES, LOAN_PERIODS,
+                                              LOAN_RATES)):
+            expected = reference_amortization_schedule(*loan_terms)
+            self.assertAlmostEqual(summary['total_paid'][loan],
+                                   sum(expected['payment']), places=4)
+            self.assertAlmostEqual(summary['total_interest'][loan],
+                                   expected['cumulative_interest'][-1],
+                                   places=4)
+        self.assertEqual(summary['total_interest'][1], 0.)
+        return self.assertListEqual(summary['payoff_date'].astype(
+            str).tolist(), ['2046-12', '2031-12', '2032-06'])
+
+    def test_write_amortization_csv(self):
+        """
+        Tests that the streamed schedule file holds one row for each month of
+        each loan, with the values of the loans month by month.
+        :return: True or False
+        """
+
+        # Write the schedules in blocks that do not divide the loan lengths,
+        # and read them back by loan and month.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'schedule.csv')
+            rows = Mathematical_Models.write_amortization_csv(
+                path, LOAN_PRICES, LOAN_PERIODS, LOAN_RATES,
+                start_date='2017-01', block_months=7)
+            with open(path, 'r') as input_file:
+                records = list(csv.DictReader(input_file))
+        records = {(int(record['loan']), int(record['month'])): record
+                   for record in records}
+
+        # Assert that every month of every loan was written once, with its
+        # date and values.
+        self.assertEqual(rows, 360 + 180 + 186)
+        self.assertEqual(len(records), rows)
+        for loan, loan_terms in enumerate(zip(LOAN_PRICES, LOAN_PERIODS,
+                                              LOAN_RATES)):
+            expected = reference_amortization_schedule(*loan_terms)
+            for column in SCHEDULE_COLUMNS:
+                self.assertTrue(np.allclose(
+                    [float(records[loan, month + 1][column])
+                     for month in range(len(expected[column]))],
+                    expected[column], atol=0.005))
+        self.assertEqual(records[0, 1]['date'], '2017-01')
+        return self.assertEqual(records[2, 186]['date'], '2032-06')
+
+
+if __name__ == '__main__':
+    unittest.main()
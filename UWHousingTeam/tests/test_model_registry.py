@@ -0,0 +1,99 @@
+"""
+Contains unit tests for the model registry.
+"""
+import os
+import threading
+import unittest
+from unittest import mock
+
+from model_registry import ModelRegistry
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for the model registry.
+    """
+
+    def setUp(self):
+        """
+        Clears the environment variables that select another source of the
+        model.
+        :return: None
+        """
+        self.environment = mock.patch.dict(os.environ)
+        self.environment.start()
+        for variable in ('MODEL_ARTIFACT_FILE', 'SHARED_MODEL_STORE'):
+            os.environ.pop(variable, None)
+
+    def tearDown(self):
+        """
+        Restores the environment variables.
+        :return: None
+        """
+        self.environment.stop()
+
+    def test_is_ready(self):
+        """
+        Tests that the registry is not ready while the model is warming up,
+        and is ready once it has been built.
+        :return: True or False
+        """
+
+        # Hold the warm-up until the registry has been checked.
+        registry = ModelRegistry()
+        release = threading.Event()
+        model = mock.Mock()
+
+        def build_model():
+            release.wait()
+            return model
+
+        with mock.patch.object(ModelRegistry, 'build_model',
+                               side_effect=build_model):
+            registry.start_warm_up()
+            self.assertFalse(registry.is_ready)
+            self.assertIsNone(registry.get_model())
+            release.set()
+            registry.warm_up_thread.join()
+        self.assertTrue(registry.is_ready)
+        self.assertIsNone(registry.get_warm_up_error())
+        return self.assertIs(registry.get_model(), model)
+
+    def test_start_warm_up(self):
+        """
+        Tests that the warm-up builds a model ready for prediction in a
+        background thread, and is started only once.
+        :return: True or False
+        """
+        registry = ModelRegistry()
+        self.assertFalse(registry.is_ready)
+        registry.start_warm_up()
+        warm_up_thread = registry.warm_up_thread
+        self.assertTrue(warm_up_thread.daemon)
+        self.assertIsNot(warm_up_thread, threading.current_thread())
+        registry.start_warm_up()
+        self.assertIs(registry.warm_up_thread, warm_up_thread)
+        warm_up_thread.join()
+        self.assertIsNone(registry.get_warm_up_error())
+        self.assertTrue(registry.is_ready)
+        return self.assertTrue(registry.get_model().can_predict)
+
+    def test_warm_up_error(self):
+        """
+        Tests that an error that stops the warm-up is kept, and that the
+        registry does not become ready.
+        :return: True or False
+        """
+        registry = ModelRegistry()
+        error = ValueError('The sales data could not be read.')
+        with mock.patch.object(ModelRegistry, 'build_model',
+                               side_effect=error):
+            registry.start_warm_up()
+            registry.warm_up_thread.join()
+        self.assertFalse(registry.is_ready)
+        self.assertIsNone(registry.get_model())
+        return self.assertIs(registry.get_warm_up_error(), error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Contains unit tests for the pipeline metrics collectors.
+"""
+import unittest
+
+from pipeline_metrics import NULL_COLLECTOR, MetricsCollector
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for the pipeline metrics collectors.
+    """
+
+    def test_metrics_collector(self):
+        """
+        Tests MetricsCollector.stage, MetricsCollector.as_dict and
+        MetricsCollector.to_prometheus.
+        :return: True or False
+        """
+
+        # Record two runs of a stage, one with a row count set at the end.
+        collector = MetricsCollector()
+        with collector.stage('predict', 1):
+            pass
+        with collector.stage('predict') as stage:
+            stage.rows = 10
+
+        # Assert that both runs were totalled, and exported.
+        totals = collector.as_dict()['predict']
+        self.assertEqual(totals['calls'], 2)
+        self.assertEqual(totals['rows'], 11)
+        self.assertGreaterEqual(totals['seconds'], totals['max_seconds'])
+        metrics = collector.to_prometheus()
+        self.assertIn('# TYPE house_price_model_stage_memory_delta_bytes '
+                      'gauge\n', metrics)
+        self.assertIn('house_price_model_stage_memory_delta_bytes'
+                      '{stage="predict"} ', metrics)
+        collector.clear()
+        self.assertDictEqual(collector.as_dict(), {})
+        return self.assertIn(
+            'house_price_model_stage_rows_total{stage="predict"} 11\n',
+            metrics)
+
+    def test_null_collector(self):
+        """
+        Tests that NULL_COLLECTOR records nothing.
+        :return: True or False
+        """
+        with NULL_COLLECTOR.stage('predict', 1) as stage:
+            stage.rows = 10
+        NULL_COLLECTOR.record('predict', 0.5, rows=10, memory_delta=4096)
+        NULL_COLLECTOR.clear()
+        self.assertEqual(NULL_COLLECTOR.to_prometheus(), '')
+        return self.assertDictEqual(NULL_COLLECTOR.as_dict(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
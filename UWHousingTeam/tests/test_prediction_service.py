@@ -0,0 +1,157 @@
+"""
+Contains unit tests for the prediction service.
+"""
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from house_price_model_2 import HousePriceModel
+from prediction_service import PredictionService
+
+# Constants
+HOME = {'sale_date': '2017-07-01', 'bathrooms': 3, 'sqft_living': 2640,
+        'sqft_lot': 3920, 'waterfront': 0, 'view': 0, 'condition': 5,
+        'grade': 6, 'zipcode': 98103}
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for the prediction service.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Builds the model shared by the tests.
+        :return: None
+        """
+        cls.model = HousePriceModel()
+        cls.model.initialize_model()
+        return None
+
+    def route(self, service, method, path, request):
+        """
+        Runs a request through the routes of a service.
+        :param service: The prediction service
+        :param method: The HTTP method
+        :param path: The path of the endpoint
+        :param request: The JSON serializable request
+        :return: The HTTP status code, and the response
+        """
+        return asyncio.run(service.route(method, path,
+                                         json.dumps(request).encode('utf-8')))
+
+    def test_bid(self):
+        """
+        Tests that a zipcode given as a string is priced in its tier, and
+        that a zipcode that is not a number is a bad request.
+        :return: True or False
+        """
+        service = PredictionService(self.model)
+        status, response = self.route(service, 'POST', '/bid',
+                                      {'zipcode': '98004',
+                                       'list_price': 100000})
+        self.assertEqual(status, 200)
+        self.assertTrue(112000 <= response['bid'] <= 117000)
+        status, response = self.route(service, 'POST', '/bid',
+                                      {'zipcode': ['98004', 98001],
+                                       'list_price': 100000})
+        self.assertEqual(status, 200)
+        self.assertTrue(all(bid > 100000 for bid in response['bids']))
+        for zipcode in ('Seattle', 98004.5):
+            self.assertEqual(self.route(service, 'POST', '/bid',
+                                        {'zipcode': zipcode,
+                                         'list_price': 100000})[0], 400)
+        return None
+
+    def test_internal_error(self):
+        """
+        Tests that an unexpected error is logged, and reported as an internal
+        error.
+        :return: True or False
+        """
+        service = PredictionService(self.model)
+        with mock.patch('Mathematical_Models.bidding_prices',
+                        side_effect=RuntimeError('The tiers are missing.')):
+            with self.assertLogs('prediction_service', 'ERROR') as logs:
+                status, response = self.route(
+                    service, 'POST', '/bid',
+                    {'zipcode': 98004, 'list_price': 100000})
+        self.assertEqual(status, 500)
+        self.assertDictEqual(response, {'error': 'Internal Server Error'})
+        return self.assertIn('The tiers are missing.', logs.output[0])
+
+    def test_non_finite(self):
+        """
+        Tests that a request with a number that is not finite, or whose
+        result is not finite, is a bad request.
+        :return: True or False
+        """
+        service = PredictionService(self.model)
+        status, response = self.route(service, 'POST', '/predict',
+                                      dict(HOME, bathrooms=None))
+        self.assertEqual(status, 400)
+        self.assertIn('bathrooms', response['error'])
+        self.assertEqual(self.route(service, 'POST', '/predict/batch',
+                                    {'homes': [HOME, dict(HOME, grade=None)]}
+                                    )[0], 400)
+        status, response = self.route(service, 'POST', '/monthly-cost',
+                                      {'list_price': 500000,
+                                       'mortgage_period': 0,
+                                       'interest_rate': 4.5,
+                                       'house_type': 'single_family'})
+        self.assertEqual(status, 400)
+        return self.assertEqual(self.route(service, 'POST', '/monthly-cost',
+                                           {'list_price': 500000,
+                                            'mortgage_period': 30,
+                                            'interest_rate': None,
+                                            'house_type': 'single_family'}
+                                           )[0], 400)
+
+    def test_predict(self):
+        """
+        Tests that single predictions are batched, and match the model.
+        :return: True or False
+        """
+
+        # Send three predictions at once.
+        service = PredictionService(self.model, window_ms=50.)
+
+        async def predict_together():
+            return await asyncio.gather(*[service.route(
+                'POST', '/predict', json.dumps(HOME).encode('utf-8'))
+                                          for _ in range(3)])
+        responses = asyncio.run(predict_together())
+
+        # Assert that they were made in one batch, and priced as the model
+        # prices the home.
+        self.assertEqual(service.batcher.batch_sizes, [3])
+        features = service.to_model_features(HOME)
+        self.assertEqual(features['sale_day'],
+                         self.model.calculate_sale_day_by_day(2017, 7, 1))
+        price = self.model.predict(features)
+        return self.assertTrue(all(
+            status == 200 and abs(response['price'] - price) < 0.01
+            for status, response in responses))
+
+    def test_route(self):
+        """
+        Tests the batch endpoint, and the responses to bad requests.
+        :return: True or False
+        """
+        service = PredictionService(self.model)
+        status, response = self.route(service, 'POST', '/predict/batch',
+                                      {'homes': [HOME, HOME]})
+        self.assertEqual(status, 200)
+        self.assertEqual(len(response['prices']), 2)
+        self.assertEqual(self.route(service, 'GET', '/predict', {})[0], 405)
+        self.assertEqual(self.route(service, 'GET', '/missing', {})[0], 404)
+        bad_home = dict(HOME)
+        del bad_home['zipcode']
+        return self.assertEqual(
+            self.route(service, 'POST', '/predict', bad_home)[0], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
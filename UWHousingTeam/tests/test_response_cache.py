@@ -0,0 +1,122 @@
+"""
+Contains unit tests for the response cache.
+"""
+import unittest
+
+from response_cache import ResponseCache
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for the response cache.
+    """
+
+    def setUp(self):
+        """
+        Records the keys of the responses computed by the tests.
+        :return: None
+        """
+        self.computed = []
+
+    def compute(self, key):
+        """
+        Makes a function that records the computation of a response.
+        :param key: The key of the response
+        :return: A function of no arguments that computes the response
+        """
+        def compute_response():
+            self.computed.append(key)
+            return 'response {}'.format(key)
+        return compute_response
+
+    def get(self, cache, key, version=None):
+        """
+        Gets a response through the cache.
+        :param cache: The response cache
+        :param key: The key of the response
+        :param version: The model version
+        :return: The response
+        """
+        return cache.get_or_compute(key, self.compute(key), version=version)
+
+    def test_capacity(self):
+        """
+        Tests that the cache never holds more than its maximum size, and
+        counts its hits, misses and evictions.
+        :return: True or False
+        """
+        cache = ResponseCache(max_size=3)
+        for key in range(10):
+            self.get(cache, key)
+            self.assertLessEqual(len(cache.entries), 3)
+        self.assertEqual(self.get(cache, 9), 'response 9')
+        self.assertListEqual(list(cache.entries), [7, 8, 9])
+        return self.assertDictEqual(cache.statistics(),
+                                    {'size': 3, 'max_size': 3, 'hits': 1,
+                                     'misses': 10, 'evictions': 7,
+                                     'version': None})
+
+    def test_eviction_order(self):
+        """
+        Tests that the least recently used response is evicted first, and
+        that a hit makes a response the most recently used.
+        :return: True or False
+        """
+
+        # Fill the cache, then use the oldest response again.
+        cache = ResponseCache(max_size=3)
+        for key in ('a', 'b', 'c'):
+            self.get(cache, key)
+        self.get(cache, 'a')
+
+        # Add two responses, which evict 'b' and then 'c', but not 'a'.
+        self.get(cache, 'd')
+        self.assertListEqual(list(cache.entries), ['c', 'a', 'd'])
+        self.get(cache, 'e')
+        self.assertListEqual(list(cache.entries), ['a', 'd', 'e'])
+
+        # Assert that only the evicted responses are computed again.
+        self.computed = []
+        for key in ('a', 'b', 'e'):
+            self.get(cache, key)
+        return self.assertListEqual(self.computed, ['b'])
+
+    def test_normalize(self):
+        """
+        Tests that equal features give the same key in any order.
+        :return: True or False
+        """
+        return self.assertEqual(
+            ResponseCache.normalize({'grade': 6, 'bathrooms': 2.5}),
+            ResponseCache.normalize({'bathrooms': 2.5, 'grade': 6.0}))
+
+    def test_version(self):
+        """
+        Tests that the cache forgets every response when the model version
+        changes, and that a response computed with an older version is not
+        cached.
+        :return: True or False
+        """
+
+        # Cache responses with the first version, then get them with a new
+        # one.
+        cache = ResponseCache()
+        for key in ('a', 'b'):
+            self.get(cache, key, version=1)
+        self.get(cache, 'a', version=2)
+        self.assertListEqual(self.computed, ['a', 'b', 'a'])
+        self.assertListEqual(list(cache.entries), ['a'])
+
+        # Compute a response with the old version while the model is
+        # rebuilt, and assert that it is returned but not cached.
+        def compute_during_rebuild():
+            self.get(cache, 'c', version=3)
+            return 'stale response'
+        self.assertEqual(cache.get_or_compute('b', compute_during_rebuild,
+                                              version=2), 'stale response')
+        self.assertListEqual(list(cache.entries), ['c'])
+        return self.assertEqual(cache.statistics()['version'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
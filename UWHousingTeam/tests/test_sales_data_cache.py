@@ -0,0 +1,166 @@
+"""
+Contains unit tests for the sales data binary column cache.
+"""
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+import sales_data_cache
+import sales_data_schema
+
+# Constants
+HEADER = 'id,date,price,bedrooms,bathrooms,grade,lat,long,List price\n'
+ROWS = ('1999700045,20140502T000000,313000,3,1.5,7,47.7658,-122.339,420760\n'
+        '1860600135,20140502T000000,2380000,5,2.5,10,47.6345,-122.367,1956400\n'
+        '5467900070,20140502T000000,342000,3,2,7,47.3672,-122.031,368820\n')
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for the sales data binary column cache.
+    """
+
+    def setUp(self):
+        """
+        Writes a small sales data CSV in a temporary directory.
+        :return: None
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.directory.name, 'sales.csv')
+        self.cache_path = os.path.join(self.directory.name, 'cache')
+        with open(self.csv_path, 'w') as output_file:
+            output_file.write(HEADER + ROWS)
+
+    def tearDown(self):
+        """
+        Removes the temporary directory.
+        :return: None
+        """
+        self.directory.cleanup()
+
+    def test_load_cache(self):
+        """
+        Tests that the loaded columns are the memory-mapped column files
+        rather than copies of them.
+        :return: True or False
+        """
+        sales_data_cache.build_cache(self.csv_path, self.cache_path)
+        sales_data = sales_data_cache.load_cache(self.cache_path)
+        return self.assertTrue(all(
+            isinstance(sales_data[name].values, np.memmap)
+            for name in sales_data.columns))
+
+    def test_narrow_column(self):
+        """
+        Tests sales_data_cache.narrow_column.
+        :return: True or False
+        """
+        self.assertEqual(sales_data_cache.narrow_column(
+            'grade', np.array([1, 13])).dtype, np.uint8)
+        self.assertEqual(sales_data_cache.narrow_column(
+            'id', np.array([1000102, 9900000190])).dtype, np.int64)
+        self.assertEqual(sales_data_cache.narrow_column(
+            'price', np.array([75000, 7700000])).dtype, np.int32)
+        self.assertEqual(sales_data_cache.narrow_column(
+            'other', np.array([1, 13])).dtype, np.uint8)
+        self.assertEqual(sales_data_cache.narrow_column(
+            'bathrooms', np.array([0.75, 2.5])).dtype, np.float32)
+        self.assertEqual(sales_data_cache.narrow_column(
+            'lat', np.array([47.7658, 47.6345])).dtype, np.float32)
+        return self.assertEqual(sales_data_cache.narrow_column(
+            'other', np.array([47.7658, 47.6345])).dtype, np.float64)
+
+    def test_column_types(self):
+        """
+        Tests that the cache gives the same column types as the CSV.
+        :return: True or False
+        """
+        sales_data = sales_data_cache.read_sales_data(self.csv_path,
+                                                      self.cache_path)
+        return self.assertDictEqual(
+            sales_data.dtypes.to_dict(),
+            sales_data_schema.read_sales_csv(self.csv_path).dtypes.to_dict())
+
+    def test_rebuild_keeps_mapped_columns(self):
+        """
+        Tests that rebuilding the cache replaces the column files rather than
+        rewriting them, so that columns already memory-mapped are unchanged,
+        and that no temporary files are left behind.
+        :return: True or False
+        """
+        sales_data = sales_data_cache.read_sales_data(self.csv_path,
+                                                      self.cache_path)
+        with open(self.csv_path, 'w') as output_file:
+            output_file.write(HEADER + ROWS.replace('313000', '314000'))
+        sales_data_cache.read_sales_data(self.csv_path, self.cache_path)
+        self.assertEqual(sales_data['price'].iloc[0], 313000)
+        self.assertEqual(sales_data_cache.load_cache(
+            self.cache_path)['price'].iloc[0], 314000)
+        return self.assertListEqual(
+            [name for name in os.listdir(self.cache_path)
+             if name.endswith('.tmp')], [])
+
+    def test_read_sales_data(self):
+        """
+        Tests sales_data_cache.read_sales_data.
+        :return: True or False
+        """
+
+        # Read through the cache, which builds it, and check the types and
+        # values of the columns.
+        sales_data = sales_data_cache.read_sales_data(self.csv_path,
+                                                      self.cache_path)
+        self.assertTrue(sales_data_cache.cache_is_current(self.csv_path,
+                                                          self.cache_path))
+        self.assertListEqual(sales_data.columns.tolist(),
+                             HEADER.strip().split(','))
+        self.assertEqual(sales_data['grade'].dtype, np.uint8)
+        self.assertEqual(sales_data['date'].dt.day.tolist(), [2, 2, 2])
+        return self.assertListEqual(sales_data['price'].tolist(),
+                                    [313000, 2380000, 342000])
+
+    def test_rebuild_when_changed(self):
+        """
+        Tests that the cache is rebuilt when the CSV changes, but not when it
+        is only touched.
+        :return: True or False
+        """
+
+        # Build the cache, then touch the CSV without changing it.
+        sales_data_cache.read_sales_data(self.csv_path, self.cache_path)
+        later = time.time() + 10
+        os.utime(self.csv_path, (later, later))
+        self.assertTrue(sales_data_cache.cache_is_current(self.csv_path,
+                                                          self.cache_path))
+
+        # Change the CSV, and read it again.
+        with open(self.csv_path, 'a') as output_file:
+            output_file.write(ROWS)
+        self.assertFalse(sales_data_cache.cache_is_current(self.csv_path,
+                                                           self.cache_path))
+        return self.assertEqual(len(sales_data_cache.read_sales_data(
+            self.csv_path, self.cache_path)), 6)
+
+    def test_source_hash(self):
+        """
+        Tests that the hash of an unchanged CSV is taken from the manifest,
+        and that a changed CSV is hashed again.
+        :return: True or False
+        """
+        sales_data_cache.read_sales_data(self.csv_path, self.cache_path)
+        csv_hash = sales_data_cache.hash_file(self.csv_path)
+        with mock.patch.object(sales_data_cache, 'hash_file') as hash_file:
+            self.assertEqual(sales_data_cache.source_hash(
+                self.csv_path, self.cache_path), csv_hash)
+            self.assertFalse(hash_file.called)
+        with open(self.csv_path, 'a') as output_file:
+            output_file.write(ROWS)
+        return self.assertNotEqual(sales_data_cache.source_hash(
+            self.csv_path, self.cache_path), csv_hash)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+Contains unit tests for the sales data schema.
+"""
+import os
+import tempfile
+import unittest
+
+import sales_data_schema
+
+# Constants
+HEADER = 'id,date,price,bedrooms,bathrooms,grade,lat,long,List price\n'
+ROWS = ('1999700045,20140502T000000,313000,3,1.5,7,47.7658,-122.339,420760\n'
+        '1860600135,20140502T000000,2.38E+06,5,2.5,10,47.6345,-122.367,1956400\n'
+        '5467900070,20150227T000000,342000,3,2,7,47.3672,-122.031,368820\n')
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for the sales data schema.
+    """
+
+    def test_read_sales_csv(self):
+        """
+        Tests sales_data_schema.read_sales_csv.
+        :return: True or False
+        """
+
+        # Write a small sales data file, and read it with the schema.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sales.csv')
+            with open(path, 'w') as output_file:
+                output_file.write(HEADER + ROWS)
+            sales_data = sales_data_schema.read_sales_csv(path)
+
+        # Assert that every column has its declared type, that the price in
+        # scientific notation was read, and that the dates were parsed.
+        for column, column_type in sales_data_schema.COLUMN_TYPES.items():
+            if column in sales_data:
+                self.assertEqual(sales_data[column].dtype, column_type)
+        self.assertListEqual(sales_data['price'].tolist(),
+                             [313000, 2380000, 342000])
+        return self.assertListEqual(
+            sales_data['date'].dt.strftime('%Y-%m-%d').tolist(),
+            ['2014-05-02', '2014-05-02', '2015-02-27'])
+
+
+if __name__ == '__main__':
+    unittest.main()
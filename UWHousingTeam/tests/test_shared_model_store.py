@@ -0,0 +1,74 @@
+"""
+Contains unit tests for the shared model store.
+"""
+import unittest
+
+import numpy as np
+
+import shared_model_store
+from house_price_model_2 import HousePriceModel
+
+# Constants
+HOME = {'sale_day': 1278, 'bathrooms': 3, 'sqft_living': 2640,
+        'sqft_lot': 3920, 'waterfront': 0, 'view': 0, 'condition': 5,
+        'grade': 6, 'location': 1}
+
+
+class MyTestCase(unittest.TestCase):
+    """
+    Contains unit tests for the shared model store.
+    """
+
+    def test_attach_store(self):
+        """
+        Tests that an attached store predicts as the model it was written
+        from, and maps its columns read-only.
+        :return: True or False
+        """
+
+        # Write a store of the model and its sales data.
+        model = HousePriceModel()
+        model.initialize_model()
+        store_path = shared_model_store.create_store_path()
+        try:
+            shared_model_store.write_store(
+                store_path, model,
+                {'sales_data': model.get_sales_data()[['date', 'price']]})
+            attached_model, column_sets = \
+                shared_model_store.attach_store(store_path)
+        finally:
+            shared_model_store.remove_store(store_path)
+
+        # Assert that the prediction and the columns are unchanged, and that
+        # the columns cannot be written.
+        self.assertAlmostEqual(attached_model.predict(HOME),
+                               model.predict(HOME), places=2)
+        prices = column_sets['sales_data']['price']
+        self.assertIsInstance(prices, np.memmap)
+        self.assertFalse(prices.flags.writeable)
+        return self.assertTrue(np.array_equal(
+            column_sets['sales_data']['date'],
+            model.get_sales_data()['date'].values))
+
+    def test_write_store(self):
+        """
+        Tests that columns of Python objects are refused.
+        :return: True or False
+        """
+        model = HousePriceModel()
+        model.initialize_model()
+        store_path = shared_model_store.create_store_path()
+        try:
+            with self.assertRaises(AssertionError):
+                shared_model_store.write_store(
+                    store_path, model,
+                    {'homes': {'name': np.array(['a', None], dtype=object)}})
+            with self.assertRaises(AssertionError):
+                shared_model_store.attach_store(store_path)
+        finally:
+            shared_model_store.remove_store(store_path)
+        return None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,16 +3,50 @@ Contains the house price controller.
 
 DON'T USE THIS CONTROLLER!  Use the HousePriceModel in house_price_model_2.py.
 """
-from house_price_model import construct_models
+from concurrent.futures import ThreadPoolExecutor
+
+from compact_forest import compact_when_ready
+from house_price_model import TRAINING_SECONDS
+from house_price_model import construct_models_concurrently
+from house_price_model import create_model_data_frame
 from house_price_model import get_base_date
+import numpy as np
 import pandas as pd
 
 # Constants
 FOREST_FACTOR = 3.0
+FOREST_MAX_DEPTH = None
 RIDGE_FACTOR = 0.001
 
-# Construct the price models.
-RIDGE_MODEL, FOREST_MODEL = construct_models()
+# The sales data columns named differently in a feature dictionary.
+SALES_DATA_NAMES = {'latitude': 'lat',
+                    'longitude': 'long',
+                    'list_price': 'List price'}
+
+
+def start_models(executor):
+    """
+    Starts constructing the price models at the same time, without waiting
+    for them.  The random forest is flattened into its compact form, cut at
+    FOREST_MAX_DEPTH, as soon as it is fitted.  Only the compact form is
+    kept, so that the sklearn forest is released once flattened.
+
+    :param executor: The executor in which to construct the models, with at
+    least two workers
+    :return: A future ridge regression model, and a future compact random
+    forest
+    """
+    ridge_future, forest_future = construct_models_concurrently(executor)
+    return ridge_future, executor.submit(compact_when_ready, forest_future,
+                                         FOREST_MAX_DEPTH)
+
+
+# Start constructing the price models.  Ridge predictions are served as soon
+# as the ridge model is ready, while the random forest finishes.  Single
+# homes and batches of homes are both priced by the compact forest.
+TRAINING_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+RIDGE_FUTURE, COMPACT_FOREST_FUTURE = start_models(TRAINING_EXECUTOR)
+TRAINING_EXECUTOR.shutdown(wait=False)
 
 
 def create_test_frame(incoming_feature_dictionary):
@@ -95,21 +129,92 @@ def create_test_frame(incoming_feature_dictionary):
     return pd.DataFrame(data=outgoing_feature_dictionary, index=[0])
 
 
+def create_test_frames(listings):
+    """
+    Creates a test data frame for many homes at once.  Each listing has the
+    keys of an incoming feature dictionary for create_test_frame(), with the
+    same defaults.  The features are encoded exactly as the training data
+    is, by create_model_data_frame().
+
+    :param listings: A list of feature dictionaries, or a data frame with a
+    column per feature
+    :return: A data frame with a row per home
+    """
+
+    # Rename the listing features to the sales data columns.
+    listings = pd.DataFrame(listings).reset_index(drop=True)
+    source = listings.rename(columns=SALES_DATA_NAMES)
+
+    # Parse every sale date in one call, and fill in the defaults.
+    source['date'] = pd.to_datetime(pd.DataFrame(
+        {'year': listings['sale_year'],
+         'month': listings.get('sale_month', 1),
+         'day': listings.get('sale_day', 1)}).fillna(1))
+    source['yr_renovated'] = source.get('yr_renovated', 0)
+    source['yr_renovated'] = source['yr_renovated'].fillna(0)
+    for column, default in (('sqft_living15', 'sqft_living'),
+                            ('sqft_lot15', 'sqft_lot')):
+        source[column] = source.get(column, source[default])
+        source[column] = source[column].fillna(source[default])
+
+    # Encode the features as the training data is, without the response.
+    source['price'] = np.nan
+    return create_model_data_frame(source).drop('price', axis=1)
+
+
+def get_training_seconds():
+    """
+    Gets the wall clock seconds taken to fit each model that is ready.
+
+    :return: A dictionary of seconds by model name, 'ridge' or 'forest'
+    """
+    return dict(TRAINING_SECONDS)
+
+
+def is_forest_ready():
+    """
+    Determines if the random forest model is ready for predictions.
+
+    :return: True if the random forest model is ready, false otherwise
+    """
+    return COMPACT_FOREST_FUTURE.done()
+
+
+def predict_using_both(house_frames):
+    """
+    Predicts house prices for many homes at once using both models, waiting
+    for the models if they are not yet ready.
+
+    :param house_frames: A data frame describing the houses, e.g. from
+    create_test_frames()
+    :return: An array of ridge regression predictions, and an array of
+    random forest predictions, one per house
+    """
+    ridge_prices = RIDGE_FUTURE.result().predict(X=house_frames) * RIDGE_FACTOR
+    forest_prices = COMPACT_FOREST_FUTURE.result().predict(X=house_frames) * \
+        FOREST_FACTOR
+    return np.round(ridge_prices, 2), np.round(forest_prices, 2)
+
+
 def predict_using_forest(house_frame):
     """
-    Predicts a house price using the random forest model.
+    Predicts a house price using the random forest model, waiting for the
+    model if it is not yet ready.
 
     :param house_frame: A data frame describing the house.
     :return: The predicted price of the house.
     """
-    return round(float(FOREST_MODEL.predict(X=house_frame) * FOREST_FACTOR), 2)
+    return round(float(COMPACT_FOREST_FUTURE.result().predict(
+        X=house_frame) * FOREST_FACTOR), 2)
 
 
 def predict_using_ridge(house_frame):
     """
-    Predicts a house price using the ridge regression model.
+    Predicts a house price using the ridge regression model, waiting for the
+    model if it is not yet ready.
 
     :param house_frame: A data frame describing the house.
     :return: The predicted price of the house.
     """
-    return round(float(RIDGE_MODEL.predict(X=house_frame) * RIDGE_FACTOR), 2)
+    return round(float(RIDGE_FUTURE.result().predict(X=house_frame) *
+                       RIDGE_FACTOR), 2)
@@ -4,16 +4,24 @@ Contains the house price model.
 DON'T USE THIS MODEL!  Use the HousePriceModel in house_price_model_2.py.
 """
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import RidgeCV
 
+from sales_data_schema import read_sales_csv
+
 # Constants
 BASE_DATE = pd.to_datetime('20140101', format='%Y%m%d', errors='ignore')
 TO_TYPE = 'category'
 
+# The wall clock seconds taken to fit each model, by model name, as each
+# model finishes.
+TRAINING_SECONDS = {}
+
 # Note: It is expected that the following environment variables will be set so
 # that the house price model will be able to locate its training data:
 #
@@ -25,7 +33,7 @@ TO_TYPE = 'category'
 
 # Construct the sales data path, and read the sales data.
 SALES_DATA_PATH = os.path.join(os.environ['SALES_DATA_PATH'], os.environ['SALES_DATA_FILE'])
-SALES_DATA = pd.read_csv(SALES_DATA_PATH, parse_dates=['date'])
+SALES_DATA = read_sales_csv(SALES_DATA_PATH)
 
 
 # Data cleansing plan:
@@ -65,6 +73,18 @@ def construct_models():
     return train_models(create_model_data_frame(SALES_DATA))
 
 
+def construct_models_concurrently(executor):
+    """
+    Starts constructing a ridge regression model, and a random forest model
+    for housing price data, without waiting for them.
+
+    :param executor: The executor in which to fit the models
+    :return: A future ridge regression model, and a future random forest
+    model for housing price data
+    """
+    return start_training(create_model_data_frame(SALES_DATA), executor)
+
+
 def create_model_data_frame(source):
     """
     Creates a data frame suitable for constructing a model.
@@ -148,12 +168,11 @@ def get_base_date():
     return BASE_DATE
 
 
-def train_models(my_model_data):
+def create_models():
     """
-    Trains a ridge regression model, and a random forest model, and returns
-    them.
+    Creates an unfitted ridge regression model, and an unfitted random forest
+    model that fits its trees on every core.
 
-    :param my_model_data: The model data on which to train
     :return: A ridge regression model, and a random forest model
     """
 
@@ -167,14 +186,60 @@ def train_models(my_model_data):
                              store_cv_values=True)
 
     # Construct the random forest model.
-    my_forest_model = RandomForestRegressor()
+    my_forest_model = RandomForestRegressor(n_jobs=-1)
+    return my_ridge_model, my_forest_model
+
+
+def fit_model(name, model, predictors, response):
+    """
+    Fits a model, and records the wall clock seconds taken in
+    TRAINING_SECONDS.
+
+    :param name: The name of the model
+    :param model: The model to fit
+    :param predictors: The predictors on which to fit
+    :param response: The response on which to fit
+    :return: The fitted model
+    """
+    start = time.time()
+    model.fit(X=predictors, y=response)
+    TRAINING_SECONDS[name] = time.time() - start
+    return model
+
+
+def start_training(my_model_data, executor):
+    """
+    Starts fitting a ridge regression model, and a random forest model at
+    the same time, without waiting for them.
+
+    :param my_model_data: The model data on which to train
+    :param executor: The executor in which to fit the models, with at least
+    two workers
+    :return: A future ridge regression model, and a future random forest
+    model
+    """
 
     # Divide the model data into predictor and response.
     response_field = 'price'
     predictors = my_model_data.ix[:, response_field != my_model_data.columns]
     response = my_model_data[response_field]
 
-    # Fit the models, and return them.
-    my_ridge_model.fit(X=predictors, y=response)
-    my_forest_model.fit(X=predictors, y=response)
-    return my_ridge_model, my_forest_model
+    # Start fitting the models, and return their futures.
+    my_ridge_model, my_forest_model = create_models()
+    return (executor.submit(fit_model, 'ridge', my_ridge_model, predictors,
+                            response),
+            executor.submit(fit_model, 'forest', my_forest_model, predictors,
+                            response))
+
+
+def train_models(my_model_data):
+    """
+    Trains a ridge regression model, and a random forest model at the same
+    time, and returns them.
+
+    :param my_model_data: The model data on which to train
+    :return: A ridge regression model, and a random forest model
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        ridge_future, forest_future = start_training(my_model_data, executor)
+        return ridge_future.result(), forest_future.result()
@@ -0,0 +1,114 @@
+"""
+Contains a load test of the house price prediction service.
+
+Concurrent clients, each on its own kept-alive connection, send requests to
+an endpoint of a running prediction_service.py for a number of seconds.
+The latency percentiles and the requests per second are then reported,
+e.g.:
+
+python load_test_prediction_service.py --clients 64 --seconds 10 --endpoint /predict
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+# Constants
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+PERCENTILES = (50, 90, 99)
+
+# Example requests for each endpoint.
+HOME = {'sale_date': '2017-07-01', 'bathrooms': 3, 'sqft_living': 2640,
+        'sqft_lot': 3920, 'waterfront': 0, 'view': 0, 'condition': 5,
+        'grade': 6, 'zipcode': 98103}
+REQUESTS = {'/predict': HOME,
+            '/predict/batch': {'homes': [HOME] * 100},
+            '/bid': {'zipcode': 98053, 'list_price': 650000},
+            '/monthly-cost': {'list_price': 700000, 'mortgage_period': 30,
+                              'interest_rate': 5, 'house_type': 'condo'}}
+
+
+async def run_client(host, port, endpoint, deadline, latencies):
+    """
+    Sends requests to an endpoint on one connection until a deadline.
+    :param host: The host of the service
+    :param port: The port of the service
+    :param endpoint: The path of the endpoint
+    :param deadline: The time.perf_counter() at which to stop
+    :param latencies: A list to which the latency of each request is added
+    :return: The number of failed requests
+    """
+    body = json.dumps(REQUESTS[endpoint]).encode('utf-8')
+    request = 'POST {} HTTP/1.1\r\nHost: {}\r\nContent-Type: ' \
+              'application/json\r\nContent-Length: {}\r\n\r\n'.format(
+                  endpoint, host, len(body)).encode('latin-1') + body
+    reader, writer = await asyncio.open_connection(host, port)
+    failures = 0
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if b' 200 ' not in status_line:
+                failures += 1
+    finally:
+        writer.close()
+    return failures
+
+
+async def run_load_test(host=DEFAULT_HOST, port=DEFAULT_PORT,
+                        endpoint='/predict', clients=64, seconds=10.):
+    """
+    Runs concurrent clients against an endpoint, and summarizes them.
+    :param host: The host of the service
+    :param port: The port of the service
+    :param endpoint: The path of the endpoint
+    :param clients: The number of concurrent clients
+    :param seconds: How long to send requests for
+    :return: A dictionary of the requests, failures, requests per second,
+    and latency percentiles in milliseconds
+    """
+    latencies = []
+    start = time.perf_counter()
+    failures = await asyncio.gather(*[
+        run_client(host, port, endpoint, start + seconds, latencies)
+        for _ in range(clients)])
+    elapsed = time.perf_counter() - start
+    milliseconds = np.array(latencies) * 1000.
+    results = {'endpoint': endpoint,
+               'clients': clients,
+               'requests': len(latencies),
+               'failures': sum(failures),
+               'requests_per_second': len(latencies) / elapsed}
+    results.update({'p{}_ms'.format(percentile):
+                        float(np.percentile(milliseconds, percentile))
+                    for percentile in PERCENTILES})
+    return results
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    PARSER.add_argument('--host', default=DEFAULT_HOST)
+    PARSER.add_argument('--port', type=int, default=DEFAULT_PORT)
+    PARSER.add_argument('--endpoint', default='/predict',
+                        choices=sorted(REQUESTS))
+    PARSER.add_argument('--clients', type=int, default=64)
+    PARSER.add_argument('--seconds', type=float, default=10.)
+    ARGUMENTS = PARSER.parse_args()
+    print(json.dumps(asyncio.run(run_load_test(
+        ARGUMENTS.host, ARGUMENTS.port, ARGUMENTS.endpoint,
+        ARGUMENTS.clients, ARGUMENTS.seconds)), indent=2))
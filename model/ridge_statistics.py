@@ -0,0 +1,100 @@
+"""
+Contains running sufficient statistics for a standardized ridge regression.
+
+The statistics are the number of rows, the means of the predictors and the
+response, the co-moments of the predictors, and the cross moments of the
+predictors with the response, all about their means.  Batches of rows are
+merged into them in O(rows x predictors ** 2) with the pairwise update of
+Chan, Golub and LeVeque, which stays accurate where raw sums of squares
+would not.  The standardized ridge solution is then found from the
+statistics alone, without the rows.
+"""
+import numpy as np
+
+# Constants
+CHUNK_ROWS = 65536
+
+
+class RidgeStatistics(object):
+    """
+    Contains running sufficient statistics for a standardized ridge
+    regression.
+    """
+
+    def __init__(self, predictor_count):
+        """
+        Initializes empty statistics.
+        :param predictor_count: The number of predictors
+        """
+        self.count = 0
+        self.predictor_means = np.zeros(predictor_count)
+        self.response_mean = 0.
+        self.predictor_moments = np.zeros((predictor_count, predictor_count))
+        self.response_moments = np.zeros(predictor_count)
+        return None
+
+    def add(self, predictors, response):
+        """
+        Merges a batch of rows into the statistics.
+        :param predictors: A matrix of predictors, one row per observation
+        :param response: A vector of responses, one per observation
+        :return: None
+        """
+
+        # Calculate the statistics of the batch about its own means, a chunk
+        # of rows at a time, so that the batch is never copied whole.
+        predictors = np.asarray(predictors, dtype=np.float64)
+        response = np.asarray(response, dtype=np.float64)
+        batch_count = len(response)
+        if batch_count == 0:
+            return None
+        batch_predictor_means = predictors.mean(axis=0)
+        batch_response_mean = response.mean()
+        batch_predictor_moments = np.zeros_like(self.predictor_moments)
+        batch_response_moments = np.zeros_like(self.response_moments)
+        for start in range(0, batch_count, CHUNK_ROWS):
+            centered = predictors[start:start + CHUNK_ROWS] - \
+                batch_predictor_means
+            batch_predictor_moments += np.dot(centered.T, centered)
+            batch_response_moments += np.dot(
+                centered.T,
+                response[start:start + CHUNK_ROWS] - batch_response_mean)
+
+        # Merge the batch, correcting the moments for the shift between the
+        # means.
+        count = self.count + batch_count
+        weight = self.count * batch_count / float(count)
+        predictor_shift = batch_predictor_means - self.predictor_means
+        response_shift = batch_response_mean - self.response_mean
+        self.predictor_moments += batch_predictor_moments + \
+            weight * np.outer(predictor_shift, predictor_shift)
+        self.response_moments += batch_response_moments + \
+            weight * predictor_shift * response_shift
+        self.predictor_means += predictor_shift * batch_count / float(count)
+        self.response_mean += response_shift * batch_count / float(count)
+        self.count = count
+        return None
+
+    def get_scale(self):
+        """
+        Gets the standard deviations of the predictors, as StandardScaler
+        calculates them.  Constant predictors have a scale of one.
+        :return: A vector of scales, one per predictor
+        """
+        scale = np.sqrt(np.diag(self.predictor_moments) / self.count)
+        scale[scale == 0.] = 1.
+        return scale
+
+    def solve(self, alpha):
+        """
+        Solves the ridge regression of the centered response on the
+        standardized predictors.
+        :param alpha: The ridge penalty
+        :return: A vector of coefficients for the standardized predictors
+        """
+
+        # Standardize the moments, then solve the penalized normal equations.
+        scale = self.get_scale()
+        gram = self.predictor_moments / np.outer(scale, scale)
+        gram[np.diag_indices_from(gram)] += alpha
+        return np.linalg.solve(gram, self.response_moments / scale)
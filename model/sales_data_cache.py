@@ -0,0 +1,273 @@
+"""
+Contains a binary column cache for the King County sales data.
+
+The sales data CSV is converted once into one .npy file per column, each
+column stored in the type the schema declares for it, or otherwise in the
+narrowest type that holds its values.  Later reads memory-map the column
+files instead of parsing the CSV, and the cache is rebuilt whenever the CSV
+changes.  Every file is written under a temporary name and then moved into
+place, so that a process which has the old file memory-mapped keeps reading
+the old file.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import sales_data_schema
+
+# Constants
+CACHE_VERSION = 3
+MANIFEST_FILE = 'manifest.json'
+
+# Floating point columns that are stored in single precision even though
+# that rounds their values.  Single precision holds latitude and longitude to
+# within about ten centimeters.
+SINGLE_PRECISION_COLUMNS = ('lat', 'long')
+
+# Integer types, from narrowest to widest, that a column may be stored in.
+INTEGER_TYPES = (np.uint8, np.int8, np.uint16, np.int16,
+                 np.uint32, np.int32, np.int64)
+
+
+def build_cache(csv_path, cache_path):
+    """
+    Converts the sales data CSV into a binary column cache.
+
+    :param csv_path: The path of the sales data CSV
+    :param cache_path: The directory in which to write the cache
+    :return: The sales data read from the CSV
+    """
+
+    # Remove any existing manifest first, so that a partially written cache
+    # is never mistaken for a complete one.  Another process may be building
+    # the same cache at once, and may already have removed it.
+    os.makedirs(cache_path, exist_ok=True)
+    try:
+        os.remove(os.path.join(cache_path, MANIFEST_FILE))
+    except FileNotFoundError:
+        pass
+
+    # Read the CSV, and write each column in its stored type.  Column files
+    # are named by position, since column names may contain spaces.
+    sales_data = sales_data_schema.read_sales_csv(csv_path)
+    columns = []
+    for index, name in enumerate(sales_data.columns):
+        values = narrow_column(name, sales_data[name].values)
+        file_name = '{:02d}.npy'.format(index)
+        write_column(cache_path, file_name, values)
+        columns.append({'name': name, 'dtype': str(values.dtype),
+                        'file': file_name})
+
+    # Write the manifest last, recording the state of the CSV.
+    manifest = {'version': CACHE_VERSION,
+                'source': describe_source(csv_path),
+                'rows': len(sales_data),
+                'columns': columns}
+    write_manifest(cache_path, manifest)
+    return sales_data
+
+
+def cache_is_current(csv_path, cache_path):
+    """
+    Determines if the binary column cache matches the sales data CSV.  A
+    cache whose CSV was touched but not changed is marked current again.
+
+    :param csv_path: The path of the sales data CSV
+    :param cache_path: The directory of the cache
+    :return: True if the cache is current, false otherwise
+    """
+
+    # There is no current cache without a manifest of the current version.
+    manifest = read_manifest(cache_path)
+    if manifest is None or manifest.get('version') != CACHE_VERSION:
+        return False
+
+    # The cache is current if the CSV modification time and size are
+    # unchanged.
+    source = manifest['source']
+    status = os.stat(csv_path)
+    if source['mtime'] == status.st_mtime and source['size'] == status.st_size:
+        return True
+
+    # Otherwise the cache is current only if the CSV contents are unchanged.
+    # Record the new modification time so the CSV is not hashed again.
+    if source['sha256'] != hash_file(csv_path):
+        return False
+    manifest['source'] = describe_source(csv_path, source['sha256'])
+    write_manifest(cache_path, manifest)
+    return True
+
+
+def describe_source(csv_path, sha256=None):
+    """
+    Describes the state of the sales data CSV for the cache manifest.
+
+    :param csv_path: The path of the sales data CSV
+    :param sha256: The hash of the CSV, if already known
+    :return: A dictionary of the CSV modification time, size and hash
+    """
+    status = os.stat(csv_path)
+    return {'mtime': status.st_mtime,
+            'size': status.st_size,
+            'sha256': sha256 if sha256 is not None else hash_file(csv_path)}
+
+
+def hash_file(path):
+    """
+    Calculates the SHA-256 hash of a file.
+
+    :param path: The path of the file
+    :return: The hexadecimal SHA-256 hash of the file
+    """
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as input_file:
+        for block in iter(lambda: input_file.read(1 << 20), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def load_cache(cache_path):
+    """
+    Loads the sales data from a binary column cache.  The column files are
+    memory-mapped, and each column is kept in a block of its own so that the
+    frame is built without copying them.  Selecting several columns of the
+    same type at once consolidates, and so copies, those columns.
+
+    :param cache_path: The directory of the cache
+    :return: The sales data
+    """
+    manifest = read_manifest(cache_path)
+    return pd.concat(
+        [pd.Series(np.load(os.path.join(cache_path, column['file']),
+                           mmap_mode='r'), name=column['name'], copy=False)
+         for column in manifest['columns']], axis=1, copy=False)
+
+
+def narrow_column(name, values):
+    """
+    Converts a column to the type in which it is stored in the cache.
+    Columns in the schema keep their declared type, so that the cache and
+    the CSV give the same types.  Other columns take the narrowest type that
+    holds their values.
+
+    :param name: The name of the column
+    :param values: The values of the column
+    :return: The values of the column in their stored type
+    """
+
+    # Columns in the schema keep their declared type.
+    if name in sales_data_schema.COLUMN_TYPES:
+        return values.astype(sales_data_schema.COLUMN_TYPES[name], copy=False)
+
+    # Other integer columns take the narrowest integer type that holds their
+    # range.
+    if np.issubdtype(values.dtype, np.integer):
+        low, high = values.min(), values.max()
+        for integer_type in INTEGER_TYPES:
+            limits = np.iinfo(integer_type)
+            if limits.min <= low and high <= limits.max:
+                return values.astype(integer_type)
+        return values
+
+    # Other floating point columns take single precision if it holds their values
+    # exactly, or if they are allowed to be rounded.
+    if np.issubdtype(values.dtype, np.floating):
+        single = values.astype(np.float32)
+        if name in SINGLE_PRECISION_COLUMNS or \
+                np.array_equal(single.astype(values.dtype), values):
+            return single
+    return values
+
+
+def read_manifest(cache_path):
+    """
+    Reads the manifest of a binary column cache.
+
+    :param cache_path: The directory of the cache
+    :return: The manifest, or None if there is none
+    """
+    manifest_path = os.path.join(cache_path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r') as input_file:
+        return json.load(input_file)
+
+
+def read_sales_data(csv_path, cache_path):
+    """
+    Reads the sales data through a binary column cache, building or
+    rebuilding the cache if it does not match the CSV.
+
+    :param csv_path: The path of the sales data CSV
+    :param cache_path: The directory of the cache
+    :return: The sales data
+    """
+    if cache_is_current(csv_path, cache_path):
+        return load_cache(cache_path)
+    build_cache(csv_path, cache_path)
+    return load_cache(cache_path)
+
+
+def source_hash(csv_path, cache_path):
+    """
+    Gets the SHA-256 hash of the sales data CSV.  The hash recorded in the
+    manifest is used if the cache is current, so that the CSV is hashed only
+    when its modification time or size has changed.
+
+    :param csv_path: The path of the sales data CSV
+    :param cache_path: The directory of the cache
+    :return: The hexadecimal SHA-256 hash of the CSV
+    """
+    if cache_is_current(csv_path, cache_path):
+        return read_manifest(cache_path)['source']['sha256']
+    return hash_file(csv_path)
+
+
+def write_column(cache_path, file_name, values):
+    """
+    Writes a column file of a binary column cache.  The column is written to
+    a temporary file in the cache directory, which then replaces any
+    existing column file, so that readers never see a partially written
+    file and keep any old file they have memory-mapped.
+
+    :param cache_path: The directory of the cache
+    :param file_name: The name of the column file
+    :param values: The values of the column
+    :return: None
+    """
+    descriptor, temporary_path = tempfile.mkstemp(
+        dir=cache_path, prefix='{}.'.format(file_name), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as output_file:
+            np.save(output_file, values)
+        os.replace(temporary_path, os.path.join(cache_path, file_name))
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+    return None
+
+
+def write_manifest(cache_path, manifest):
+    """
+    Writes the manifest of a binary column cache.  The manifest is written
+    to a temporary file of its own, and replaces any existing one only once
+    it is complete.
+
+    :param cache_path: The directory of the cache
+    :param manifest: The manifest
+    :return: None
+    """
+    descriptor, temporary_path = tempfile.mkstemp(
+        dir=cache_path, prefix='{}.'.format(MANIFEST_FILE), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'w') as output_file:
+            json.dump(manifest, output_file, indent=2)
+        os.replace(temporary_path, os.path.join(cache_path, MANIFEST_FILE))
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+    return None